@@ -107,6 +107,50 @@ def run_doc_embedding_l3(ctx, *args, **kwargs) -> None:
     main(**kwargs)
 
 
+@common_options
+@cli.command()
+@click.option(
+    "--index_file",
+    default="index.scip",
+    help="Which index file to use for the SymbolRank basis.",
+)
+@click.option(
+    "--basis_file",
+    default="symbol_rank_basis.npz",
+    help="Which basis file to save to.",
+)
+@click.option(
+    "--sketch_size",
+    default=64,
+    help="How many entries to keep in the sketch of each symbol.",
+)
+@click.pass_context
+def run_symbol_rank_basis(ctx, *args, **kwargs) -> None:
+    """Run the SymbolRank basis and global rank precomputation."""
+    from automata.cli.scripts.run_symbol_rank_basis import main
+
+    reconfigure_logging(kwargs.get("log_level", "DEBUG"))
+    logger.info("Calling run_symbol_rank_basis")
+    main(**kwargs)
+
+
+@common_options
+@cli.command()
+@click.option(
+    "--pattern",
+    default="symbol_*_embedding*.json",
+    help="Which JSON vector databases in the symbol config directory to migrate.",
+)
+@click.pass_context
+def run_vector_db_migration(ctx, *args, **kwargs) -> None:
+    """Migrate the JSON vector databases to memory mapped .npy databases."""
+    from automata.cli.scripts.run_vector_db_migration import main
+
+    reconfigure_logging(kwargs.get("log_level", "DEBUG"))
+    logger.info("Calling run_vector_db_migration")
+    main(**kwargs)
+
+
 @cli.command()
 @click.pass_context
 def run_doc_post_process(ctx, *args, **kwargs) -> None:
@@ -4,9 +4,11 @@ import os
 from tqdm import tqdm
 
 from automata.config.config_types import ConfigCategory
+from automata.core.database.ivf_index import IVFFlatIndex, IVFFlatIndexConfig
 from automata.core.database.vector import JSONVectorDatabase
 from automata.core.embedding.code_embedding import SymbolCodeEmbeddingHandler
 from automata.core.embedding.embedding_types import OpenAIEmbedding
+from automata.core.embedding.symbol_similarity import SymbolSimilarity
 from automata.core.symbol.graph import SymbolGraph
 from automata.core.symbol.symbol_utils import get_rankable_symbols
 from automata.core.utils import config_fpath
@@ -32,7 +34,8 @@ def main(*args, **kwargs) -> str:
     all_defined_symbols = symbol_graph.get_all_available_symbols()
     filtered_symbols = sorted(get_rankable_symbols(all_defined_symbols), key=lambda x: x.dotpath)
 
-    embedding_db = JSONVectorDatabase(embedding_path)
+    # Each update is appended to the write ahead log, rather than rewriting the database
+    embedding_db = JSONVectorDatabase(embedding_path, write_ahead_log=True)
     embedding_handler = SymbolCodeEmbeddingHandler(embedding_db, OpenAIEmbedding())
 
     for symbol in tqdm(filtered_symbols):
@@ -41,4 +44,11 @@ def main(*args, **kwargs) -> str:
             embedding_db.save()
         except Exception as e:
             logger.error(f"Failed to update embedding for {symbol.dotpath}: {e}")
+    embedding_db.compact()
+    # The IVF index is built where the database is saved, rather than by the first query
+    SymbolSimilarity(
+        embedding_handler,
+        ann_index_config=IVFFlatIndexConfig(),
+        ann_index_path=IVFFlatIndex.default_path(embedding_path),
+    ).build_ann_index()
     return "Success"
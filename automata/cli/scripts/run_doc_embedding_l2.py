@@ -8,6 +8,7 @@ from automata.core.context.py_context.retriever import (
     PyContextRetriever,
     PyContextRetrieverConfig,
 )
+from automata.core.database.ivf_index import IVFFlatIndex, IVFFlatIndexConfig
 from automata.core.database.vector import JSONVectorDatabase
 from automata.core.embedding.code_embedding import SymbolCodeEmbeddingHandler
 from automata.core.embedding.doc_embedding import SymbolDocEmbeddingHandler
@@ -43,7 +44,8 @@ def main(*args, **kwargs) -> str:
         ConfigCategory.SYMBOL.value,
         kwargs.get("embedding_file", "symbol_doc_embedding_l2.json"),
     )
-    embedding_db_l2 = JSONVectorDatabase(embedding_path_l2)
+    # Each update is appended to the write ahead log, rather than rewriting the database
+    embedding_db_l2 = JSONVectorDatabase(embedding_path_l2, write_ahead_log=True)
 
     symbol_graph = SymbolGraph(scip_path)
 
@@ -69,5 +71,12 @@ def main(*args, **kwargs) -> str:
                 embedding_db_l2.save()
             except Exception as e:
                 logger.error(f"Failed to update embedding for symbol {symbol}: {e}")
+    embedding_db_l2.compact()
+    # The IVF index is built where the database is saved, rather than by the first query
+    SymbolSimilarity(
+        embedding_handler,
+        ann_index_config=IVFFlatIndexConfig(),
+        ann_index_path=IVFFlatIndex.default_path(embedding_path_l2),
+    ).build_ann_index()
     logger.info("Complete.")
     return "Success"
@@ -8,6 +8,7 @@ from automata.core.context.py_context.retriever import (
     PyContextRetriever,
     PyContextRetrieverConfig,
 )
+from automata.core.database.ivf_index import IVFFlatIndex, IVFFlatIndexConfig
 from automata.core.database.vector import JSONVectorDatabase
 from automata.core.embedding.code_embedding import SymbolCodeEmbeddingHandler
 from automata.core.embedding.doc_embedding import SymbolDocEmbeddingHandler
@@ -53,7 +54,8 @@ def main(*args, **kwargs) -> str:
 
     symbol_graph = SymbolGraph(scip_path)
 
-    embedding_db_l3 = JSONVectorDatabase(embedding_path_l3)
+    # Each update is appended to the write ahead log, rather than rewriting the database
+    embedding_db_l3 = JSONVectorDatabase(embedding_path_l3, write_ahead_log=True)
 
     symbol_code_similarity = SymbolSimilarity(code_embedding_handler)
 
@@ -79,6 +81,13 @@ def main(*args, **kwargs) -> str:
             embedding_db_l3.save()
             # except Exception as e:
             # logger.error(f"Error updating embedding for {symbol.dotpath}: {e}")
+    embedding_db_l3.compact()
+    # The IVF index is built where the database is saved, rather than by the first query
+    SymbolSimilarity(
+        embedding_handler,
+        ann_index_config=IVFFlatIndexConfig(),
+        ann_index_path=IVFFlatIndex.default_path(embedding_path_l3),
+    ).build_ann_index()
 
     logger.info("Complete.")
     return "Success"
@@ -0,0 +1,59 @@
+import logging
+import os
+
+from automata.config.config_types import ConfigCategory
+from automata.core.database.vector import JSONVectorDatabase
+from automata.core.embedding.code_embedding import SymbolCodeEmbeddingHandler
+from automata.core.embedding.embedding_types import OpenAIEmbedding
+from automata.core.embedding.symbol_similarity import SymbolSimilarity
+from automata.core.symbol.graph import SymbolGraph
+from automata.core.symbol.search.global_rank import GlobalSymbolRank
+from automata.core.symbol.search.rank import SymbolRankConfig
+from automata.core.symbol.search.rank_basis import SymbolRankBasis
+from automata.core.symbol.search.symbol_search import SymbolSearch
+from automata.core.utils import config_fpath
+
+logger = logging.getLogger(__name__)
+
+
+def main(*args, **kwargs) -> str:
+    """
+    Precompute the SymbolRank basis and the global SymbolRanks of the rankable subgraph
+    of the specified SCIP index file.
+    """
+    scip_path = os.path.join(
+        config_fpath(), ConfigCategory.SYMBOL.value, kwargs.get("index_file", "index.scip")
+    )
+    code_embedding_fpath = os.path.join(
+        config_fpath(), ConfigCategory.SYMBOL.value, "symbol_code_embedding.json"
+    )
+    basis_path = os.path.join(
+        config_fpath(),
+        ConfigCategory.SYMBOL.value,
+        kwargs.get("basis_file", "symbol_rank_basis.npz"),
+    )
+
+    symbol_graph = SymbolGraph(scip_path)
+    code_embedding_db = JSONVectorDatabase(code_embedding_fpath)
+    code_embedding_handler = SymbolCodeEmbeddingHandler(code_embedding_db, OpenAIEmbedding())
+    symbol_code_similarity = SymbolSimilarity(code_embedding_handler)
+
+    # The basis is computed over the subgraph as filtered by SymbolSearch
+    symbol_search = SymbolSearch(
+        symbol_graph,
+        symbol_code_similarity,
+        SymbolRankConfig(),
+        symbol_graph.get_rankable_symbol_subgraph(),
+    )
+    symbol_rank_basis = SymbolRankBasis.build(
+        symbol_search.symbol_rank, sketch_size=kwargs.get("sketch_size", 64)
+    )
+    symbol_rank_basis.save(basis_path)
+    logger.info(f"Saved the SymbolRank basis to {basis_path}")
+
+    global_rank_path = GlobalSymbolRank.default_path(scip_path)
+    GlobalSymbolRank.from_symbol_rank(
+        symbol_search.symbol_rank, symbol_graph.index_digest, code_embedding_db.version
+    ).save(global_rank_path)
+    logger.info(f"Saved the global SymbolRanks to {global_rank_path}")
+    return "Success"
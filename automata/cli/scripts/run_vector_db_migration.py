@@ -0,0 +1,26 @@
+import glob
+import logging
+import os
+
+from automata.config.config_types import ConfigCategory
+from automata.core.database.vector import NumpyVectorDatabase
+from automata.core.utils import config_fpath
+
+logger = logging.getLogger(__name__)
+
+
+def main(*args, **kwargs) -> str:
+    """
+    Migrate the symbol_*_embedding.json vector databases into memory mapped .npy databases,
+    which are saved next to them.
+    """
+    symbol_dir = os.path.join(config_fpath(), ConfigCategory.SYMBOL.value)
+    json_fpaths = sorted(
+        glob.glob(os.path.join(symbol_dir, kwargs.get("pattern", "symbol_*_embedding*.json")))
+    )
+    for json_fpath in json_fpaths:
+        if json_fpath.endswith(".symbols.json"):
+            continue
+        vector_db = NumpyVectorDatabase.from_json(json_fpath)
+        logger.info(f"Migrated {json_fpath} to {vector_db.file_path}")
+    return "Success"
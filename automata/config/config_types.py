@@ -93,13 +93,38 @@ class AutomataAgentConfig(BaseModel):
             formatter = {}
             if config.config_name == AgentConfigName.AUTOMATA_RETRIEVER:
                 from automata.core.agent.tools.tool_utils import DependencyFactory
+                from automata.core.database.vector import read_vector_database_version
+                from automata.core.symbol.index_stream import compute_file_digest
+                from automata.core.symbol.search.global_rank import GlobalSymbolRank
+                from automata.core.symbol.search.rank import SymbolRankConfig
+
+                # The global ranks are precomputed alongside the index, so the symbol graph
+                # and the embeddings are only loaded when they are missing or stale
+                index_path = os.path.join(
+                    os.path.dirname(os.path.abspath(__file__)),
+                    ConfigCategory.SYMBOL.value,
+                    "index.scip",
+                )
+                global_rank_path = GlobalSymbolRank.default_path(index_path)
+                index_digest = compute_file_digest(index_path)
+                embedding_version = read_vector_database_version(
+                    DependencyFactory.DEFAULT_CODE_EMBEDDING_FPATH
+                )
+                global_rank = GlobalSymbolRank.load_if_fresh(
+                    global_rank_path, index_digest, embedding_version, SymbolRankConfig()
+                )
+                if global_rank is None:
+                    symbol_search = DependencyFactory().get("symbol_search")
+                    global_rank = GlobalSymbolRank.from_symbol_rank(
+                        symbol_search.symbol_rank,
+                        index_digest,
+                        symbol_search.symbol_code_similarity.embedding_handler.embedding_db.version,
+                    )
+                    global_rank.save(global_rank_path)
 
-                symbol_search = DependencyFactory().get("symbol_search")
-                symbol_rank = symbol_search.symbol_rank
-                ranks = symbol_rank.get_ranks()
                 symbol_dotpaths = [
                     ".".join(symbol.dotpath.split(".")[1:])
-                    for symbol, _ in ranks[:max_default_overview_symbols]
+                    for symbol in global_rank.get_top_symbols(max_default_overview_symbols)
                 ]
                 formatter["symbol_rank_overview"] = "\n".join(sorted(symbol_dotpaths))
             elif config.config_name == AgentConfigName.AUTOMATA_MAIN:
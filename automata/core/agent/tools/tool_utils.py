@@ -16,14 +16,18 @@ from automata.core.context.py_context.retriever import (
     PyContextRetriever,
     PyContextRetrieverConfig,
 )
-from automata.core.database.vector import JSONVectorDatabase
+from automata.core.database.ivf_index import IVFFlatIndex, IVFFlatIndexConfig
+from automata.core.database.vector import load_vector_database
 from automata.core.embedding.code_embedding import SymbolCodeEmbeddingHandler
 from automata.core.embedding.doc_embedding import SymbolDocEmbeddingHandler
 from automata.core.embedding.embedding_types import OpenAIEmbedding
 from automata.core.embedding.symbol_similarity import SymbolSimilarity
+from automata.core.symbol.bounding_box import BoundingBoxCache
 from automata.core.symbol.graph import SymbolGraph
+from automata.core.symbol.search.query_cache import QueryResultCache
 from automata.core.symbol.search.rank import SymbolRankConfig
 from automata.core.symbol.search.symbol_search import SymbolSearch
+from automata.core.symbol.snapshot import SymbolGraphSnapshot
 from automata.core.utils import config_fpath
 
 logger = logging.getLogger(__name__)
@@ -63,6 +67,14 @@ class DependencyFactory:
         config_fpath(), ConfigCategory.SYMBOL.value, "symbol_doc_embedding_l3.json"
     )
 
+    DEFAULT_SYMBOL_RANK_BASIS_FPATH = os.path.join(
+        config_fpath(), ConfigCategory.SYMBOL.value, "symbol_rank_basis.npz"
+    )
+
+    DEFAULT_SYMBOL_SEARCH_CACHE_FPATH = os.path.join(
+        config_fpath(), ConfigCategory.SYMBOL.value, "symbol_search_cache.json"
+    )
+
     # Used to cache the symbol subgraph across multiple instances
     _class_cache: Dict[str, Any] = {}
 
@@ -70,11 +82,17 @@ class DependencyFactory:
         """
         Keyword Args (Defaults):
             symbol_graph_path (DependencyFactory.DEFAULT_SCIP_FPATH)
+            symbol_graph_snapshot_path (SymbolGraphSnapshot.default_path(symbol_graph_path))
+            symbol_graph_parallel_build (False)
+            symbol_graph_backend ("networkx")
+            symbol_graph_bounding_box_cache_path (BoundingBoxCache.default_path(symbol_graph_path))
             flow_rank ("bidirectional")
             embedding_provider (OpenAIEmbedding())
             code_embedding_fpath (DependencyFactory.DEFAULT_CODE_EMBEDDING_FPATH)
             doc_embedding_fpath (DependencyFactory.DEFAULT_DOC_EMBEDDING_FPATH)
+            ann_index_config (IVFFlatIndexConfig())
             symbol_rank_config (SymbolRankConfig())
+            symbol_rank_basis_path (DependencyFactory.DEFAULT_SYMBOL_RANK_BASIS_FPATH)
             py_context_retriever_config (PyContextRetrieverConfig())
         }
         """
@@ -122,9 +140,26 @@ class DependencyFactory:
 
         Keyword Args:
             symbol_graph_path (DependencyFactory.DEFAULT_SCIP_FPATH)
+            symbol_graph_snapshot_path (SymbolGraphSnapshot.default_path(symbol_graph_path))
+            symbol_graph_parallel_build (False)
+            symbol_graph_backend ("networkx")
+            symbol_graph_bounding_box_cache_path (BoundingBoxCache.default_path(symbol_graph_path))
         """
+        symbol_graph_path = self.overrides.get(
+            "symbol_graph_path", DependencyFactory.DEFAULT_SCIP_FPATH
+        )
+        symbol_graph_snapshot_path = self.overrides.get(
+            "symbol_graph_snapshot_path", SymbolGraphSnapshot.default_path(symbol_graph_path)
+        )
         return SymbolGraph(
-            self.overrides.get("symbol_graph_path", DependencyFactory.DEFAULT_SCIP_FPATH)
+            symbol_graph_path,
+            snapshot_path=symbol_graph_snapshot_path,
+            parallel_build=self.overrides.get("symbol_graph_parallel_build", False),
+            backend=self.overrides.get("symbol_graph_backend", "networkx"),
+            bounding_box_cache_path=self.overrides.get(
+                "symbol_graph_bounding_box_cache_path",
+                BoundingBoxCache.default_path(symbol_graph_path),
+            ),
         )
 
     @classmethod_lru_cache()
@@ -148,15 +183,20 @@ class DependencyFactory:
         Keyword Args:
             code_embedding_fpath (DependencyFactory.DEFAULT_CODE_EMBEDDING_FPATH)
             embedding_provider (OpenAIEmbedding())
+            ann_index_config (IVFFlatIndexConfig())
         """
         code_embedding_fpath = self.overrides.get(
             "code_embedding_fpath", DependencyFactory.DEFAULT_CODE_EMBEDDING_FPATH
         )
-        code_embedding_db = JSONVectorDatabase(code_embedding_fpath)
+        code_embedding_db = load_vector_database(code_embedding_fpath)
 
         embedding_provider = self.overrides.get("embedding_provider", OpenAIEmbedding())
         code_embedding_handler = SymbolCodeEmbeddingHandler(code_embedding_db, embedding_provider)
-        return SymbolSimilarity(code_embedding_handler)
+        return SymbolSimilarity(
+            code_embedding_handler,
+            ann_index_config=self.overrides.get("ann_index_config", IVFFlatIndexConfig()),
+            ann_index_path=IVFFlatIndex.default_path(code_embedding_fpath),
+        )
 
     @classmethod_lru_cache()
     def create_symbol_doc_similarity(self) -> SymbolSimilarity:
@@ -166,11 +206,12 @@ class DependencyFactory:
         Keyword Args:
             doc_embedding_fpath (DependencyFactory.DEFAULT_DOC_EMBEDDING_FPATH)
             embedding_provider (OpenAIEmbedding())
+            ann_index_config (IVFFlatIndexConfig())
         """
         doc_embedding_fpath = self.overrides.get(
             "doc_embedding_fpath", DependencyFactory.DEFAULT_DOC_EMBEDDING_FPATH
         )
-        doc_embedding_db = JSONVectorDatabase(doc_embedding_fpath)
+        doc_embedding_db = load_vector_database(doc_embedding_fpath)
 
         embedding_provider = self.overrides.get("embedding_provider", OpenAIEmbedding())
         symbol_search = self.get("symbol_search")
@@ -179,7 +220,11 @@ class DependencyFactory:
         doc_embedding_handler = SymbolDocEmbeddingHandler(
             doc_embedding_db, embedding_provider, symbol_search, py_context_retriever
         )
-        return SymbolSimilarity(doc_embedding_handler)
+        return SymbolSimilarity(
+            doc_embedding_handler,
+            ann_index_config=self.overrides.get("ann_index_config", IVFFlatIndexConfig()),
+            ann_index_path=IVFFlatIndex.default_path(doc_embedding_fpath),
+        )
 
     @classmethod_lru_cache()
     def create_symbol_search(self) -> SymbolSearch:
@@ -188,13 +233,26 @@ class DependencyFactory:
 
         Keyword Args:
             symbol_rank_config (SymbolRankConfig())
+            symbol_rank_basis_path (DependencyFactory.DEFAULT_SYMBOL_RANK_BASIS_FPATH)
+            symbol_search_cache_path (DependencyFactory.DEFAULT_SYMBOL_SEARCH_CACHE_FPATH)
         """
         symbol_graph = self.get("symbol_graph")
         symbol_code_similarity = self.get("symbol_code_similarity")
         symbol_rank_config = self.overrides.get("symbol_rank_config", SymbolRankConfig())
         symbol_graph_subgraph = self.get("subgraph")
+        symbol_rank_basis_path = self.overrides.get(
+            "symbol_rank_basis_path", DependencyFactory.DEFAULT_SYMBOL_RANK_BASIS_FPATH
+        )
+        symbol_search_cache_path = self.overrides.get(
+            "symbol_search_cache_path", DependencyFactory.DEFAULT_SYMBOL_SEARCH_CACHE_FPATH
+        )
         return SymbolSearch(
-            symbol_graph, symbol_code_similarity, symbol_rank_config, symbol_graph_subgraph
+            symbol_graph,
+            symbol_code_similarity,
+            symbol_rank_config,
+            symbol_graph_subgraph,
+            symbol_rank_basis_path=symbol_rank_basis_path,
+            query_cache=QueryResultCache(file_path=symbol_search_cache_path),
         )
 
     @classmethod_lru_cache()
@@ -152,6 +152,20 @@ class LazyModuleTreeMap:
         self._load_all_modules()
         return self._loaded_modules.items()
 
+    def module_fpaths(self) -> Iterable[Tuple[str, str]]:
+        """
+        Returns:
+            The module dotpath to module filepath mapping of the modules in 'py_dir',
+            without loading them
+
+        FIXME: Filter on py_dir for now and then introduce smarter logic later
+        """
+        return (
+            (module_dotpath, fpath)
+            for module_dotpath, fpath in self._dotpath_map.items()
+            if self.py_dir in module_dotpath
+        )
+
     def fetch_module(self, module_dotpath: str) -> Optional[RedBaron]:
         """
         Gets the module with the given dotpath
@@ -204,6 +218,15 @@ class LazyModuleTreeMap:
             return self._dotpath_map.get_module_fpath_by_dotpath(module_dotpath)
         return None
 
+    def get_module_fpath_by_dotpath(self, module_dotpath: str) -> str:
+        """
+        Gets the module fpath for the specified module dotpath, whether or not it is loaded.
+
+        Args:
+            module_dotpath (str): The module dotpath.
+        """
+        return self._dotpath_map.get_module_fpath_by_dotpath(module_dotpath)
+
     def get_module_dotpath_by_fpath(self, module_fpath: str) -> str:
         """
         Gets the module dotpath for the specified module fpath.
@@ -225,13 +248,8 @@ class LazyModuleTreeMap:
         self._dotpath_map.put_module(module_dotpath)
 
     def _load_all_modules(self) -> None:
-        """Loads all modules in the map
-
-        FIXME: Filter on py_dir for now and then introduce smarter logic later
-        """
-        for module_dotpath, fpath in self._dotpath_map.items():
-            if self.py_dir not in module_dotpath:
-                continue
+        """Loads all modules in the map"""
+        for module_dotpath, fpath in self.module_fpaths():
             if module_dotpath not in self._loaded_modules:
                 self._loaded_modules[module_dotpath] = self._load_module_from_fpath(fpath)
 
@@ -0,0 +1,313 @@
+import json
+import logging
+import os
+from typing import TYPE_CHECKING, Any, Dict, Optional
+
+import numpy as np
+from pydantic import BaseModel
+
+from automata.core.embedding.normalization import NormType
+
+if TYPE_CHECKING:
+    from automata.core.database.vector import VectorDatabaseProvider
+
+logger = logging.getLogger(__name__)
+
+"""
+An IVFFlatIndex is an approximate nearest neighbour index over the rows of a vector
+database. The normalized vectors are clustered with k-means, and each row is stored in
+the inverted list of its closest centroid, so a query
+    - scores the query against the centroids,
+    - keeps the n_probe lists with the closest centroids,
+    - scores the query exactly against the vectors of those lists only,
+which looks at about n_probe / n_lists of the vectors. Raising n_probe trades latency for
+recall, and n_probe = n_lists is an exact search. The vectors themselves stay in the
+database, the index only stores the centroids and the row ids of each list, in an
+uncompressed numpy `.npz` archive keyed on the version of the database it was built from.
+"""
+
+IVF_FLAT_INDEX_FORMAT_VERSION = 1
+
+# The number of rows assigned to the centroids at once, which bounds the memory of a build
+ASSIGNMENT_BATCH_SIZE = 8192
+
+
+class IVFFlatIndexConfig(BaseModel):
+    """A configuration class for IVFFlatIndex"""
+
+    # The number of inverted lists, which defaults to the square root of the number of rows
+    n_lists: Optional[int] = None
+    # The number of lists searched by each query
+    n_probe: int = 8
+    # Databases with fewer rows are searched exactly
+    min_rows: int = 10000
+    n_iterations: int = 10
+    # The number of rows the centroids are trained on
+    sample_size: int = 65536
+    seed: int = 0
+
+    @staticmethod
+    def validate_config(config) -> None:
+        """
+        Validate configuration parameters.
+
+        Args:
+            config (IVFFlatIndexConfig): Configuration parameters.
+
+        Raises:
+            ValueError: If n_lists, n_probe, n_iterations or sample_size is not positive,
+                or min_rows is negative.
+        """
+        if config.n_lists is not None and config.n_lists <= 0:
+            raise ValueError(f"n_lists must be positive, but got {config.n_lists}")
+
+        if config.n_probe <= 0:
+            raise ValueError(f"n_probe must be positive, but got {config.n_probe}")
+
+        if config.min_rows < 0:
+            raise ValueError(f"min_rows must be non-negative, but got {config.min_rows}")
+
+        if config.n_iterations <= 0:
+            raise ValueError(f"n_iterations must be positive, but got {config.n_iterations}")
+
+        if config.sample_size <= 0:
+            raise ValueError(f"sample_size must be positive, but got {config.sample_size}")
+
+
+class IVFFlatIndex:
+    """
+    An inverted file index over the normalized vectors of a vector database
+    """
+
+    def __init__(
+        self,
+        version: str,
+        norm_type: Optional[NormType],
+        centroids: np.ndarray,
+        list_offsets: np.ndarray,
+        list_rows: np.ndarray,
+        n_probe: int = IVFFlatIndexConfig().n_probe,
+    ) -> None:
+        """
+        Args:
+            version (str): The version of the database the index was built from
+            norm_type (Optional[NormType]): The normalization of the indexed vectors
+            centroids (np.ndarray): The centroid of each list, one per row
+            list_offsets (np.ndarray): The offset of each list in list_rows,
+                followed by the length of list_rows
+            list_rows (np.ndarray): The database rows of every list, list after list
+            n_probe (int): The number of lists searched by each query
+        """
+        self.version = version
+        self.norm_type = norm_type
+        self.centroids = centroids
+        self.list_offsets = list_offsets
+        self.list_rows = list_rows
+        self.n_probe = n_probe
+
+    @classmethod
+    def build(
+        cls,
+        vector_db: "VectorDatabaseProvider",
+        norm_type: Optional[NormType],
+        config: IVFFlatIndexConfig = IVFFlatIndexConfig(),
+    ) -> "IVFFlatIndex":
+        """
+        Builds an index over the current vectors of a database
+
+        Args:
+            vector_db (VectorDatabaseProvider): The database to index
+            norm_type (Optional[NormType]): The normalization to index the vectors under
+            config (IVFFlatIndexConfig): The index configuration
+
+        Returns:
+            IVFFlatIndex: The built index
+        """
+        IVFFlatIndexConfig.validate_config(config)
+        dimension = vector_db.get_rows()[0].shape[1]
+        rows = np.flatnonzero(vector_db.get_live_rows())
+        n_lists = min(config.n_lists or max(int(np.sqrt(len(rows))), 1), len(rows))
+        if n_lists == 0:
+            return cls(
+                vector_db.version,
+                norm_type,
+                np.zeros((0, dimension), dtype=np.float32),
+                np.zeros(1, dtype=np.int64),
+                np.zeros(0, dtype=np.int64),
+                config.n_probe,
+            )
+
+        rng = np.random.default_rng(config.seed)
+        sample = (
+            rows
+            if len(rows) <= config.sample_size
+            else np.sort(rng.choice(rows, config.sample_size, replace=False))
+        )
+        sample_vectors = vector_db.get_normalized_rows(norm_type, sample)
+        centroids = sample_vectors[rng.choice(len(sample), n_lists, replace=False)].copy()
+        for _ in range(config.n_iterations):
+            assignments = IVFFlatIndex._assign(sample_vectors, centroids)
+            order = np.argsort(assignments, kind="stable")
+            counts = np.bincount(assignments, minlength=n_lists)
+            non_empty = np.flatnonzero(counts)
+            # Lists which were left empty keep their previous centroid
+            centroids[non_empty] = (
+                np.add.reduceat(
+                    sample_vectors[order], np.cumsum(counts)[non_empty] - counts[non_empty]
+                )
+                / counts[non_empty, np.newaxis]
+            )
+            if norm_type == NormType.L2:
+                centroids /= np.maximum(np.linalg.norm(centroids, axis=1, keepdims=True), 1e-12)
+
+        assignments = np.concatenate(
+            [
+                IVFFlatIndex._assign(
+                    vector_db.get_normalized_rows(norm_type, rows[i : i + ASSIGNMENT_BATCH_SIZE]),
+                    centroids,
+                )
+                for i in range(0, len(rows), ASSIGNMENT_BATCH_SIZE)
+            ]
+        )
+        order = np.argsort(assignments, kind="stable")
+        list_offsets = np.concatenate(
+            [[0], np.cumsum(np.bincount(assignments, minlength=n_lists))]
+        ).astype(np.int64)
+        logger.info(f"Built an IVF index with {n_lists} lists over {len(rows)} vectors")
+        return cls(
+            vector_db.version,
+            norm_type,
+            centroids.astype(np.float32),
+            list_offsets,
+            rows[order].astype(np.int64),
+            config.n_probe,
+        )
+
+    def probe(self, query: np.ndarray) -> np.ndarray:
+        """
+        Gets the rows of the lists whose centroids are closest to a query
+
+        Args:
+            query (np.ndarray): The normalized query vector
+
+        Returns:
+            np.ndarray: The database rows of the n_probe closest lists
+        """
+        if self.n_probe >= self.centroids.shape[0]:
+            return self.list_rows
+        centroid_scores = self.centroids @ query
+        lists = np.argpartition(-centroid_scores, self.n_probe - 1)[: self.n_probe]
+        return np.concatenate(
+            [self.list_rows[self.list_offsets[i] : self.list_offsets[i + 1]] for i in lists]
+        )
+
+    def save(self, path: str) -> None:
+        """
+        Saves the index to disk
+
+        Args:
+            path (str): The path to save the index to
+        """
+        header = {
+            "format_version": IVF_FLAT_INDEX_FORMAT_VERSION,
+            "version": self.version,
+            "norm_type": self.norm_type.value if self.norm_type is not None else None,
+        }
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, "wb") as f:
+            np.savez(
+                f,
+                header=np.frombuffer(json.dumps(header).encode("utf-8"), dtype=np.uint8),
+                centroids=self.centroids,
+                list_offsets=self.list_offsets,
+                list_rows=self.list_rows,
+            )
+        os.replace(temp_path, path)
+
+    @classmethod
+    def load_if_fresh(
+        cls,
+        path: str,
+        version: str,
+        norm_type: Optional[NormType],
+        n_probe: int = IVFFlatIndexConfig().n_probe,
+    ) -> Optional["IVFFlatIndex"]:
+        """
+        Loads an index from disk if it exists and was built from the given database version
+
+        Args:
+            path (str): The path to load the index from
+            version (str): The current version of the database
+            norm_type (Optional[NormType]): The normalization the index must be built under
+            n_probe (int): The number of lists searched by each query
+
+        Returns:
+            Optional[IVFFlatIndex]: The index, or None if it is missing or stale
+        """
+        if not os.path.exists(path):
+            return None
+        try:
+            with np.load(path, allow_pickle=False) as archive:
+                header = IVFFlatIndex._decode_header(archive)
+                if header["version"] != version or header["norm_type"] != (
+                    norm_type.value if norm_type is not None else None
+                ):
+                    logger.info(f"IVF index at {path} is stale")
+                    return None
+                return cls(
+                    version,
+                    norm_type,
+                    archive["centroids"],
+                    archive["list_offsets"],
+                    archive["list_rows"],
+                    n_probe,
+                )
+        except Exception as e:
+            logger.warning(f"Failed to load IVF index at {path} with error {e}")
+            return None
+
+    @staticmethod
+    def default_path(vector_db_path: str) -> str:
+        """
+        Gets the default path of the index of a vector database
+
+        Args:
+            vector_db_path (str): The path to the vector database
+
+        Returns:
+            str: The path where the index of the database is stored by default
+        """
+        return f"{os.path.splitext(vector_db_path)[0]}.ivf.npz"
+
+    @staticmethod
+    def _assign(vectors: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+        """
+        Assigns each vector to the centroid with the highest dot product
+
+        Args:
+            vectors (np.ndarray): The vectors, one per row
+            centroids (np.ndarray): The centroids, one per row
+
+        Returns:
+            np.ndarray: The centroid of each vector
+        """
+        return np.argmax(vectors @ centroids.T, axis=1)
+
+    @staticmethod
+    def _decode_header(archive: Any) -> Dict[str, Any]:
+        """
+        Decodes and validates the header of an opened index archive
+
+        Args:
+            archive (Any): The opened numpy archive
+
+        Returns:
+            Dict[str, Any]: The decoded header
+        """
+        header = json.loads(archive["header"].tobytes().decode("utf-8"))
+        if header.get("format_version") != IVF_FLAT_INDEX_FORMAT_VERSION:
+            raise ValueError(
+                f"Unsupported IVF index format version {header.get('format_version')}, "
+                f"expected {IVF_FLAT_INDEX_FORMAT_VERSION}"
+            )
+        return header
@@ -1,29 +1,205 @@
 import abc
+import hashlib
+import json
 import logging
 import logging.config
-from typing import Dict, List
+import os
+import uuid
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    Type,
+    Union,
+    overload,
+)
 
 import jsonpickle
 import numpy as np
 
 from automata.core.database.provider import SymbolDatabaseProvider
-from automata.core.symbol.symbol_types import Symbol, SymbolEmbedding
+from automata.core.database.write_ahead_log import (
+    DEFAULT_COMPACTION_THRESHOLD,
+    WriteAheadLog,
+)
+from automata.core.embedding.normalization import NormType, normalize_embeddings
+from automata.core.symbol.parser import parse_symbol
+from automata.core.symbol.symbol_types import (
+    Symbol,
+    SymbolCodeEmbedding,
+    SymbolDocEmbedding,
+    SymbolEmbedding,
+)
+
+if TYPE_CHECKING:
+    from automata.core.database.ivf_index import IVFFlatIndex
 
 logger = logging.getLogger(__name__)
 
+NUMPY_VECTOR_DATABASE_FORMAT_VERSION = 2
+
+# The number of rows normalized at once, which bounds the memory of a normalization pass
+NORMALIZATION_CHUNK_SIZE = 8192
+
+
+class _RowSymbols(Sequence[Optional[Symbol]]):
+    """
+    The symbol of each row of a NumpyVectorDatabase, which are parsed from the
+    sidecar entries as they are accessed rather than all at once
+    """
+
+    def __init__(self, entries: List[Optional[Dict[str, Any]]]) -> None:
+        """
+        Args:
+            entries: The sidecar entry of each row, which is None for discarded rows
+        """
+        self._entries = entries
+
+    @overload
+    def __getitem__(self, position: int) -> Optional[Symbol]:
+        ...
+
+    @overload
+    def __getitem__(self, position: slice) -> List[Optional[Symbol]]:
+        ...
+
+    def __getitem__(
+        self, position: Union[int, slice]
+    ) -> Union[Optional[Symbol], List[Optional[Symbol]]]:
+        if isinstance(position, slice):
+            return [self[i] for i in range(*position.indices(len(self)))]
+        entry = self._entries[position]
+        return parse_symbol(entry["uri"]) if entry is not None else None
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
 
 class VectorDatabaseProvider(SymbolDatabaseProvider):
     """
     Abstract base class for different types of vector database providers.
     """
 
+    # Identifies the contents of the database, and changes whenever they do
+    version: str
+    # Maps the dotpath of each symbol to its row
+    index: Dict[str, int]
+
+    def __init__(self) -> None:
+        # The rows of the database, the mask of the rows which were not discarded and the
+        # per-row scale of each norm type, which are reused until the version changes
+        self._row_cache: Dict[Any, Any] = {}
+        self._row_cache_version: Optional[str] = None
+
     @abc.abstractmethod
-    def calculate_similarity(self, embedding_vec: np.ndarray) -> Dict[Symbol, float]:
+    def get_rows(self) -> Tuple[np.ndarray, Sequence[Optional[Symbol]]]:
         """
-        Abstract method to calculate the similarity between the given vector and vectors in the database.
+        Abstract method to get the vectors of every row stacked into a float32 matrix, along
+        with the symbol of each row, which is None for the rows of discarded vectors.
         """
         pass
 
+    def get_live_rows(self) -> np.ndarray:
+        """
+        Gets a mask of the rows which were not discarded
+
+        Returns:
+            A boolean mask over the rows of get_rows
+        """
+        _, row_symbols = self.get_rows()
+        return np.array([symbol is not None for symbol in row_symbols], dtype=bool)
+
+    def calculate_similarity(
+        self,
+        embedding_vec: np.ndarray,
+        norm_type: Optional[NormType] = NormType.L2,
+        top_k: Optional[int] = None,
+        candidate_mask: Optional[np.ndarray] = None,
+        ann_index: Optional["IVFFlatIndex"] = None,
+    ) -> Dict[Symbol, float]:
+        """
+        Calculates the similarity between the given vector and the vectors in the database,
+        which is the dot product of the vectors once both are normalized. The L1 and L2
+        norms of the rows are kept in memory until the database changes, so that a query
+        costs a single matrix-vector product over the stored vectors, which are never
+        copied to be normalized
+
+        Args:
+            embedding_vec: The vector to compare against
+            norm_type: The normalization to apply, where NormType.L2 gives the cosine
+                similarity and None gives the raw dot product
+            top_k: The number of most similar symbols to return, or None to return all
+            candidate_mask: A boolean mask over the rows, as built by get_candidate_mask,
+                which restricts the symbols that can be returned
+            ann_index: An approximate nearest neighbour index built from the current
+                version of the database, in which case only the rows of the lists it probes
+                are scored and symbols outside of them are not returned
+
+        Raises:
+            ValueError: If the index was built from another version or normalization
+
+        Returns:
+            The similarity of each returned symbol, in descending order of similarity
+                when top_k is given and in row order otherwise
+        """
+        _, row_symbols = self._get_row_cache("rows", self.get_rows)
+        live_rows = self._get_row_cache("live_rows", self.get_live_rows)
+        query = np.asarray(embedding_vec, dtype=np.float32).reshape(1, -1)
+        if norm_type is not None:
+            query = normalize_embeddings(query, norm_type)
+
+        if candidate_mask is not None:
+            # Rows added after the mask was built are not candidates
+            mask = np.zeros(len(live_rows), dtype=bool)
+            mask[: len(candidate_mask)] = candidate_mask[: len(live_rows)]
+            live_rows = live_rows & mask
+        if not live_rows.any():
+            # An empty matrix can not be multiplied with the query, and has nothing to return
+            return {}
+        if ann_index is None:
+            rows = np.flatnonzero(live_rows)
+            scores = self._score_rows(query[0], norm_type)[rows]
+        else:
+            if ann_index.version != self.version or ann_index.norm_type != norm_type:
+                raise ValueError(
+                    "The IVF index was not built from the current vectors and normalization"
+                )
+            rows = np.sort(ann_index.probe(query[0]))
+            rows = rows[live_rows[rows]]
+            scores = self._score_rows(query[0], norm_type, rows)
+
+        if top_k is not None:
+            positions = np.arange(len(rows))
+            if top_k < len(rows):
+                positions = (
+                    np.argpartition(-scores, top_k - 1)[:top_k] if top_k > 0 else positions[:0]
+                )
+            positions = positions[np.argsort(-scores[positions], kind="stable")]
+            rows, scores = rows[positions], scores[positions]
+        return {row_symbols[row]: float(score) for row, score in zip(rows, scores)}  # type: ignore
+
+    def get_candidate_mask(self, symbols: Iterable[Symbol]) -> np.ndarray:
+        """
+        Builds a mask of the rows of the given symbols, which stays valid until the
+        database is saved, as that renumbers the rows
+
+        Args:
+            symbols: The symbols to include, those not in the database are skipped
+
+        Returns:
+            A boolean mask over the rows, for calculate_similarity
+        """
+        rows = [self.index[symbol.dotpath] for symbol in symbols if symbol.dotpath in self.index]
+        mask = np.zeros(max(self.index.values(), default=-1) + 1, dtype=bool)
+        mask[rows] = True
+        return mask
+
     @abc.abstractmethod
     def get_all_symbols(self) -> List[Symbol]:
         """
@@ -31,47 +207,242 @@ class VectorDatabaseProvider(SymbolDatabaseProvider):
         """
         pass
 
+    def get_row_scales(self, norm_type: Optional[NormType]) -> Optional[np.ndarray]:
+        """
+        Gets the factor which normalizes each row, computed in chunks from the stored
+        vectors and kept until the database changes
+
+        Args:
+            norm_type: The normalization to apply, or None for the raw vectors
+
+        Returns:
+            The factor of each row, which is 0 for discarded rows and rows with a zero norm,
+                or None for normalizations which do not scale the rows, i.e. softmax
+        """
+        if norm_type == NormType.SOFTMAX:
+            return None
+
+        def build() -> np.ndarray:
+            matrix, _ = self._get_row_cache("rows", self.get_rows)
+            live_rows = self._get_row_cache("live_rows", self.get_live_rows)
+            if norm_type is None:
+                return live_rows.astype(np.float32)
+            norms = np.zeros(matrix.shape[0], dtype=np.float32)
+            for start in range(0, matrix.shape[0], NORMALIZATION_CHUNK_SIZE):
+                chunk = matrix[start : start + NORMALIZATION_CHUNK_SIZE]
+                norms[start : start + len(chunk)] = (
+                    np.abs(chunk).sum(axis=1)
+                    if norm_type == NormType.L1
+                    else np.linalg.norm(chunk, axis=1)
+                )
+            scales = np.zeros_like(norms)
+            np.divide(1.0, norms, out=scales, where=live_rows & (norms > 0.0))
+            return scales
+
+        return self._get_row_cache(("row_scales", norm_type), build)
+
+    def get_normalized_rows(self, norm_type: Optional[NormType], rows: np.ndarray) -> np.ndarray:
+        """
+        Gets the normalized vectors of some rows, which are not cached
+
+        Args:
+            norm_type: The normalization to apply, or None for the raw vectors
+            rows: The rows to normalize
+
+        Returns:
+            The normalized vectors of the rows, in order, with zeros for discarded rows
+        """
+        matrix, _ = self._get_row_cache("rows", self.get_rows)
+        vectors = np.asarray(matrix[rows], dtype=np.float32)
+        scales = self.get_row_scales(norm_type)
+        if scales is not None:
+            return vectors * scales[rows, np.newaxis]
+        # Softmax is the only normalization which does not scale the rows
+        live = self._get_row_cache("live_rows", self.get_live_rows)[rows]
+        normalized_vectors = np.zeros_like(vectors)
+        normalized_vectors[live] = normalize_embeddings(vectors[live], NormType.SOFTMAX)
+        return normalized_vectors
+
+    def _score_rows(
+        self, query: np.ndarray, norm_type: Optional[NormType], rows: Optional[np.ndarray] = None
+    ) -> np.ndarray:
+        """
+        Scores a normalized query against the normalized vectors of some rows
+
+        Args:
+            query: The normalized query vector
+            norm_type: The normalization of the rows
+            rows: The rows to score, or None to score every row
+
+        Returns:
+            The dot product of the query with each normalized row, in order
+        """
+        matrix, _ = self._get_row_cache("rows", self.get_rows)
+        scales = self.get_row_scales(norm_type)
+        if scales is not None:
+            if rows is None:
+                return (matrix @ query) * scales
+            return (matrix[rows] @ query) * scales[rows]
+        if rows is None:
+            rows = np.arange(matrix.shape[0])
+        return np.concatenate(
+            [
+                self.get_normalized_rows(norm_type, rows[start : start + NORMALIZATION_CHUNK_SIZE])
+                @ query
+                for start in range(0, len(rows), NORMALIZATION_CHUNK_SIZE)
+            ]
+            or [np.zeros(0, dtype=np.float32)]
+        )
+
+    def _get_row_cache(self, name: Any, build: Callable[[], Any]) -> Any:
+        """
+        Gets a structure derived from the rows, rebuilding it if the database changed
+
+        Args:
+            name: The name of the cached structure
+            build: Builds the structure from the current rows
+
+        Returns:
+            The cached structure
+        """
+        if self._row_cache_version != self.version:
+            self._row_cache = {}
+            self._row_cache_version = self.version
+        if name not in self._row_cache:
+            self._row_cache[name] = build()
+        return self._row_cache[name]
+
 
 class JSONVectorDatabase(VectorDatabaseProvider):
     """
     Concrete class to provide a vector database that saves into a JSON file.
     """
 
-    def __init__(self, file_path: str):
+    def __init__(
+        self,
+        file_path: str,
+        write_ahead_log: bool = False,
+        compaction_threshold: int = DEFAULT_COMPACTION_THRESHOLD,
+    ):
         """
         Args:
             file_path: The path to the JSON file to save the vector database to
+            write_ahead_log: Whether to append each change to a log next to the JSON file,
+                which is replayed on load, rather than rewriting the JSON file on every save
+            compaction_threshold: The number of logged changes after which a save
+                rewrites the JSON file and truncates the log
         """
+        super().__init__()
         self.file_path = file_path
-        self.data: List[SymbolEmbedding] = []
+        # Discarded embeddings are left as None tombstones until the next compaction,
+        # so that every other embedding keeps its row
+        self.data: List[Optional[SymbolEmbedding]] = []
         self.index: Dict[str, int] = {}
+        self.tombstone_count = 0
+        self.write_ahead_log = WriteAheadLog(f"{file_path}.wal") if write_ahead_log else None
+        self.compaction_threshold = compaction_threshold
+        # Identifies the contents of the database. It is the hash of the JSON file and log after
+        # a load, the hash of the JSON file after a compaction, and a unique token after any
+        # other change
+        self.version = uuid.uuid4().hex
         self.load()
 
     def save(self):
-        """Saves the vector database to the JSON file"""
-        with open(self.file_path, "w") as file:
-            encoded_data = jsonpickle.encode(self.data)
+        """
+        Saves the vector database to the JSON file, which only compacts it once the log
+        holds compaction_threshold changes when a write ahead log is used
+        """
+        if (
+            self.write_ahead_log is None
+            or self.write_ahead_log.record_count >= self.compaction_threshold
+        ):
+            self.compact()
+
+    def compact(self):
+        """
+        Rewrites the JSON file with every change and truncates the write ahead log,
+        which drops the tombstones of the discarded embeddings and renumbers the rows
+        """
+        if self.tombstone_count:
+            self.data = [embedding for embedding in self.data if embedding is not None]
+            self.index = {
+                embedding.symbol.dotpath: i
+                for i, embedding in enumerate(self.data)
+                if embedding is not None
+            }
+            self.tombstone_count = 0
+        encoded_data = jsonpickle.encode(self.data)
+        temp_path = f"{self.file_path}.{os.getpid()}.tmp"
+        with open(temp_path, "w") as file:
             file.write(encoded_data)
+        os.replace(temp_path, self.file_path)
+        if self.write_ahead_log is not None:
+            self.write_ahead_log.truncate()
+        self.version = hashlib.sha256(encoded_data.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def read_version(file_path: str) -> Optional[str]:
+        """
+        Reads the version of a saved database without decoding its embeddings
+
+        Args:
+            file_path: The path to the JSON file
+
+        Returns:
+            The version of the database when it is loaded without a write ahead log
+        """
+        digest = hashlib.sha256()
+        try:
+            with open(file_path, "r") as file:
+                digest.update(file.read().encode("utf-8"))
+        except FileNotFoundError:
+            pass
+        return digest.hexdigest()
 
     def load(self):
-        """Loads the vector database from the JSON file"""
+        """Loads the vector database from the JSON file, and replays the write ahead log"""
+        digest = hashlib.sha256()
         try:
             with open(self.file_path, "r") as file:
-                self.data = jsonpickle.decode(file.read())
+                encoded_data = file.read()
+                self.data = jsonpickle.decode(encoded_data)
                 # We index on the dotpath of the symbol, which is unique and indepenent of commit hash
                 self.index = {embedding.symbol.dotpath: i for i, embedding in enumerate(self.data)}
+                self.tombstone_count = 0
+                digest.update(encoded_data.encode("utf-8"))
         except FileNotFoundError:
             logger.info(f"Creating new vector embedding db at {self.file_path}")
 
+        if self.write_ahead_log is not None:
+            records = self.write_ahead_log.replay()
+            # Detach the log while replaying, so the replayed changes are not logged again
+            write_ahead_log, self.write_ahead_log = self.write_ahead_log, None
+            try:
+                for record in records:
+                    self._replay(record)
+                    digest.update(json.dumps(record).encode("utf-8"))
+            finally:
+                self.write_ahead_log = write_ahead_log
+            if records:
+                logger.info(f"Replayed {len(records)} changes onto {self.file_path}")
+        self.version = digest.hexdigest()
+
     def add(self, embedding: SymbolEmbedding):
         """
-        Adds a new vector to the database
+        Adds a new vector to the database, replacing the vector of the symbol in place
+        if it is already in the database
 
         Args:
             embedding: The vector to add
         """
-        self.data.append(embedding)
-        self.index[embedding.symbol.dotpath] = len(self.data) - 1
+        row = self.index.get(embedding.symbol.dotpath)
+        if row is None:
+            self.data.append(embedding)
+            self.index[embedding.symbol.dotpath] = len(self.data) - 1
+        else:
+            self.data[row] = embedding
+        self.version = uuid.uuid4().hex
+        self._log("add", embedding)
 
     def update(self, embedding: SymbolEmbedding):
         """
@@ -83,9 +454,11 @@ class JSONVectorDatabase(VectorDatabaseProvider):
         Raises:
             KeyError: If the symbol is not in the database
         """
-        if embedding.symbol not in self.index:
+        if embedding.symbol.dotpath not in self.index:
             raise KeyError(f"Symbol {embedding.symbol} not in database")
         self.data[self.index[embedding.symbol.dotpath]] = embedding
+        self.version = uuid.uuid4().hex
+        self._log("update", embedding)
 
     def discard(self, symbol: Symbol):
         """
@@ -99,11 +472,10 @@ class JSONVectorDatabase(VectorDatabaseProvider):
         """
         if symbol.dotpath not in self.index:
             raise KeyError(f"Symbol {symbol} not in database")
-        index = self.index[symbol.dotpath]
-        del self.data[index]
-        del self.index[symbol.dotpath]
-        # Recalculate indices after deletion
-        self.index = {embedding.symbol.dotpath: i for i, embedding in enumerate(self.data)}
+        self.data[self.index.pop(symbol.dotpath)] = None
+        self.tombstone_count += 1
+        self.version = uuid.uuid4().hex
+        self._log("discard", symbol)
 
     def contains(self, symbol: Symbol) -> bool:
         """
@@ -129,19 +501,37 @@ class JSONVectorDatabase(VectorDatabaseProvider):
         """
         if symbol.dotpath not in self.index:
             raise KeyError(f"Symbol {symbol} not in database")
-        return self.data[self.index[symbol.dotpath]]
+        return self.data[self.index[symbol.dotpath]]  # type: ignore
 
     def clear(self):
         """Removes all vectors from the database"""
         self.data = []
         self.index = {}
+        self.tombstone_count = 0
+        self.version = uuid.uuid4().hex
+        self._log("clear")
+
+    def get_rows(self) -> Tuple[np.ndarray, Sequence[Optional[Symbol]]]:
+        """
+        Gets the vectors of every row, including the tombstones of discarded vectors
 
-    def calculate_similarity(self, embedding_vec: np.ndarray) -> Dict[Symbol, float]:
-        # Implement the logic to calculate similarity between the given embedding and vectors in the data.
-        # This will depend on how the data is structured and the specific similarity measure to be used (e.g., cosine similarity).
-        # Here, just returning the data as a placeholder.
-        # return self.data
-        raise NotImplementedError
+        Returns:
+            The vectors stacked into a float32 matrix, with zeros for discarded rows,
+                and the symbol of each row, which is None for discarded rows
+
+        Raises:
+            ValueError: If the vectors do not all have the same dimension
+        """
+        dimension = next(
+            (len(embedding.vector) for embedding in self.data if embedding is not None), 0
+        )
+        matrix = np.zeros((len(self.data), dimension), dtype=np.float32)
+        for row, embedding in enumerate(self.data):
+            if embedding is not None:
+                matrix[row] = embedding.vector
+        return matrix, [
+            embedding.symbol if embedding is not None else None for embedding in self.data
+        ]
 
     def get_all_symbols(self) -> List[Symbol]:
         """
@@ -150,5 +540,536 @@ class JSONVectorDatabase(VectorDatabaseProvider):
         Returns:
             A list of all symbols in the database
         """
-        symbol_list = [embedding.symbol for embedding in self.data]
+        symbol_list = [embedding.symbol for embedding in self.data if embedding is not None]
         return sorted(symbol_list, key=lambda x: str(x.dotpath))
+
+    def _log(self, operation: str, value: Any = None) -> None:
+        """
+        Appends a change to the write ahead log, if there is one
+
+        Args:
+            operation: The name of the method which made the change
+            value: The embedding or symbol the method was called with
+        """
+        if self.write_ahead_log is not None:
+            self.write_ahead_log.append(
+                {"operation": operation, "value": jsonpickle.encode(value)}
+            )
+
+    def _replay(self, record: Dict[str, Any]) -> None:
+        """
+        Applies a change read from the write ahead log. Adds and updates overwrite any
+        existing embedding and discards of missing symbols are skipped, so that the changes
+        which were already compacted into the JSON file can be replayed again
+
+        Args:
+            record: The logged change
+        """
+        operation, value = record["operation"], jsonpickle.decode(record["value"])
+        if operation in ("add", "update"):
+            self.add(value)
+        elif operation == "discard":
+            if self.contains(value):
+                self.discard(value)
+        elif operation == "clear":
+            self.clear()
+        else:
+            raise ValueError(f"Unknown write ahead log operation {operation}")
+
+
+class NumpyVectorDatabase(VectorDatabaseProvider):
+    """
+    Concrete class to provide a vector database that saves the vectors into one contiguous
+    float32 .npy matrix, and the symbol URIs and metadata into a JSON sidecar next to it.
+    The matrix is memory mapped on load, so loading only reads the sidecar and the rows
+    are paged in as they are accessed.
+
+    Each save writes its matrix to a new file named after the revision of the save, and
+    then replaces the sidecar, which names that revision. A crash between the two writes
+    therefore leaves the previous sidecar paired with the previous matrix.
+    """
+
+    EMBEDDING_TYPES: Dict[str, Type[SymbolEmbedding]] = {
+        embedding_type.__name__: embedding_type
+        for embedding_type in (SymbolEmbedding, SymbolCodeEmbedding, SymbolDocEmbedding)
+    }
+
+    def __init__(self, file_path: str):
+        """
+        Args:
+            file_path: The .npy path of the database, next to which the sidecar and
+                the matrix of each revision are saved
+        """
+        super().__init__()
+        self.file_path = file_path
+        self.sidecar_path = NumpyVectorDatabase.get_sidecar_path(file_path)
+        # The saved vectors, one per row, which are memory mapped from the .npy file
+        # of the saved revision
+        self.matrix: np.ndarray = np.zeros((0, 0), dtype=np.float32)
+        self.revision: Optional[str] = None
+        # The vectors added since the last save, which follow the saved rows
+        self.appended_vectors: List[np.ndarray] = []
+        # The URI, type, row and remaining attributes of each embedding, in insertion order.
+        # Discarded embeddings are left as None tombstones until the next save
+        self.entries: List[Optional[Dict[str, Any]]] = []
+        self.index: Dict[str, int] = {}
+        self.tombstone_count = 0
+        self.dimension: Optional[int] = None
+        self._embeddings: Dict[str, SymbolEmbedding] = {}
+        # Identifies the contents of the database. It is the revision stored in the sidecar
+        # after a load or a save, and a unique token after any other change
+        self.version = uuid.uuid4().hex
+        self.load()
+
+    @staticmethod
+    def get_sidecar_path(file_path: str) -> str:
+        """
+        Gets the path of the sidecar which holds the symbols of a vector file
+
+        Args:
+            file_path: The path to the .npy file
+
+        Returns:
+            The path to the JSON sidecar
+        """
+        return f"{os.path.splitext(file_path)[0]}.symbols.json"
+
+    @staticmethod
+    def get_matrix_path(file_path: str, revision: str) -> str:
+        """
+        Gets the path of the .npy file which holds the vectors of a saved revision
+
+        Args:
+            file_path: The .npy path of the database
+            revision: The revision stored in the sidecar
+
+        Returns:
+            The path to the matrix of the revision
+        """
+        return f"{os.path.splitext(file_path)[0]}.{revision}.npy"
+
+    @classmethod
+    def from_json(
+        cls, json_file_path: str, file_path: Optional[str] = None
+    ) -> "NumpyVectorDatabase":
+        """
+        Migrates a JSON vector database into a new NumpyVectorDatabase
+
+        Args:
+            json_file_path: The path to the JSON vector database
+            file_path: The path to save the vectors to, which defaults to
+                the JSON path with a .npy extension
+
+        Returns:
+            The saved NumpyVectorDatabase, which replaces any database at the same path
+
+        Raises:
+            FileNotFoundError: If the JSON vector database does not exist
+        """
+        if not os.path.exists(json_file_path):
+            raise FileNotFoundError(f"No vector database at {json_file_path}")
+        if file_path is None:
+            file_path = f"{os.path.splitext(json_file_path)[0]}.npy"
+
+        # Any changes still in the write ahead log of the JSON database are migrated as well
+        json_database = JSONVectorDatabase(json_file_path, write_ahead_log=True)
+        database = cls(file_path)
+        database.clear()
+        for embedding in json_database.data:
+            if embedding is not None:
+                database.add(embedding)
+        database.save()
+        logger.info(
+            f"Migrated {len(database.entries)} embeddings from {json_file_path} to {file_path}"
+        )
+        return database
+
+    def save(self):
+        """
+        Saves the vectors to the .npy file and the symbols to the sidecar, which drops
+        the tombstones of the discarded embeddings and renumbers the rows
+        """
+        live_entries = [entry for entry in self.entries if entry is not None]
+        dimension = self.dimension or 0
+        row_count = len(live_entries)
+        revision = uuid.uuid4().hex
+        # The matrix of a new revision is never read until the sidecar names it
+        matrix_path = NumpyVectorDatabase.get_matrix_path(self.file_path, revision)
+        temp_sidecar_path = f"{self.sidecar_path}.{os.getpid()}.tmp"
+
+        matrix = np.lib.format.open_memmap(
+            matrix_path, mode="w+", dtype=np.float32, shape=(row_count, dimension)
+        )
+        self._gather_vectors(live_entries, matrix)  # type: ignore
+        matrix.flush()
+        del matrix
+
+        entries = [{**entry, "row": row} for row, entry in enumerate(live_entries)]
+        with open(temp_sidecar_path, "w") as file:
+            json.dump(
+                {
+                    "format_version": NUMPY_VECTOR_DATABASE_FORMAT_VERSION,
+                    "revision": revision,
+                    "dimension": self.dimension,
+                    "row_count": row_count,
+                    "entries": entries,
+                },
+                file,
+            )
+        os.replace(temp_sidecar_path, self.sidecar_path)
+
+        previous_revision = self.revision
+        self.entries = list(entries)
+        self.index = {entry["dotpath"]: i for i, entry in enumerate(entries)}
+        self.tombstone_count = 0
+        self.appended_vectors = []
+        self._embeddings = {}
+        self._open_matrix(row_count, revision)
+        self.version = revision
+        if previous_revision is not None:
+            previous_matrix_path = NumpyVectorDatabase.get_matrix_path(
+                self.file_path, previous_revision
+            )
+            try:
+                os.remove(previous_matrix_path)
+            except OSError as e:
+                logger.warning(f"Failed to remove {previous_matrix_path} with error {e}")
+
+    @staticmethod
+    def read_version(file_path: str) -> Optional[str]:
+        """
+        Reads the version of a saved database without memory mapping its vectors
+
+        Args:
+            file_path: The path to the .npy file
+
+        Returns:
+            The revision stored in the sidecar, or None if the database was never saved
+        """
+        try:
+            with open(NumpyVectorDatabase.get_sidecar_path(file_path), "r") as file:
+                return json.load(file).get("revision")
+        except FileNotFoundError:
+            return None
+
+    def load(self):
+        """Loads the symbols from the sidecar and memory maps the vectors of the .npy file"""
+        try:
+            with open(self.sidecar_path, "r") as file:
+                payload = json.load(file)
+        except FileNotFoundError:
+            logger.info(f"Creating new vector embedding db at {self.file_path}")
+            return
+        if payload.get("format_version") != NUMPY_VECTOR_DATABASE_FORMAT_VERSION:
+            raise ValueError(
+                f"Unsupported vector database format version {payload.get('format_version')}"
+                f", expected {NUMPY_VECTOR_DATABASE_FORMAT_VERSION}"
+            )
+        self.entries = payload["entries"]
+        self.dimension = payload["dimension"]
+        self.appended_vectors = []
+        self._embeddings = {}
+        self._open_matrix(payload["row_count"], payload["revision"])
+        # We index on the dotpath of the symbol, which is unique and indepenent of commit hash
+        self.index = {entry["dotpath"]: i for i, entry in enumerate(payload["entries"])}
+        self.tombstone_count = 0
+        self.version = payload["revision"]
+
+    def add(self, embedding: SymbolEmbedding):
+        """
+        Adds a new vector to the database, replacing the vector of the symbol in place
+        if it is already in the database
+
+        Args:
+            embedding: The vector to add
+
+        Raises:
+            ValueError: If the vector does not match the dimension of the database
+        """
+        position = self.index.get(embedding.symbol.dotpath)
+        if position is None:
+            self.entries.append(self._to_entry(embedding))
+            self.index[embedding.symbol.dotpath] = len(self.entries) - 1
+        else:
+            self.entries[position] = self._to_entry(
+                embedding, self.entries[position]["row"]  # type: ignore
+            )
+        self._embeddings.pop(embedding.symbol.dotpath, None)
+        self.version = uuid.uuid4().hex
+
+    def update(self, embedding: SymbolEmbedding):
+        """
+        Updates an embedding in the database
+
+        Args:
+            embedding: The vector to update
+
+        Raises:
+            KeyError: If the symbol is not in the database
+            ValueError: If the vector does not match the dimension of the database
+        """
+        if embedding.symbol.dotpath not in self.index:
+            raise KeyError(f"Symbol {embedding.symbol} not in database")
+        position = self.index[embedding.symbol.dotpath]
+        self.entries[position] = self._to_entry(
+            embedding, self.entries[position]["row"]  # type: ignore
+        )
+        self._embeddings.pop(embedding.symbol.dotpath, None)
+        self.version = uuid.uuid4().hex
+
+    def discard(self, symbol: Symbol):
+        """
+        Discards a vector from the database
+
+        Args:
+            symbol: The symbol to discard
+
+        Raises:
+            KeyError: If the symbol is not in the database
+        """
+        if symbol.dotpath not in self.index:
+            raise KeyError(f"Symbol {symbol} not in database")
+        self.entries[self.index.pop(symbol.dotpath)] = None
+        self.tombstone_count += 1
+        self._embeddings.pop(symbol.dotpath, None)
+        self.version = uuid.uuid4().hex
+
+    def contains(self, symbol: Symbol) -> bool:
+        """
+        Checks if the database contains a vector for the given symbol
+
+        Args:
+            symbol: The symbol to check
+
+        Returns:
+            True if the database contains a vector for the given symbol, False otherwise
+        """
+        return symbol.dotpath in self.index
+
+    def get(self, symbol: Symbol) -> SymbolEmbedding:
+        """
+        Gets the vector for the given symbol
+
+        Args:
+            symbol: The symbol to get the vector for
+
+        Raises:
+            KeyError: If the symbol is not in the database
+        """
+        if symbol.dotpath not in self.index:
+            raise KeyError(f"Symbol {symbol} not in database")
+        embedding = self._embeddings.get(symbol.dotpath)
+        if embedding is None:
+            embedding = self._from_entry(self.entries[self.index[symbol.dotpath]])  # type: ignore
+            self._embeddings[symbol.dotpath] = embedding
+        return embedding
+
+    def clear(self):
+        """Removes all vectors from the database"""
+        self.matrix = np.zeros((0, 0), dtype=np.float32)
+        self.appended_vectors = []
+        self.entries = []
+        self.index = {}
+        self.tombstone_count = 0
+        self.dimension = None
+        self._embeddings = {}
+        self.version = uuid.uuid4().hex
+
+    def get_rows(self) -> Tuple[np.ndarray, Sequence[Optional[Symbol]]]:
+        """
+        Gets the vectors of every row, including the tombstones of discarded vectors
+
+        Returns:
+            The vectors stacked into a float32 matrix, with zeros for discarded rows,
+                and the symbol of each row, which is None for discarded rows. The matrix
+                is the read only memory mapped file when nothing changed since the last
+                load or save, and the symbols are only parsed as they are accessed
+        """
+        row_symbols = _RowSymbols(list(self.entries))
+        if not self.appended_vectors and self.tombstone_count == 0:
+            return self.matrix, row_symbols
+        matrix = np.zeros((len(self.entries), self.dimension or 0), dtype=np.float32)
+        positions = [position for position, entry in enumerate(self.entries) if entry is not None]
+        matrix[positions] = self._gather_vectors(
+            [self.entries[position] for position in positions]  # type: ignore
+        )
+        return matrix, row_symbols
+
+    def get_live_rows(self) -> np.ndarray:
+        """
+        Gets a mask of the rows which were not discarded, without parsing their symbols
+
+        Returns:
+            A boolean mask over the rows of get_rows
+        """
+        return np.array([entry is not None for entry in self.entries], dtype=bool)
+
+    def get_all_symbols(self) -> List[Symbol]:
+        """
+        Gets all symbols in the database
+
+        Returns:
+            A list of all symbols in the database
+        """
+        return [
+            parse_symbol(self.entries[self.index[dotpath]]["uri"])  # type: ignore
+            for dotpath in sorted(self.index)
+        ]
+
+    def _open_matrix(self, row_count: int, revision: str) -> None:
+        """
+        Memory maps the saved vectors of a revision
+
+        Args:
+            row_count: The number of rows the sidecar expects the .npy file to hold
+            revision: The revision stored in the sidecar
+
+        Raises:
+            ValueError: If the .npy file of the revision is missing or does not hold
+                the expected rows
+        """
+        self.revision = revision
+        if row_count == 0:
+            self.matrix = np.zeros((0, self.dimension or 0), dtype=np.float32)
+            return
+        matrix_path = NumpyVectorDatabase.get_matrix_path(self.file_path, revision)
+        try:
+            matrix = np.load(matrix_path, mmap_mode="r")
+        except FileNotFoundError:
+            raise ValueError(f"The vectors of revision {revision} are missing at {matrix_path}")
+        if matrix.shape != (row_count, self.dimension) or matrix.dtype != np.float32:
+            raise ValueError(
+                f"The vectors at {matrix_path} have shape {matrix.shape} and type "
+                f"{matrix.dtype}, expected ({row_count}, {self.dimension}) and float32"
+            )
+        self.matrix = matrix
+
+    def _gather_vectors(
+        self, entries: List[Dict[str, Any]], out: Optional[np.ndarray] = None
+    ) -> np.ndarray:
+        """
+        Gathers the stored vectors of a list of entries into a matrix
+
+        Args:
+            entries: The sidecar entries of the vectors
+            out: The matrix to write the vectors into, which is allocated if not given
+
+        Returns:
+            The matrix, with the vector of each entry in order
+        """
+        if out is None:
+            out = np.zeros((len(entries), self.dimension or 0), dtype=np.float32)
+        saved_row_count = self.matrix.shape[0]
+        rows = np.array([entry["row"] for entry in entries], dtype=np.int64)
+        saved_positions = np.flatnonzero(rows < saved_row_count)
+        if saved_positions.size:
+            out[saved_positions] = self.matrix[rows[saved_positions]]
+        for position in np.flatnonzero(rows >= saved_row_count):
+            out[position] = self.appended_vectors[rows[position] - saved_row_count]
+        return out
+
+    def _get_vector(self, row: int) -> np.ndarray:
+        """
+        Gets a stored vector
+
+        Args:
+            row: The storage row of the vector
+
+        Returns:
+            The vector, which is a view of the memory mapped matrix for saved rows
+        """
+        saved_row_count = self.matrix.shape[0]
+        if row < saved_row_count:
+            return self.matrix[row]
+        return self.appended_vectors[row - saved_row_count]
+
+    def _to_entry(self, embedding: SymbolEmbedding, row: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Stores the vector of an embedding and gets the sidecar entry describing it
+
+        Args:
+            embedding: The embedding to store
+            row: The storage row of the vector being replaced, which is overwritten in place
+                unless it is a saved row, as those are read only until the next save
+
+        Returns:
+            The sidecar entry of the embedding
+
+        Raises:
+            ValueError: If the vector does not match the dimension of the database
+        """
+        vector = np.asarray(embedding.vector, dtype=np.float32).reshape(-1)
+        if self.dimension is None:
+            self.dimension = vector.shape[0]
+        elif vector.shape[0] != self.dimension:
+            raise ValueError(
+                f"Embedding of {embedding.symbol} has dimension {vector.shape[0]}"
+                f", expected {self.dimension}"
+            )
+        saved_row_count = self.matrix.shape[0]
+        if row is not None and row >= saved_row_count:
+            self.appended_vectors[row - saved_row_count] = vector
+        else:
+            self.appended_vectors.append(vector)
+            row = saved_row_count + len(self.appended_vectors) - 1
+        attributes = {
+            name: value
+            for name, value in vars(embedding).items()
+            if name not in ("symbol", "vector")
+        }
+        return {
+            "uri": embedding.symbol.uri,
+            "dotpath": embedding.symbol.dotpath,
+            "type": type(embedding).__name__,
+            "row": row,
+            "attributes": attributes,
+        }
+
+    def _from_entry(self, entry: Dict[str, Any]) -> SymbolEmbedding:
+        """
+        Rebuilds an embedding from its sidecar entry
+
+        Args:
+            entry: The sidecar entry of the embedding
+
+        Returns:
+            The embedding, whose vector is read from the stored row
+        """
+        embedding = NumpyVectorDatabase.EMBEDDING_TYPES[entry["type"]].__new__(
+            NumpyVectorDatabase.EMBEDDING_TYPES[entry["type"]]
+        )
+        embedding.__dict__.update(entry["attributes"])
+        embedding.symbol = parse_symbol(entry["uri"])
+        embedding.vector = self._get_vector(entry["row"])
+        return embedding
+
+
+def load_vector_database(file_path: str) -> VectorDatabaseProvider:
+    """
+    Loads the vector database at a path, choosing the provider from its extension
+
+    Args:
+        file_path: The path to the vector database, a .npy file for a NumpyVectorDatabase
+            and a JSON file for a JSONVectorDatabase
+
+    Returns:
+        The loaded vector database
+    """
+    if os.path.splitext(file_path)[1] == ".npy":
+        return NumpyVectorDatabase(file_path)
+    return JSONVectorDatabase(file_path)
+
+
+def read_vector_database_version(file_path: str) -> Optional[str]:
+    """
+    Reads the version of the vector database at a path without loading it
+
+    Args:
+        file_path: The path to the vector database, as for load_vector_database
+
+    Returns:
+        The version the database has once it is loaded, or None if it is unknown
+    """
+    if os.path.splitext(file_path)[1] == ".npy":
+        return NumpyVectorDatabase.read_version(file_path)
+    return JSONVectorDatabase.read_version(file_path)
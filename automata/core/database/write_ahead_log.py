@@ -0,0 +1,96 @@
+import json
+import logging
+import os
+from typing import IO, Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+"""
+A WriteAheadLog is an append-only file of JSON records, one per line, which a database
+writes each change to instead of rewriting its whole snapshot. Every record is flushed
+and fsynced before the append returns, so a crash loses at most the record being
+written, and a torn final line left by such a crash is cut off on the next replay.
+Compacting the database writes a fresh snapshot and then truncates the log, and as
+replaying a record twice leaves the database unchanged, a crash between the two steps
+is also recovered from.
+"""
+
+DEFAULT_COMPACTION_THRESHOLD = 1000
+
+
+class WriteAheadLog:
+    """
+    An append-only log of JSON records
+    """
+
+    def __init__(self, file_path: str, sync: bool = True) -> None:
+        """
+        Args:
+            file_path (str): The path of the log file
+            sync (bool): Whether to fsync the log after every append
+        """
+        self.file_path = file_path
+        self.sync = sync
+        self.record_count = 0
+        self._file: Optional[IO[str]] = None
+
+    def append(self, record: Dict[str, Any]) -> None:
+        """
+        Appends a record to the log
+
+        Args:
+            record (Dict[str, Any]): The JSON serializable record
+        """
+        if self._file is None:
+            self._file = open(self.file_path, "a")
+        self._file.write(json.dumps(record) + "\n")
+        self._file.flush()
+        if self.sync:
+            os.fsync(self._file.fileno())
+        self.record_count += 1
+
+    def replay(self) -> List[Dict[str, Any]]:
+        """
+        Reads the records of the log, cutting off a torn final record
+
+        Returns:
+            List[Dict[str, Any]]: The records, in the order they were appended
+        """
+        self.close()
+        records: List[Dict[str, Any]] = []
+        if not os.path.exists(self.file_path):
+            self.record_count = 0
+            return records
+
+        valid_size = 0
+        with open(self.file_path, "rb") as f:
+            for line in f:
+                try:
+                    if not line.endswith(b"\n"):
+                        raise ValueError("The record is incomplete")
+                    records.append(json.loads(line))
+                except ValueError as e:
+                    logger.warning(
+                        f"Discarding the log {self.file_path} from byte {valid_size}, "
+                        f"as its record could not be read: {e}"
+                    )
+                    break
+                valid_size += len(line)
+        if valid_size != os.path.getsize(self.file_path):
+            with open(self.file_path, "r+b") as f:
+                f.truncate(valid_size)
+        self.record_count = len(records)
+        return records
+
+    def truncate(self) -> None:
+        """Removes every record from the log"""
+        self.close()
+        if os.path.exists(self.file_path):
+            os.remove(self.file_path)
+        self.record_count = 0
+
+    def close(self) -> None:
+        """Closes the log file, which is reopened by the next append"""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
@@ -86,13 +86,11 @@ class SymbolCodeEmbeddingHandler(SymbolEmbeddingHandler):
         existing_embedding = self.embedding_db.get(symbol)
         if existing_embedding.embedding_source != source_code:
             logger.debug("Building a new embedding for %s", symbol)
-            self.embedding_db.discard(symbol)
             symbol_embedding = self.build_embedding(source_code, symbol)
-            self.embedding_db.add(symbol_embedding)
+            self.embedding_db.update(symbol_embedding)
         elif existing_embedding.symbol != symbol:
             logger.debug("Updating the embedding for %s", symbol)
-            self.embedding_db.discard(symbol)
             existing_embedding.symbol = symbol
-            self.embedding_db.add(existing_embedding)
+            self.embedding_db.update(existing_embedding)
         else:
             logger.debug("Passing for %s", symbol)
@@ -205,9 +205,8 @@ class SymbolDocEmbeddingHandler(SymbolEmbeddingHandler):
             logger.debug(
                 f"Rolling forward the embedding for {existing_embedding.symbol} to {symbol}"
             )
-            self.embedding_db.discard(symbol)
             existing_embedding.symbol = symbol
             existing_embedding.source_code = source_code
-            self.embedding_db.add(existing_embedding)
+            self.embedding_db.update(existing_embedding)
         else:
             logger.debug("Passing for %s", symbol)
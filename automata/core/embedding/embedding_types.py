@@ -1,23 +1,17 @@
 import abc
 import logging
-from enum import Enum
 from typing import Any, Dict, List
 
 import numpy as np
 
 from automata.core.database.vector import VectorDatabaseProvider
+from automata.core.embedding.normalization import NormType  # noqa: F401
 from automata.core.symbol.symbol_types import Symbol
 from automata.core.utils import set_openai_api_key
 
 logger = logging.getLogger(__name__)
 
 
-class NormType(Enum):
-    L1 = "l1"
-    L2 = "l2"
-    SOFTMAX = "softmax"
-
-
 class EmbeddingProvider(abc.ABC):
     """A class to provide embeddings for symbols"""
 
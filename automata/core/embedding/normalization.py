@@ -0,0 +1,30 @@
+from enum import Enum
+
+import numpy as np
+
+
+class NormType(Enum):
+    L1 = "l1"
+    L2 = "l2"
+    SOFTMAX = "softmax"
+
+
+def normalize_embeddings(embeddings: np.ndarray, norm_type: NormType) -> np.ndarray:
+    """
+    Normalize the embeddings.
+    Args:
+        embeddings (np.ndarray): The embeddings, one per row
+        norm_type (NormType): The type of normalization (L1, L2, or softmax)
+    Returns:
+        The normalized embeddings
+    """
+    if norm_type == NormType.L1:
+        norm = np.sum(np.abs(embeddings), axis=1, keepdims=True)
+        return embeddings / norm
+    elif norm_type == NormType.L2:
+        return embeddings / np.linalg.norm(embeddings, axis=1, keepdims=True)
+    elif norm_type == NormType.SOFTMAX:
+        e_x = np.exp(embeddings - np.max(embeddings, axis=1, keepdims=True))
+        return e_x / np.sum(e_x, axis=1, keepdims=True)
+    else:
+        raise ValueError(f"Invalid normalization type {norm_type}")
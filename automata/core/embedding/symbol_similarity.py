@@ -1,12 +1,14 @@
 import logging
-from typing import Dict, List, Optional, Set
+from typing import Dict, List, Optional, Set, Tuple
 
 import numpy as np
 
+from automata.core.database.ivf_index import IVFFlatIndex, IVFFlatIndexConfig
 from automata.core.embedding.embedding_types import SymbolEmbeddingHandler
 from automata.core.symbol.symbol_types import Symbol
 
-from .embedding_types import EmbeddingProvider, EmbeddingSimilarity, NormType
+from .embedding_types import EmbeddingProvider, EmbeddingSimilarity
+from .normalization import NormType
 
 logger = logging.getLogger(__name__)
 
@@ -16,6 +18,8 @@ class SymbolSimilarity(EmbeddingSimilarity):
         self,
         symbol_embedding_manager: SymbolEmbeddingHandler,
         norm_type: NormType = NormType.L2,
+        ann_index_config: Optional[IVFFlatIndexConfig] = None,
+        ann_index_path: Optional[str] = None,
     ) -> None:
         """
         Initialize SymbolSimilarity
@@ -23,6 +27,11 @@ class SymbolSimilarity(EmbeddingSimilarity):
         Args:
             symbol_embedding_manager: A CodeEmbeddingManager
             norm_type (NormType): The norm type to use for calculating similarity
+            ann_index_config (Optional[IVFFlatIndexConfig]): The configuration of the
+                approximate nearest neighbour index used by get_nearest_entries_for_query,
+                or None to always search exactly
+            ann_index_path (Optional[str]): The path the index is persisted to by
+                build_ann_index and loaded from by queries, or None to only keep it in memory
 
         Returns:
             An instance of SymbolSimilarity
@@ -34,6 +43,15 @@ class SymbolSimilarity(EmbeddingSimilarity):
         self.index_to_symbol = dict(enumerate(supported_symbols))
         self.symbol_to_index = {symbol: i for i, symbol in enumerate(supported_symbols)}
         self.available_symbols: Optional[Set[Symbol]] = None
+        # The database mask of the available symbols, with the database version it was built for
+        self._candidate_mask: Optional[Tuple[str, np.ndarray]] = None
+        if ann_index_config is not None:
+            IVFFlatIndexConfig.validate_config(ann_index_config)
+        self.ann_index_config = ann_index_config
+        self.ann_index_path = ann_index_path
+        self._ann_index: Optional[IVFFlatIndex] = None
+        # The database version the persisted index was last looked up for
+        self._ann_index_lookup_version: Optional[str] = None
 
     def set_available_symbols(self, available_symbols: Set[Symbol]) -> None:
         """
@@ -44,6 +62,7 @@ class SymbolSimilarity(EmbeddingSimilarity):
                 use for similarity calculation
         """
         self.available_symbols = available_symbols
+        self._candidate_mask = None
 
     def get_available_symbols(self) -> List[Symbol]:
         """
@@ -72,17 +91,17 @@ class SymbolSimilarity(EmbeddingSimilarity):
         query_embedding = self.embedding_provider.build_embedding(query_text)
 
         # Compute the similarity of the query to all symbols
-        similarity_scores = self._calculate_query_similarity_vec(query_embedding)
-
-        return {
-            self.index_to_symbol[i]: similarity_scores[i]
-            for i in range(len(self.index_to_symbol))
-            if (not self.available_symbols) or self.index_to_symbol[i] in self.available_symbols
-        }
+        return self.embedding_handler.embedding_db.calculate_similarity(
+            query_embedding,
+            self.norm_type,
+            candidate_mask=self._get_candidate_mask() if self.available_symbols else None,
+        )
 
     def get_nearest_entries_for_query(self, query_text: str, k: int = 10) -> Dict[Symbol, float]:
         """
-        Get the k most similar symbols to the query_text
+        Get the k most similar symbols to the query_text, which are approximate
+        when an index of the current database was built and the database holds at
+        least min_rows vectors, and exact otherwise
         Args:
             query_text (str): The query text
             k (int): The number of similar symbols to return
@@ -90,82 +109,85 @@ class SymbolSimilarity(EmbeddingSimilarity):
             A dictionary mapping the k most similar symbols to their similarity score
         """
         query_embedding = self.embedding_provider.build_embedding(query_text)
-        # Compute the similarity of the query to all symbols
-        similarity_scores = self._calculate_query_similarity_vec(query_embedding)
-
-        if self.available_symbols is not None:
-            # Filter the indices by available symbols
-            available_indices = [
-                i
-                for i in range(len(self.index_to_symbol))
-                if self.index_to_symbol[i] in self.available_symbols
-            ]
-            # Get the similarity scores for the available symbols
-            available_similarity_scores = similarity_scores[available_indices]
-            # Get the indices of the k symbols with the highest similarity scores among the available symbols
-            top_k_indices_in_available = np.argsort(available_similarity_scores)[-k:]
-            # Convert these indices back to the indices in the original list of symbols
-            top_k_indices = [available_indices[i] for i in top_k_indices_in_available]
-        else:
-            # Get the indices of the k symbols with the highest similarity scores
-            top_k_indices = list(np.argsort(similarity_scores)[-k:])
-
-        # Return the corresponding symbols
-        return {
-            self.index_to_symbol[index]: similarity_scores[index]
-            for index in reversed(top_k_indices)
-        }
-
-    def _get_ordered_embeddings(self) -> np.ndarray:
-        """
-        Get the embeddings in the correct order
-
-        Returns:
-            A numpy array containing the ordered embeddings
-        """
-        return np.array(
-            [
-                self.embedding_handler.get_embedding(symbol).vector
-                for symbol in self.index_to_symbol.values()
-            ]
+        # Compute the similarity of the query to the available symbols and keep the top k
+        return self.embedding_handler.embedding_db.calculate_similarity(
+            query_embedding,
+            self.norm_type,
+            top_k=k,
+            candidate_mask=self._get_candidate_mask()
+            if self.available_symbols is not None
+            else None,
+            ann_index=self._get_ann_index(),
         )
 
-    def _calculate_query_similarity_vec(self, query_embedding: np.ndarray) -> np.ndarray:
+    def build_ann_index(self) -> Optional[IVFFlatIndex]:
         """
-        Calculate the similarity scores of the query embedding with all symbol embeddings
-        Args:
-            query_embedding (np.ndarray): The query embedding
-            norm_type (str): The type of normalization ('l2' for L2 norm, 'softmax' for softmax)
-        Returns:
-            A numpy array containing the similarity scores
-        """
-        embeddings = self._get_ordered_embeddings()
+        Build the approximate nearest neighbour index of the current database and
+        persist it to ann_index_path. Building clusters every vector, so this belongs
+        where the database is saved, e.g. at the end of the embedding scripts, rather
+        than on the query path
 
-        # Normalize the embeddings and the query embedding
-        embeddings_norm = self._normalize_embeddings(embeddings, self.norm_type)
-        query_embedding_norm = self._normalize_embeddings(
-            query_embedding[np.newaxis, :], self.norm_type
-        )[0]
+        Returns:
+            The index, or None if no index is configured or the database holds
+                fewer than min_rows vectors
+        """
+        embedding_db = self.embedding_handler.embedding_db
+        if (
+            self.ann_index_config is None
+            or len(embedding_db.index) < self.ann_index_config.min_rows
+        ):
+            return None
+        self._ann_index = IVFFlatIndex.build(embedding_db, self.norm_type, self.ann_index_config)
+        if self.ann_index_path is not None:
+            self._ann_index.save(self.ann_index_path)
+        return self._ann_index
+
+    def _get_ann_index(self) -> Optional[IVFFlatIndex]:
+        """
+        Get the approximate nearest neighbour index of the current database, which is
+        the last built index or the persisted one. The index is never built here, so
+        once the database changes, queries search exactly until the index is rebuilt
 
-        return np.dot(embeddings_norm, query_embedding_norm)
+        Returns:
+            The index, or None if the database is searched exactly
+        """
+        embedding_db = self.embedding_handler.embedding_db
+        if (
+            self.ann_index_config is None
+            or len(embedding_db.index) < self.ann_index_config.min_rows
+        ):
+            return None
+        if self._ann_index is not None and self._ann_index.version == embedding_db.version:
+            return self._ann_index
+        # The persisted index is only looked up once for each version of the database
+        if (
+            self.ann_index_path is not None
+            and self._ann_index_lookup_version != embedding_db.version
+        ):
+            self._ann_index_lookup_version = embedding_db.version
+            ann_index = IVFFlatIndex.load_if_fresh(
+                self.ann_index_path,
+                embedding_db.version,
+                self.norm_type,
+                self.ann_index_config.n_probe,
+            )
+            if ann_index is not None:
+                self._ann_index = ann_index
+                return ann_index
+        return None
+
+    def _get_candidate_mask(self) -> np.ndarray:
+        """
+        Get the database mask of the available symbols, which is rebuilt
+        whenever the database changes
 
-    @staticmethod
-    def _normalize_embeddings(embeddings: np.ndarray, norm_type: NormType) -> np.ndarray:
-        """
-        Normalize the embeddings.
-        Args:
-            embeddings (np.ndarray): The embeddings
-            norm_type (NormType): The type of normalization (L1, L2, or softmax)
         Returns:
-            The normalized embeddings
-        """
-        if norm_type == NormType.L1:
-            norm = np.sum(np.abs(embeddings), axis=1, keepdims=True)
-            return embeddings / norm
-        elif norm_type == NormType.L2:
-            return embeddings / np.linalg.norm(embeddings, axis=1, keepdims=True)
-        elif norm_type == NormType.SOFTMAX:
-            e_x = np.exp(embeddings - np.max(embeddings, axis=1, keepdims=True))
-            return e_x / np.sum(e_x, axis=1, keepdims=True)
-        else:
-            raise ValueError(f"Invalid normalization type {norm_type}")
+            A boolean mask over the rows of the embedding database
+        """
+        embedding_db = self.embedding_handler.embedding_db
+        if self._candidate_mask is None or self._candidate_mask[0] != embedding_db.version:
+            self._candidate_mask = (
+                embedding_db.version,
+                embedding_db.get_candidate_mask(self.available_symbols or set()),
+            )
+        return self._candidate_mask[1]
@@ -0,0 +1,441 @@
+import ast
+import json
+import logging
+import os
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple, Type, Union
+
+from automata.core.coding.py_coding.module_tree import LazyModuleTreeMap
+from automata.core.symbol.index_stream import compute_file_digest
+from automata.core.symbol.parser import parse_symbol
+from automata.core.symbol.scip_pb2 import Index, SymbolRole  # type: ignore
+from automata.core.symbol.symbol_types import Symbol, SymbolDescriptor
+from automata.core.symbol.symbol_utils import convert_to_fst_object
+
+logger = logging.getLogger(__name__)
+
+"""
+Bounding boxes give the extent of a class or method definition, and bound the scope
+in which the references of its dependencies are searched for.
+They mirror RedBaron's `absolute_bounding_box`, whose positions are 1-indexed,
+and whose bottom right line is exclusive of the definition's last line.
+They are measured from SCIP enclosing ranges where the indexer provides them,
+and otherwise from a single stdlib `ast` pass per file, falling back to RedBaron
+only for symbols the `ast` pass cannot measure.
+Measured bounding boxes can be persisted in a BoundingBoxCache sidecar, keyed per source
+file by content hash, so that only files which changed are measured again on the next start.
+"""
+
+BOUNDING_BOX_CACHE_FORMAT_VERSION = 1
+
+_DefinitionNode = Union[ast.ClassDef, ast.FunctionDef, ast.AsyncFunctionDef]
+
+
+@dataclass(frozen=True)
+class Position:
+    """A 1-indexed position in a source file"""
+
+    line: int
+    column: int
+
+
+@dataclass(frozen=True)
+class BoundingBox:
+    """The extent of a definition in a source file"""
+
+    top_left: Position
+    bottom_right: Position
+
+    @classmethod
+    def from_scip_range(cls, scip_range: Sequence[int]) -> "BoundingBox":
+        """
+        Converts a SCIP range into a bounding box
+
+        Args:
+            scip_range (Sequence[int]): A 0-indexed [start_line, start_character,
+                end_line, end_character] range, or [start_line, start_character,
+                end_character] for a single line range
+
+        Returns:
+            BoundingBox: The equivalent bounding box
+        """
+        if len(scip_range) == 3:
+            start_line, start_column, end_column = scip_range
+            end_line = start_line
+        else:
+            start_line, start_column, end_line, end_column = scip_range
+        return cls(Position(start_line + 1, start_column + 1), Position(end_line + 2, end_column))
+
+    @classmethod
+    def from_ast_node(cls, node: _DefinitionNode, source_lines: List[str]) -> "BoundingBox":
+        """
+        Converts the extent of an ast definition into a bounding box
+
+        Args:
+            node (_DefinitionNode): A class or function definition
+            source_lines (List[str]): The lines of the source file holding the definition
+
+        Returns:
+            BoundingBox: The bounding box of the definition, including its decorators
+
+        Note:
+            Like RedBaron, the definition absorbs the blank and comment lines which follow it,
+            so its bottom right line is the line of the next statement.
+        """
+        start_line = node.decorator_list[0].lineno if node.decorator_list else node.lineno
+        end_line = node.end_lineno or node.lineno
+        while end_line < len(source_lines) and (
+            not source_lines[end_line].strip() or source_lines[end_line].lstrip().startswith("#")
+        ):
+            end_line += 1
+        return cls(
+            Position(start_line, node.col_offset + 1),
+            Position(end_line + 1, node.end_col_offset or 0),
+        )
+
+
+class BoundingBoxProvider:
+    """
+    Measures the bounding boxes of symbols, parsing each source file at most once
+    """
+
+    def __init__(self, module_map: Optional[LazyModuleTreeMap] = None) -> None:
+        """
+        Args:
+            module_map (Optional[LazyModuleTreeMap]): The module tree mapping used
+                to locate source files. Defaults to LazyModuleTreeMap.cached_default().
+        """
+        self._module_map = module_map
+        self._trees: Dict[str, Optional[Tuple[ast.Module, List[str]]]] = {}
+
+    @property
+    def module_map(self) -> LazyModuleTreeMap:
+        if self._module_map is None:
+            self._module_map = LazyModuleTreeMap.cached_default()
+        return self._module_map
+
+    def get_bounding_boxes(self, symbols: Iterable[Symbol]) -> Dict[Symbol, Any]:
+        """
+        Measures the bounding boxes of a collection of symbols
+
+        Args:
+            symbols (Iterable[Symbol]): The symbols to measure
+
+        Returns:
+            Dict[Symbol, Any]: The bounding box of each symbol which could be measured
+        """
+        bounding_boxes = {}
+        for symbol in symbols:
+            try:
+                bounding_boxes[symbol] = self.get_bounding_box(symbol)
+            except Exception as e:
+                logger.error(f"Error computing bounding box for {symbol.uri}: {e}")
+        return bounding_boxes
+
+    def get_bounding_box(self, symbol: Symbol) -> Any:
+        """
+        Measures the bounding box of a symbol
+
+        Args:
+            symbol (Symbol): The class or method symbol to measure
+
+        Returns:
+            Any: A BoundingBox, or RedBaron's bounding box when the ast pass falls back
+
+        Raises:
+            ValueError: If the symbol is not found
+        """
+        found_node = self._find_ast_node(symbol)
+        if found_node is None:
+            return convert_to_fst_object(symbol, self.module_map).absolute_bounding_box
+        node, source_lines = found_node
+        return BoundingBox.from_ast_node(node, source_lines)
+
+    def get_source_fpath(self, symbol: Symbol) -> Optional[str]:
+        """
+        Gets the path of the source file which defines a symbol
+
+        Args:
+            symbol (Symbol): The symbol to locate
+
+        Returns:
+            Optional[str]: The path of the symbol's module, or None if it is not in the module map
+        """
+        for descriptor in symbol.descriptors:
+            kind = SymbolDescriptor.convert_scip_to_python_suffix(descriptor.suffix)
+            if kind == SymbolDescriptor.PyKind.Module:
+                if descriptor.name not in self.module_map:
+                    return None
+                return os.path.normpath(
+                    self.module_map.get_module_fpath_by_dotpath(descriptor.name)
+                )
+        return None
+
+    def clear(self) -> None:
+        """Clears the parsed source files, e.g. after they changed on disk"""
+        self._trees.clear()
+
+    @staticmethod
+    def extract_enclosing_ranges(index: Index) -> Dict[Symbol, BoundingBox]:
+        """
+        Extracts the bounding boxes of definitions whose enclosing range is given by the index
+
+        Args:
+            index (Index): An Index object
+
+        Returns:
+            Dict[Symbol, BoundingBox]: The bounding box of each definition with an enclosing range
+        """
+        bounding_boxes = {}
+        for document in index.documents:
+            bounding_boxes.update(BoundingBoxProvider.extract_document_enclosing_ranges(document))
+        return bounding_boxes
+
+    @staticmethod
+    def extract_document_enclosing_ranges(document: Any) -> Dict[Symbol, BoundingBox]:
+        """
+        Extracts the bounding boxes of the definitions of a single document, so that
+        they can be collected while the document is decoded for another pass
+
+        Args:
+            document (Any): A Document object
+
+        Returns:
+            Dict[Symbol, BoundingBox]: The bounding box of each definition with an enclosing range
+        """
+        bounding_boxes = {}
+        for occurrence in document.occurrences:
+            if not occurrence.enclosing_range or not (
+                occurrence.symbol_roles & SymbolRole.Definition
+            ):
+                continue
+            try:
+                symbol = parse_symbol(occurrence.symbol)
+            except Exception as e:
+                logger.error(f"Parsing symbol {occurrence.symbol} failed with error {e}")
+                continue
+            bounding_boxes[symbol] = BoundingBox.from_scip_range(occurrence.enclosing_range)
+        return bounding_boxes
+
+    def _find_ast_node(self, symbol: Symbol) -> Optional[Tuple[_DefinitionNode, List[str]]]:
+        """
+        Finds the ast definition of a symbol, resolving its descriptors like convert_to_fst_object
+
+        Args:
+            symbol (Symbol): The symbol to find
+
+        Returns:
+            Optional[Tuple[_DefinitionNode, List[str]]]: The definition and the lines of its
+                source file, or None if the ast pass cannot measure it
+
+        Raises:
+            ValueError: If the symbol is not found
+        """
+        node: Optional[ast.AST] = None
+        source_lines: List[str] = []
+        for descriptor in symbol.descriptors:
+            kind = SymbolDescriptor.convert_scip_to_python_suffix(descriptor.suffix)
+            if kind == SymbolDescriptor.PyKind.Module:
+                if descriptor.name not in self.module_map:
+                    raise ValueError(f"Module descriptor {descriptor.name} not found")
+                parsed_module = self._load_tree(descriptor.name)
+                if parsed_module is None:
+                    return None
+                node, source_lines = parsed_module
+            elif kind == SymbolDescriptor.PyKind.Class:
+                if not node:
+                    raise ValueError("Class descriptor found without module descriptor")
+                node = BoundingBoxProvider._find_first(node, (ast.ClassDef,), descriptor.name)
+            elif kind == SymbolDescriptor.PyKind.Method:
+                if not node:
+                    raise ValueError("Method descriptor found without module or class descriptor")
+                node = BoundingBoxProvider._find_first(
+                    node, (ast.FunctionDef, ast.AsyncFunctionDef), descriptor.name
+                )
+        if not node:
+            raise ValueError(f"Symbol {symbol} not found")
+        if isinstance(node, ast.Module):
+            # Module extents follow RedBaron's whitespace rules at both ends, so they are not measured
+            return None
+        return node, source_lines  # type: ignore
+
+    def _load_tree(self, module_dotpath: str) -> Optional[Tuple[ast.Module, List[str]]]:
+        """
+        Parses the source file of a module, once per provider
+
+        Args:
+            module_dotpath (str): The dotpath of the module
+
+        Returns:
+            Optional[Tuple[ast.Module, List[str]]]: The parsed module and its source lines,
+                or None if it could not be parsed
+        """
+        if module_dotpath not in self._trees:
+            try:
+                module_fpath = self.module_map.get_module_fpath_by_dotpath(module_dotpath)
+                with open(module_fpath) as f:
+                    source = f.read()
+                self._trees[module_dotpath] = (ast.parse(source), source.splitlines())
+            except Exception as e:
+                logger.debug(f"Falling back to RedBaron for {module_dotpath}: {e}")
+                self._trees[module_dotpath] = None
+        return self._trees[module_dotpath]
+
+    @staticmethod
+    def _find_first(
+        node: ast.AST, node_types: Tuple[Type[ast.AST], ...], name: str
+    ) -> Optional[ast.AST]:
+        """
+        Finds the first descendant definition with a given name, in source order,
+        which matches the depth-first search of RedBaron's `find`
+
+        Args:
+            node (ast.AST): The node to search under
+            node_types (Tuple[Type[ast.AST], ...]): The definition types to match
+            name (str): The name of the definition
+
+        Returns:
+            Optional[ast.AST]: The definition, or None if it is not found
+        """
+        stack = list(reversed(list(ast.iter_child_nodes(node))))
+        while stack:
+            child = stack.pop()
+            if isinstance(child, node_types) and getattr(child, "name", None) == name:
+                return child
+            stack.extend(reversed(list(ast.iter_child_nodes(child))))
+        return None
+
+
+class BoundingBoxCache:
+    """
+    A sidecar cache of measured bounding boxes, keyed per source file by content hash
+    """
+
+    def __init__(self, files: Optional[Dict[str, Dict[str, Any]]] = None) -> None:
+        """
+        Args:
+            files (Optional[Dict[str, Dict[str, Any]]]): The cached entry of each source file,
+                holding its content digest and the bounding box of each measured symbol URI
+        """
+        self.files = files or {}
+        self.is_dirty = False
+
+    def get_bounding_boxes(
+        self, symbols: Iterable[Symbol], provider: BoundingBoxProvider
+    ) -> Dict[Symbol, Any]:
+        """
+        Gets the bounding boxes of a collection of symbols, only measuring the symbols whose
+        source file changed, or which were never measured
+
+        Args:
+            symbols (Iterable[Symbol]): The symbols to get bounding boxes for
+            provider (BoundingBoxProvider): The provider which measures cache misses
+
+        Returns:
+            Dict[Symbol, Any]: The bounding box of each symbol which could be measured
+        """
+        symbols_by_fpath: Dict[Optional[str], List[Symbol]] = {}
+        for symbol in symbols:
+            symbols_by_fpath.setdefault(provider.get_source_fpath(symbol), []).append(symbol)
+
+        bounding_boxes: Dict[Symbol, Any] = {}
+        for fpath, fpath_symbols in symbols_by_fpath.items():
+            try:
+                if fpath is None:
+                    raise FileNotFoundError("The symbols are not in the module map")
+                digest = compute_file_digest(fpath)
+            except OSError:
+                # Symbols without a readable source file are measured, but never cached
+                bounding_boxes.update(provider.get_bounding_boxes(fpath_symbols))
+                continue
+
+            entry = self.files.get(fpath)
+            if entry is None or entry["digest"] != digest:
+                entry = {"digest": digest, "bounding_boxes": {}}
+                self.files[fpath] = entry
+            cached_boxes = entry["bounding_boxes"]
+
+            missing_symbols = [
+                symbol for symbol in fpath_symbols if symbol.uri not in cached_boxes
+            ]
+            if missing_symbols:
+                measured_boxes = provider.get_bounding_boxes(missing_symbols)
+                for symbol in missing_symbols:
+                    # Symbols which cannot be measured are cached too, so they are not retried
+                    cached_boxes[symbol.uri] = (
+                        BoundingBoxCache._encode(measured_boxes[symbol])
+                        if symbol in measured_boxes
+                        else None
+                    )
+                self.is_dirty = True
+
+            for symbol in fpath_symbols:
+                if cached_boxes[symbol.uri] is not None:
+                    bounding_boxes[symbol] = BoundingBoxCache._decode(cached_boxes[symbol.uri])
+        return bounding_boxes
+
+    def save(self, path: str) -> None:
+        """
+        Saves the cache to disk, through a temporary file so that readers never see a partial write
+
+        Args:
+            path (str): The path to save the cache to
+        """
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, "w") as f:
+            json.dump(
+                {"format_version": BOUNDING_BOX_CACHE_FORMAT_VERSION, "files": self.files}, f
+            )
+        os.replace(temp_path, path)
+        self.is_dirty = False
+
+    @classmethod
+    def load(cls, path: str) -> "BoundingBoxCache":
+        """
+        Loads the cache from disk
+
+        Args:
+            path (str): The path to load the cache from
+
+        Returns:
+            BoundingBoxCache: The loaded cache, or an empty one if it is missing or unreadable
+        """
+        if not os.path.exists(path):
+            return cls()
+        try:
+            with open(path) as f:
+                contents = json.load(f)
+            if contents.get("format_version") != BOUNDING_BOX_CACHE_FORMAT_VERSION:
+                logger.info(f"Discarding bounding box cache at {path} with an old format")
+                return cls()
+            return cls(contents["files"])
+        except Exception as e:
+            logger.warning(f"Failed to load bounding box cache at {path} with error {e}")
+            return cls()
+
+    @staticmethod
+    def default_path(index_path: str) -> str:
+        """
+        Gets the default bounding box cache path for an index
+
+        Args:
+            index_path (str): The path to the index protobuf file
+
+        Returns:
+            str: The path of the bounding box cache
+        """
+        return f"{index_path}.bounding_boxes.json"
+
+    @staticmethod
+    def _encode(bounding_box: Any) -> List[int]:
+        return [
+            bounding_box.top_left.line,
+            bounding_box.top_left.column,
+            bounding_box.bottom_right.line,
+            bounding_box.bottom_right.column,
+        ]
+
+    @staticmethod
+    def _decode(encoded_bounding_box: List[int]) -> BoundingBox:
+        top_line, top_column, bottom_line, bottom_column = encoded_bounding_box
+        return BoundingBox(Position(top_line, top_column), Position(bottom_line, bottom_column))
@@ -0,0 +1,219 @@
+import logging
+from typing import Dict, List, Optional, Union
+
+import numpy as np
+
+from automata.core.symbol.parser import parse_symbol
+from automata.core.symbol.snapshot import (
+    EDGE_LABELS,
+    SymbolGraphSnapshot,
+    decode_symbol_roles,
+)
+from automata.core.symbol.symbol_types import Symbol, SymbolReference
+
+logger = logging.getLogger(__name__)
+
+"""
+A CompactSymbolGraph is a read-optimized, array-backed storage engine for a symbol graph.
+Every node is addressed by an integer id, and every edge label gets its own CSR adjacency
+    - `indptr[node]:indptr[node + 1]` indexes the out-edges of a node in the edge columns,
+    - `in_indptr[node]:in_indptr[node + 1]` indexes `in_order`, a permutation of the
+        edge columns which groups the in-edges of each node,
+while the per-edge data (reference file id, line, column, role bitmask) is held as
+struct-of-arrays columns rather than one Python dict and SymbolReference per edge.
+Symbols are only parsed when a query returns them, and are cached afterwards.
+"""
+
+_NODE_LABEL_CODES = {"file": 1, "symbol": 2}
+
+
+class _LabelAdjacency:
+    """
+    The CSR adjacency and edge columns of a single edge label
+    """
+
+    def __init__(self, node_count: int, columns: Dict[str, np.ndarray]) -> None:
+        """
+        Args:
+            node_count (int): The number of nodes in the graph
+            columns (Dict[str, np.ndarray]): The edge columns, including source and target
+        """
+        order = np.argsort(columns["source"], kind="stable")
+        self.columns = {name: values[order] for name, values in columns.items()}
+        self.indptr = self._build_indptr(self.columns["source"], node_count)
+        # The in-edges of each node keep the order they had in the snapshotted graph
+        self.in_order = np.lexsort((self.columns["in_position"], self.columns["target"])).astype(
+            np.int32
+        )
+        self.in_indptr = self._build_indptr(self.columns["target"], node_count)
+
+    def out_positions(self, node_id: int) -> range:
+        """
+        Gets the positions of the out-edges of a node in the edge columns
+
+        Args:
+            node_id (int): The source node id
+
+        Returns:
+            range: The positions of the node's out-edges
+        """
+        return range(self.indptr[node_id], self.indptr[node_id + 1])
+
+    def in_positions(self, node_id: int) -> np.ndarray:
+        """
+        Gets the positions of the in-edges of a node in the edge columns
+
+        Args:
+            node_id (int): The target node id
+
+        Returns:
+            np.ndarray: The positions of the node's in-edges
+        """
+        return self.in_order[self.in_indptr[node_id] : self.in_indptr[node_id + 1]]
+
+    @staticmethod
+    def _build_indptr(node_ids: np.ndarray, node_count: int) -> np.ndarray:
+        indptr = np.zeros(node_count + 1, dtype=np.int64)
+        np.cumsum(np.bincount(node_ids, minlength=node_count), out=indptr[1:])
+        return indptr
+
+
+class CompactSymbolGraph:
+    """
+    An integer-id, CSR-backed encoding of a symbol graph, built from a SymbolGraphSnapshot
+    """
+
+    def __init__(self, snapshot: SymbolGraphSnapshot) -> None:
+        """
+        Args:
+            snapshot (SymbolGraphSnapshot): The snapshot of the graph to encode
+        """
+        self.strings = snapshot.strings
+        self.node_is_symbol = snapshot.node_is_symbol
+        self.node_label = snapshot.node_label
+        self.node_ids: Dict[str, int] = {string: i for i, string in enumerate(self.strings)}
+        self.adjacency: Dict[str, _LabelAdjacency] = {
+            label: _LabelAdjacency(len(self.strings), snapshot.edges[label])
+            for label in EDGE_LABELS
+        }
+        self._nodes: List[Optional[Union[Symbol, str]]] = [None] * len(self.strings)
+        self._roles_cache: Dict[int, Dict[str, bool]] = {}
+
+    def to_snapshot(
+        self, index_digest: str, build_caller_relationships: bool, document_digests: Dict[str, str]
+    ) -> SymbolGraphSnapshot:
+        """
+        Encodes the graph back into a snapshot
+
+        Args:
+            index_digest (str): The content hash of the index the graph was built from
+            build_caller_relationships (bool): Whether the graph holds caller-callee edges
+            document_digests (Dict[str, str]): The content hash of each indexed document
+
+        Returns:
+            SymbolGraphSnapshot: The snapshot of the graph
+        """
+        return SymbolGraphSnapshot(
+            index_digest,
+            build_caller_relationships,
+            document_digests,
+            self.strings,
+            self.node_is_symbol,
+            self.node_label,
+            {label: adjacency.columns for label, adjacency in self.adjacency.items()},
+        )
+
+    def node_id(self, node: Union[Symbol, str]) -> Optional[int]:
+        """
+        Gets the integer id of a node
+
+        Args:
+            node (Union[Symbol, str]): A symbol, or a file path
+
+        Returns:
+            Optional[int]: The id of the node, or None if it is not in the graph
+        """
+        return self.node_ids.get(node.uri if isinstance(node, Symbol) else node)
+
+    def node(self, node_id: int) -> Union[Symbol, str]:
+        """
+        Gets the node with a given id, parsing its symbol on first access
+
+        Args:
+            node_id (int): The id of the node
+
+        Returns:
+            Union[Symbol, str]: The symbol, or the file path, of the node
+        """
+        node = self._nodes[node_id]
+        if node is None:
+            string = self.strings[node_id]
+            node = parse_symbol(string) if self.node_is_symbol[node_id] else string
+            self._nodes[node_id] = node
+        return node
+
+    def nodes_with_label(self, label: str) -> List[int]:
+        """
+        Gets the ids of every node with a given label
+
+        Args:
+            label (str): The node label, i.e. "file" or "symbol"
+
+        Returns:
+            List[int]: The ids of the matching nodes
+        """
+        return np.flatnonzero(self.node_label == _NODE_LABEL_CODES[label]).tolist()
+
+    def out_neighbors(self, label: str, node_id: int) -> List[int]:
+        """
+        Gets the targets of the out-edges of a node with a given label
+
+        Args:
+            label (str): The edge label
+            node_id (int): The source node id
+
+        Returns:
+            List[int]: The target node ids, one per edge
+        """
+        adjacency = self.adjacency[label]
+        positions = adjacency.out_positions(node_id)
+        return adjacency.columns["target"][positions.start : positions.stop].tolist()
+
+    def in_neighbors(self, label: str, node_id: int) -> List[int]:
+        """
+        Gets the sources of the in-edges of a node with a given label
+
+        Args:
+            label (str): The edge label
+            node_id (int): The target node id
+
+        Returns:
+            List[int]: The source node ids, one per edge
+        """
+        adjacency = self.adjacency[label]
+        return adjacency.columns["source"][adjacency.in_positions(node_id)].tolist()
+
+    def positional_edge(self, label: str, position: int, symbol_id: int) -> SymbolReference:
+        """
+        Materializes the data of a reference, caller or callee edge as a SymbolReference
+
+        Args:
+            label (str): The edge label
+            position (int): The position of the edge in the label's columns
+            symbol_id (int): The id of the node the reference points at
+
+        Returns:
+            SymbolReference: The reference held by the edge
+        """
+        columns = self.adjacency[label].columns
+        return SymbolReference(
+            symbol=self.node(symbol_id),  # type: ignore
+            line_number=int(columns["line"][position]),
+            column_number=int(columns["column"][position]),
+            roles=self._decode_roles(int(columns["roles"][position])),
+        )
+
+    def _decode_roles(self, mask: int) -> Dict[str, bool]:
+        if mask not in self._roles_cache:
+            self._roles_cache[mask] = decode_symbol_roles(mask)
+        return dict(self._roles_cache[mask])
@@ -1,4 +1,6 @@
+import hashlib
 import logging
+from bisect import bisect_left
 from concurrent.futures import ProcessPoolExecutor
 from dataclasses import dataclass
 from time import time
@@ -9,18 +11,23 @@ from google.protobuf.json_format import MessageToDict  # type: ignore
 from tqdm import tqdm
 
 from automata.config import MAX_WORKERS
+from automata.core.symbol.bounding_box import (
+    BoundingBox,
+    BoundingBoxCache,
+    BoundingBoxProvider,
+)
+from automata.core.symbol.compact import CompactSymbolGraph
+from automata.core.symbol.index_stream import StreamingIndex, compute_file_digest
 from automata.core.symbol.parser import parse_symbol
-from automata.core.symbol.scip_pb2 import Index, SymbolRole  # type: ignore
+from automata.core.symbol.scip_pb2 import Document, Index, SymbolRole  # type: ignore
+from automata.core.symbol.snapshot import SymbolGraphSnapshot
 from automata.core.symbol.symbol_types import (
     Symbol,
     SymbolDescriptor,
     SymbolFile,
     SymbolReference,
 )
-from automata.core.symbol.symbol_utils import (
-    convert_to_fst_object,
-    get_rankable_symbols,
-)
+from automata.core.symbol.symbol_utils import get_rankable_symbols
 
 logger = logging.getLogger(__name__)
 
@@ -47,12 +54,24 @@ class _RelationshipManager:
             relationship_labels = MessageToDict(relationship)
             relationship_labels.pop("symbol")
             related_symbol = parse_symbol(relationship.symbol)
-            self._graph.add_edge(
-                self.symbol_information.symbol,
-                related_symbol,
-                label="relationship",
-                **relationship_labels,
-            )
+            self.add_relationship(related_symbol, relationship_labels)
+
+    def add_relationship(
+        self, related_symbol: Symbol, relationship_labels: Dict[str, Any]
+    ) -> None:
+        """
+        Adds a single relationship edge from the managed symbol
+
+        Args:
+            related_symbol (Symbol): The symbol on the other end of the relationship
+            relationship_labels (Dict[str, Any]): The relationship flags, e.g. isImplementation
+        """
+        self._graph.add_edge(
+            self.symbol_information.symbol,
+            related_symbol,
+            label="relationship",
+            **relationship_labels,
+        )
 
 
 class _OccurrenceManager:
@@ -81,34 +100,56 @@ class _OccurrenceManager:
                 continue
 
             occurrence_range = tuple(occurrence.range)
-            occurrence_roles = _OccurrenceManager._process_symbol_roles(occurrence.symbol_roles)
-            occurrence_reference = SymbolReference(
-                symbol=occurrence_symbol,
-                line_number=occurrence_range[0],
-                column_number=occurrence_range[1],
-                roles=occurrence_roles,
+            self.add_occurrence(
+                occurrence_symbol,
+                occurrence_range[0],
+                occurrence_range[1],
+                occurrence.symbol_roles,
             )
+
+    def add_occurrence(
+        self, occurrence_symbol: Symbol, line_number: int, column_number: int, symbol_roles: int
+    ) -> None:
+        """
+        Adds a single occurrence of a symbol in the managed document
+
+        Args:
+            occurrence_symbol (Symbol): The symbol which occurs
+            line_number (int): The line of the occurrence
+            column_number (int): The column of the occurrence
+            symbol_roles (int): The SymbolRole bitmask of the occurrence
+        """
+        occurrence_roles = _OccurrenceManager._process_symbol_roles(symbol_roles)
+        occurrence_reference = SymbolReference(
+            symbol=occurrence_symbol,
+            line_number=line_number,
+            column_number=column_number,
+            roles=occurrence_roles,
+        )
+        self._graph.nodes[self.document.relative_path]["file"].occurrences.append(
+            occurrence_reference
+        )
+        self._graph.add_edge(
+            occurrence_symbol,
+            self.document.relative_path,
+            symbol_reference=occurrence_reference,
+            label="reference",
+        )
+        if occurrence_roles.get(SymbolRole.Name(SymbolRole.Definition)):
+            # TODO this is gross
+            incorrect_contains_edges = [
+                (source, target)
+                for source, target, data in self._graph.in_edges(occurrence_symbol, data=True)
+                if data.get("label") == "contains"
+            ]
+            for source, target in incorrect_contains_edges:
+                self._graph.remove_edge(source, target)
+
             self._graph.add_edge(
-                occurrence_symbol,
                 self.document.relative_path,
-                symbol_reference=occurrence_reference,
-                label="reference",
+                occurrence_symbol,
+                label="contains",
             )
-            if occurrence_roles.get(SymbolRole.Name(SymbolRole.Definition)):
-                # TODO this is gross
-                incorrect_contains_edges = [
-                    (source, target)
-                    for source, target, data in self._graph.in_edges(occurrence_symbol, data=True)
-                    if data.get("label") == "contains"
-                ]
-                for source, target in incorrect_contains_edges:
-                    self._graph.remove_edge(source, target)
-
-                self._graph.add_edge(
-                    self.document.relative_path,
-                    occurrence_symbol,
-                    label="contains",
-                )
 
     @staticmethod
     def _process_symbol_roles(role: int) -> Dict[str, bool]:
@@ -198,27 +239,128 @@ class _CallerCalleeManager:
                     continue
 
 
+@dataclass
+class _DocumentFragment:
+    """
+    The compact edge tuples extracted from a single document by a build worker.
+    Symbols are referred to by their position in the symbol table of the worker's shard.
+    """
+
+    relative_path: str
+    # The listed symbols which could be parsed, as symbol ids
+    symbols: List[int]
+    # (source symbol uri, related symbol id, relationship labels)
+    relationships: List[Tuple[str, int, Dict[str, bool]]]
+    # (symbol id, line number, column number, symbol roles bitmask)
+    occurrences: List[Tuple[int, int, int, int]]
+
+
+def _extract_document_fragments(
+    serialized_documents: List[bytes],
+) -> Tuple[List[Symbol], List[_DocumentFragment]]:
+    """
+    Extracts the compact edge tuples of a shard of documents.
+    This runs in a worker process, and does all of the per-document parsing work.
+
+    Args:
+        serialized_documents (List[bytes]): The serialized Document objects of the shard
+
+    Returns:
+        Tuple[List[Symbol], List[_DocumentFragment]]: The symbol table of the shard,
+            and one fragment per document, in order
+    """
+    symbol_table: List[Symbol] = []
+    symbol_ids: Dict[str, Optional[int]] = {}
+
+    def intern(symbol_uri: str) -> Optional[int]:
+        if symbol_uri not in symbol_ids:
+            try:
+                symbol_table.append(parse_symbol(symbol_uri))
+                symbol_ids[symbol_uri] = len(symbol_table) - 1
+            except Exception as e:
+                logger.error(f"Parsing symbol {symbol_uri} failed with error {e}")
+                symbol_ids[symbol_uri] = None
+        return symbol_ids[symbol_uri]
+
+    fragments = []
+    for serialized_document in serialized_documents:
+        document = Document()
+        document.ParseFromString(serialized_document)
+        fragment = _DocumentFragment(document.relative_path, [], [], [])
+        for symbol_information in document.symbols:
+            symbol_id = intern(symbol_information.symbol)
+            if symbol_id is not None:
+                fragment.symbols.append(symbol_id)
+            for relationship in symbol_information.relationships:
+                related_symbol_id = intern(relationship.symbol)
+                if related_symbol_id is None:
+                    continue
+                # Equivalent to MessageToDict, which only keeps the fields that are set
+                relationship_labels = {
+                    field.json_name: value
+                    for field, value in relationship.ListFields()
+                    if field.name != "symbol"
+                }
+                fragment.relationships.append(
+                    (symbol_information.symbol, related_symbol_id, relationship_labels)
+                )
+        for occurrence in document.occurrences:
+            symbol_id = intern(occurrence.symbol)
+            if symbol_id is not None:
+                fragment.occurrences.append(
+                    (symbol_id, occurrence.range[0], occurrence.range[1], occurrence.symbol_roles)
+                )
+        fragments.append(fragment)
+    return symbol_table, fragments
+
+
 class GraphBuilder:
     """
     Builds a symbol graph from an Index.
     """
 
-    def __init__(self, index: Index, build_caller_relationships: bool = False) -> None:
+    def __init__(
+        self,
+        index: Any,
+        build_caller_relationships: bool = False,
+        graph: Optional[nx.MultiDiGraph] = None,
+        parallel: bool = False,
+    ) -> None:
         """
         Args:
-            index (Index): An Index object
+            index (Any): An Index object, or a StreamingIndex which decodes
+                its documents one at a time
             build_caller_relationships (bool, optional): Whether to build
                 caller-callee relationships. Defaults to False.
+            graph (Optional[nx.MultiDiGraph]): An existing graph to update in place
+                with `update_graph`. Defaults to a new, empty graph.
+            parallel (bool, optional): Whether to shard the per-document work
+                of `build_graph` across MAX_WORKERS processes. Defaults to False.
         """
         self.index = index
         self.build_caller_relationships = build_caller_relationships
-        self._graph = nx.MultiDiGraph()
+        self._graph = graph if graph is not None else nx.MultiDiGraph()
+        self.parallel = parallel
+        self.document_digests: Dict[str, str] = {}
+        self.touched_symbols: Set[Symbol] = set()
+        # The bounding boxes of the definitions whose enclosing range is given by the index,
+        # collected while each document is decoded
+        self.enclosing_ranges: Dict[Symbol, BoundingBox] = {}
 
     def build_graph(self) -> nx.MultiDiGraph:
         """
         Builds the graph from the index
         """
+        if self.parallel:
+            return self._build_graph_parallel()
+
         for document in self.index.documents:
+            self.document_digests[document.relative_path] = GraphBuilder.compute_document_digest(
+                document
+            )
+            self.enclosing_ranges.update(
+                BoundingBoxProvider.extract_document_enclosing_ranges(document)
+            )
             self._add_file_vertices(document)
             self._add_symbol_vertices(document)
             self._process_relationships(document)
@@ -228,16 +370,304 @@ class GraphBuilder:
 
         return self._graph
 
+    def _build_graph_parallel(self) -> nx.MultiDiGraph:
+        """
+        Builds the graph from the index, sharding the per-document work across processes.
+
+        Workers parse symbols, relationships and roles into compact edge tuples.
+        The fragments are then merged into the graph in document order, which replays the
+        cross-document fixups (e.g. moving contains edges to the defining document)
+        exactly as a serial build would. Caller-callee relationships need the merged
+        graph, so they are processed serially once every document has been merged.
+        Unlike a serial build, this holds every document of the index in memory.
+        """
+        documents = list(self.index.documents)
+        shard_count = min(len(documents), MAX_WORKERS * 4) or 1
+        shard_size = -(-len(documents) // shard_count)
+        shards = [
+            [document.SerializeToString() for document in documents[i : i + shard_size]]
+            for i in range(0, len(documents), shard_size)
+        ]
+
+        interned_symbols: Dict[str, Symbol] = {}
+        document_iterator = iter(documents)
+        with ProcessPoolExecutor(max_workers=MAX_WORKERS) as executor:
+            for symbol_table, fragments in executor.map(_extract_document_fragments, shards):
+                symbols = [
+                    interned_symbols.setdefault(symbol.uri, symbol) for symbol in symbol_table
+                ]
+                for fragment in fragments:
+                    document = next(document_iterator)
+                    self.document_digests[
+                        document.relative_path
+                    ] = GraphBuilder.compute_document_digest(document)
+                    self.enclosing_ranges.update(
+                        BoundingBoxProvider.extract_document_enclosing_ranges(document)
+                    )
+                    self._merge_document_fragment(document, fragment, symbols)
+
+        if self.build_caller_relationships:
+            for document in documents:
+                self._process_caller_callee_relationships(document)
+
+        return self._graph
+
+    def _merge_document_fragment(
+        self, document: Any, fragment: _DocumentFragment, symbols: List[Symbol]
+    ) -> None:
+        """
+        Merges the edge tuples extracted from a document into the graph
+
+        Args:
+            document (Any): A Document object
+            fragment (_DocumentFragment): The edge tuples extracted from the document
+            symbols (List[Symbol]): The symbol table of the fragment's shard
+        """
+        self._add_file_vertices(document)
+        for symbol_id in fragment.symbols:
+            self._graph.add_node(symbols[symbol_id], label="symbol")
+            self._graph.add_edge(document.relative_path, symbols[symbol_id], label="contains")
+
+        symbol_informations = {
+            symbol_information.symbol: symbol_information
+            for symbol_information in document.symbols
+        }
+        for source_uri, related_symbol_id, relationship_labels in fragment.relationships:
+            relationship_manager = _RelationshipManager(
+                self._graph, symbol_informations[source_uri]
+            )
+            relationship_manager.add_relationship(symbols[related_symbol_id], relationship_labels)
+
+        occurrence_manager = _OccurrenceManager(self._graph, document)
+        for symbol_id, line_number, column_number, symbol_roles in fragment.occurrences:
+            occurrence_manager.add_occurrence(
+                symbols[symbol_id], line_number, column_number, symbol_roles
+            )
+
+    def update_graph(self, previous_digests: Dict[str, str]) -> List[str]:
+        """
+        Incrementally updates the graph to reflect the index.
+
+        Documents are diffed against the previous build by relative path and content hash.
+        Only the edges of documents which were added, changed or removed are retracted,
+        and changed documents are then re-added through the regular managers,
+        so the cost of an update scales with the size of the change.
+
+        Args:
+            previous_digests (Dict[str, str]): The document digests of the previous build
+
+        Returns:
+            List[str]: The relative paths of the documents which were updated
+        """
+        changed_documents = []
+        for document in self.index.documents:
+            digest = GraphBuilder.compute_document_digest(document)
+            self.document_digests[document.relative_path] = digest
+            self.enclosing_ranges.update(
+                BoundingBoxProvider.extract_document_enclosing_ranges(document)
+            )
+            if previous_digests.get(document.relative_path) != digest:
+                changed_documents.append(document)
+        removed_paths = sorted(set(previous_digests) - set(self.document_digests))
+
+        retracted_nodes: Set[Any] = set()
+        for path in removed_paths:
+            retracted_nodes |= self._retract_document(path, set())
+            self._graph.remove_node(path)
+        for document in changed_documents:
+            retracted_nodes |= self._retract_document(
+                document.relative_path, self._get_document_symbols(document)
+            )
+
+        for document in changed_documents:
+            self._add_file_vertices(document)
+            self._add_symbol_vertices(document)
+            self._process_relationships(document)
+            self._process_occurrences(document)
+
+        affected_nodes = retracted_nodes.union(
+            *(
+                self._get_contained_symbols(document.relative_path)
+                for document in changed_documents
+            )
+        )
+        self._resolve_symbols(affected_nodes)
+        # Caller-callee edges are processed last, so that scopes see every re-added reference
+        if self.build_caller_relationships:
+            for document in changed_documents:
+                self._process_caller_callee_relationships(document)
+
+        self.touched_symbols = {node for node in affected_nodes if isinstance(node, Symbol)}
+        return [document.relative_path for document in changed_documents] + removed_paths
+
+    @staticmethod
+    def compute_document_digest(document: Any) -> str:
+        """
+        Computes the content hash of a document's occurrences and symbol information
+
+        Args:
+            document (Any): A Document object
+
+        Returns:
+            str: The hex digest of the document
+        """
+        return hashlib.sha256(document.SerializeToString(deterministic=True)).hexdigest()
+
+    def _get_contained_symbols(self, relative_path: str) -> Set[Any]:
+        """
+        Gets the symbols which a file currently contains
+
+        Args:
+            relative_path (str): The relative path of the file
+
+        Returns:
+            Set[Any]: The contained symbol nodes
+        """
+        return {
+            target
+            for _, target, data in self._graph.out_edges(relative_path, data=True)
+            if data.get("label") == "contains"
+        }
+
+    def _retract_document(self, relative_path: str, listed_symbols: Set[Symbol]) -> Set[Any]:
+        """
+        Removes the edges which were added to the graph on behalf of a document
+
+        Args:
+            relative_path (str): The relative path of the document
+            listed_symbols (Set[Symbol]): The symbols listed by the new version of the document
+
+        Returns:
+            Set[Any]: The symbol nodes at the other end of every removed edge
+        """
+        if relative_path not in self._graph:
+            return set()
+
+        contained_symbols = self._get_contained_symbols(relative_path)
+        stale_edges = [
+            (source, target, key)
+            for source, target, key, data in self._graph.in_edges(
+                relative_path, keys=True, data=True
+            )
+            if data.get("label") == "reference"
+        ]
+        stale_edges.extend(
+            (source, target, key)
+            for source, target, key in self._graph.out_edges(relative_path, keys=True)
+        )
+        for symbol in contained_symbols.union(listed_symbols):
+            if symbol not in self._graph:
+                continue
+            stale_edges.extend(
+                (source, target, key)
+                for source, target, key, data in self._graph.out_edges(
+                    symbol, keys=True, data=True
+                )
+                if data.get("label") in ("relationship", "caller")
+            )
+            stale_edges.extend(
+                (source, target, key)
+                for source, target, key, data in self._graph.in_edges(symbol, keys=True, data=True)
+                if data.get("label") == "callee"
+            )
+        self._graph.remove_edges_from(stale_edges)
+
+        retracted_nodes = {node for edge in stale_edges for node in edge[:2]}
+        retracted_nodes.discard(relative_path)
+        return retracted_nodes
+
+    def _resolve_symbols(self, nodes: Set[Any]) -> None:
+        """
+        Restores the contains edges and labels of symbols touched by an update,
+        such that they match what a full build of the index would produce.
+
+        A full build gives each symbol to the last document which defines it, along with
+        every later document which lists it, or to every listing document if none defines it.
+        Symbols which are no longer listed lose their label and are removed once unconnected.
+
+        Args:
+            nodes (Set[Any]): The symbol nodes touched by the update
+        """
+        nodes = {node for node in nodes if node in self._graph}
+        uri_to_node = {getattr(node, "uri", node): node for node in nodes}
+        document_paths = []
+        listing_positions: Dict[Any, List[int]] = {node: [] for node in nodes}
+        for position, document in enumerate(self.index.documents):
+            document_paths.append(document.relative_path)
+            for symbol_information in document.symbols:
+                if symbol_information.symbol in uri_to_node:
+                    listing_positions[uri_to_node[symbol_information.symbol]].append(position)
+        document_positions = {path: position for position, path in enumerate(document_paths)}
+
+        definition_role = SymbolRole.Name(SymbolRole.Definition)
+        for node in nodes:
+            definition_positions = [
+                document_positions[target]
+                for _, target, data in self._graph.out_edges(node, data=True)
+                if data.get("label") == "reference"
+                and data["symbol_reference"].roles.get(definition_role)
+                and target in document_positions
+            ]
+            if definition_positions:
+                last_definition = max(definition_positions)
+                expected_positions = [last_definition] + [
+                    position for position in listing_positions[node] if position > last_definition
+                ]
+            else:
+                expected_positions = listing_positions[node]
+
+            contains_edges = [
+                (source, target, key)
+                for source, target, key, data in self._graph.in_edges(node, keys=True, data=True)
+                if data.get("label") == "contains"
+            ]
+            if sorted(document_positions[source] for source, _, __ in contains_edges) != sorted(
+                expected_positions
+            ):
+                self._graph.remove_edges_from(contains_edges)
+                for position in expected_positions:
+                    self._graph.add_edge(document_paths[position], node, label="contains")
+
+            if listing_positions[node]:
+                self._graph.nodes[node]["label"] = "symbol"
+            else:
+                self._graph.nodes[node].pop("label", None)
+                if self._graph.degree(node) == 0:
+                    self._graph.remove_node(node)
+
+    @staticmethod
+    def _get_document_symbols(document: Any) -> Set[Symbol]:
+        """
+        Gets the parsed symbols listed by a document
+
+        Args:
+            document (Any): A Document object
+
+        Returns:
+            Set[Symbol]: The symbols which could be parsed
+        """
+        document_symbols = set()
+        for symbol_information in document.symbols:
+            try:
+                document_symbols.add(parse_symbol(symbol_information.symbol))
+            except Exception as e:
+                logger.error(f"Parsing symbol {symbol_information.symbol} failed with error {e}")
+        return document_symbols
+
     def _add_file_vertices(self, document: Any) -> None:
         """
         Adds the file vertices to the graph
 
+        The file keeps the references which point into it as its occurrences,
+        filled in as they are processed, rather than the document's protobuf occurrences,
+        so that documents can be released once they have been built.
+
         Args:
             document (Any): A Document object
         """
         self._graph.add_node(
             document.relative_path,
-            file=SymbolFile(document.relative_path, occurrences=document.occurrences),
+            file=SymbolFile(document.relative_path, occurrences=[]),
             label="file",
         )
 
@@ -303,6 +733,12 @@ class _SymbolGraphNavigator:
         self._graph = graph
         # TODO - Find the correct way to define a bounding box
         self.bounding_box: Dict[Symbol, Any] = {}  # Default to empty bounding boxes
+        # The references into each file, sorted by (line, column), built on first use
+        self._sorted_file_references: Dict[str, Tuple[List[int], List[SymbolReference]]] = {}
+        self._bounding_box_provider = BoundingBoxProvider()
+        # The in and out edges of each queried node, partitioned by edge label
+        self._out_edges_by_label: Dict[Any, Dict[str, List[Tuple[Any, Any]]]] = {}
+        self._in_edges_by_label: Dict[Any, Dict[str, List[Tuple[Any, Any]]]] = {}
 
     def get_all_files(self) -> List[SymbolFile]:
         """
@@ -342,11 +778,7 @@ class _SymbolGraphNavigator:
         return {ref.symbol for ref in references_in_range}
 
     def get_symbol_relationships(self, symbol: Symbol) -> Set[Symbol]:
-        return {
-            target
-            for _, target, data in self._graph.out_edges(symbol, data=True)
-            if data.get("label") == "relationship"
-        }
+        return {target for target, _ in self._get_out_edges(symbol, "relationship")}
 
     def get_references_to_symbol(self, symbol: Symbol) -> Dict[str, List[SymbolReference]]:
         """
@@ -361,8 +793,7 @@ class _SymbolGraphNavigator:
         """
         search_results = [
             (file_path, data.get("symbol_reference"))
-            for _, file_path, data in self._graph.out_edges(symbol, data=True)
-            if data.get("label") == "reference"
+            for file_path, data in self._get_out_edges(symbol, "reference")
         ]
         result_dict: Dict[str, List[SymbolReference]] = {}
 
@@ -392,9 +823,8 @@ class _SymbolGraphNavigator:
                 line_number=data.get("line_number"),
                 column_number=data.get("column_number"),
                 roles=data.get("roles"),
-            ): callee
-            for callee, caller, data in self._graph.out_edges(symbol, data=True)
-            if data.get("label") == "callee"
+            ): symbol
+            for caller, data in self._get_out_edges(symbol, "callee")
         }
 
     def get_potential_symbol_callees(self, symbol: Symbol) -> Dict[Symbol, SymbolReference]:
@@ -410,13 +840,12 @@ class _SymbolGraphNavigator:
         """
         return {
             callee: SymbolReference(
-                symbol=caller,
+                symbol=symbol,
                 line_number=data.get("line_number"),
                 column_number=data.get("column_number"),
                 roles=data.get("roles"),
             )
-            for caller, callee, data in self._graph.out_edges(symbol, data=True)
-            if data.get("label") == "caller"
+            for callee, data in self._get_out_edges(symbol, "caller")
         }
 
     def _get_symbol_containing_file(self, symbol: Symbol) -> str:
@@ -429,11 +858,7 @@ class _SymbolGraphNavigator:
         Returns:
             str: The file path of the containing file
         """
-        parent_file_list = [
-            source
-            for source, _, data in self._graph.in_edges(symbol, data=True)
-            if data.get("label") == "contains"
-        ]
+        parent_file_list = [source for source, _ in self._get_in_edges(symbol, "contains")]
         assert (
             len(parent_file_list) == 1
         ), f"{symbol.uri} should have exactly one parent file, but has {len(parent_file_list)}"
@@ -456,11 +881,9 @@ class _SymbolGraphNavigator:
             across the entire
         """
         # bounding boxes are cached
-        if len(self.bounding_box) > 0:
-            bounding_box = self.bounding_box[symbol]
-        else:
-            fst_object = convert_to_fst_object(symbol)
-            bounding_box = fst_object.absolute_bounding_box
+        if symbol not in self.bounding_box:
+            self.bounding_box[symbol] = self._bounding_box_provider.get_bounding_box(symbol)
+        bounding_box = self.bounding_box[symbol]
 
         # RedBaron POSITIONS ARE 1 INDEXED AND SCIP ARE 0!!!!
         parent_symbol_start_line, parent_symbol_start_col, parent_symbol_end_line = (
@@ -470,14 +893,37 @@ class _SymbolGraphNavigator:
         )
 
         file_name = self._get_symbol_containing_file(symbol)
-        references_in_parent_module = self._get_references_to_module(file_name)
+        lines, references = self._get_sorted_references_to_module(file_name)
+        start = bisect_left(lines, parent_symbol_start_line)
+        end = bisect_left(lines, parent_symbol_end_line, lo=start)
         return [
-            ref
-            for ref in references_in_parent_module
-            if parent_symbol_start_line <= ref.line_number < parent_symbol_end_line
-            and ref.column_number >= parent_symbol_start_col
+            ref for ref in references[start:end] if ref.column_number >= parent_symbol_start_col
         ]
 
+    def _get_sorted_references_to_module(
+        self, module_name: str
+    ) -> Tuple[List[int], List[SymbolReference]]:
+        """
+        Gets all references to a module, sorted by position, so that scopes can be bisected
+
+        Args:
+            module_name (str): The module name to fetch references for
+
+        Returns:
+            Tuple[List[int], List[SymbolReference]]: The line number of each reference,
+                and the SymbolReference objects, both sorted by (line, column)
+        """
+        if module_name not in self._sorted_file_references:
+            references = sorted(
+                self._get_references_to_module(module_name),
+                key=lambda ref: (ref.line_number, ref.column_number),
+            )
+            self._sorted_file_references[module_name] = (
+                [ref.line_number for ref in references],
+                references,
+            )
+        return self._sorted_file_references[module_name]
+
     def _get_references_to_module(self, module_name: str) -> List[SymbolReference]:
         """
         Gets all references to a module
@@ -488,78 +934,572 @@ class _SymbolGraphNavigator:
         Returns:
             List[SymbolReference]: A list of SymbolReference objects in scope
         """
-        reference_edges_in_module = self._graph.in_edges(module_name, data=True)
         return [
             data.get("symbol_reference")
-            for _, __, data in reference_edges_in_module
-            if data["label"] == "reference"
+            for _, data in self._get_in_edges(module_name, "reference")
         ]
 
-    def _pre_compute_rankable_bounding_boxes(self) -> None:
+    def _get_out_edges(self, node: Any, label: str) -> List[Tuple[Any, Any]]:
+        """
+        Gets the out edges of a node with a given label
+
+        Args:
+            node (Any): The source node
+            label (str): The edge label
+
+        Returns:
+            List[Tuple[Any, Any]]: The target and data of each matching edge
+
+        Note:
+            The out edges of a node are partitioned by label on its first query,
+            so later queries only touch the matching edges.
         """
-        Pre-computes bounding boxes for all symbols in the graph
+        if node not in self._out_edges_by_label:
+            partition: Dict[str, List[Tuple[Any, Any]]] = {}
+            for _, target, data in self._graph.out_edges(node, data=True):
+                partition.setdefault(data.get("label"), []).append((target, data))
+            self._out_edges_by_label[node] = partition
+        return self._out_edges_by_label[node].get(label, [])
+
+    def _get_in_edges(self, node: Any, label: str) -> List[Tuple[Any, Any]]:
+        """
+        Gets the in edges of a node with a given label
+
+        Args:
+            node (Any): The target node
+            label (str): The edge label
+
+        Returns:
+            List[Tuple[Any, Any]]: The source and data of each matching edge
+        """
+        if node not in self._in_edges_by_label:
+            partition: Dict[str, List[Tuple[Any, Any]]] = {}
+            for source, _, data in self._graph.in_edges(node, data=True):
+                partition.setdefault(data.get("label"), []).append((source, data))
+            self._in_edges_by_label[node] = partition
+        return self._in_edges_by_label[node].get(label, [])
+
+    def _pre_compute_rankable_bounding_boxes(self, cache_path: Optional[str] = None) -> None:
+        """
+        Pre-computes bounding boxes for all rankable symbols in the graph
+        which do not have one yet, e.g. from the index's enclosing ranges
+
+        Args:
+            cache_path (Optional[str]): The path of a BoundingBoxCache sidecar. When given,
+                only the symbols of source files which changed since the cache was written
+                are measured, and the cache is updated afterwards.
         """
         now = time()
+        filtered_symbols = [
+            symbol
+            for symbol in get_rankable_symbols(self.get_all_available_symbols())
+            if symbol not in self.bounding_box
+        ]
         # Bounding boxes are already loaded
-        if len(self.bounding_box) > 0:
+        if not filtered_symbols:
             return
 
         logger.info("Pre-computing bounding boxes for all rankable symbols")
-        filtered_symbols = get_rankable_symbols(self.get_all_available_symbols())
-
-        bounding_boxes = {}
-        with ProcessPoolExecutor(max_workers=MAX_WORKERS) as executor:
-            results = executor.map(_SymbolGraphNavigator._process_symbol_bounds, filtered_symbols)
-            for result in results:
-                if result is not None:
-                    symbol, bounding_box = result
-                    bounding_boxes[symbol] = bounding_box
+        if cache_path is None:
+            self.bounding_box.update(
+                self._bounding_box_provider.get_bounding_boxes(filtered_symbols)
+            )
+        else:
+            cache = BoundingBoxCache.load(cache_path)
+            self.bounding_box.update(
+                cache.get_bounding_boxes(filtered_symbols, self._bounding_box_provider)
+            )
+            if cache.is_dirty:
+                cache.save(cache_path)
+        # The parsed source files are only needed while measuring
+        self._bounding_box_provider.clear()
         logger.info(
             f"Finished pre-computing bounding boxes for all rankable symbols in {time() - now} seconds"
         )
-        self.bounding_box = bounding_boxes
 
-    @staticmethod
-    def _process_symbol_bounds(symbol: Symbol) -> Optional[Tuple[Symbol, Any]]:
+    def _discard_bounding_boxes(self, symbols: Set[Symbol]) -> None:
+        """
+        Discards the cached bounding boxes of the given symbols, e.g. after their file changed
+
+        Args:
+            symbols (Set[Symbol]): The symbols whose bounding boxes are stale
+        """
+        for symbol in symbols:
+            self.bounding_box.pop(symbol, None)
+
+    def _discard_label_partitions(self) -> None:
+        """
+        Discards the label partitions of every node, e.g. after edges were added or removed
+        """
+        self._out_edges_by_label.clear()
+        self._in_edges_by_label.clear()
+
+    def _discard_sorted_references(self, module_names: List[str]) -> None:
+        """
+        Discards the sorted reference indexes of the given files, e.g. after they changed
+
+        Args:
+            module_names (List[str]): The files whose references are stale
+        """
+        for module_name in module_names:
+            self._sorted_file_references.pop(module_name, None)
+
+
+class _CompactSymbolGraphNavigator(_SymbolGraphNavigator):
+    """
+    Handles navigation of a symbol graph held in a CompactSymbolGraph.
+    """
+
+    def __init__(self, compact_graph: CompactSymbolGraph) -> None:
+        """
+        Args:
+            compact_graph (CompactSymbolGraph): A CSR-backed symbol graph
+        """
+        self._compact_graph = compact_graph
+        self.bounding_box: Dict[Symbol, Any] = {}
+        self._sorted_file_references: Dict[str, Tuple[List[int], List[SymbolReference]]] = {}
+        self._bounding_box_provider = BoundingBoxProvider()
+
+    def _discard_label_partitions(self) -> None:
+        """
+        Does nothing, as the CSR adjacency is already partitioned by label
+        """
+
+    def get_all_files(self) -> List[SymbolFile]:
+        """
+        Gets all files in the graph
+
+        Returns:
+            List[SymbolFile]: A list of SymbolFile objects
+        """
+        return [
+            SymbolFile(
+                self._compact_graph.strings[file_id],
+                occurrences=self._get_file_references(file_id),
+            )
+            for file_id in self._compact_graph.nodes_with_label("file")
+        ]
+
+    def get_all_available_symbols(self) -> List[Symbol]:
+        """
+        Gets all available symbols in the graph
+
+        Returns:
+            List[Symbol]: A list of Symbol objects
+        """
+        return [
+            self._compact_graph.node(symbol_id)  # type: ignore
+            for symbol_id in self._compact_graph.nodes_with_label("symbol")
+        ]
+
+    def get_symbol_relationships(self, symbol: Symbol) -> Set[Symbol]:
+        symbol_id = self._compact_graph.node_id(symbol)
+        if symbol_id is None:
+            return set()
+        return {
+            self._compact_graph.node(target_id)  # type: ignore
+            for target_id in self._compact_graph.out_neighbors("relationship", symbol_id)
+        }
+
+    def get_references_to_symbol(self, symbol: Symbol) -> Dict[str, List[SymbolReference]]:
+        """
+        Gets all references to a symbol
+
+        Args:
+            symbol (Symbol): The symbol object to fetch references for
+
+        Returns:
+            Dict[str, List[SymbolReference]]: A dictionary of file
+                paths to a list of SymbolReference objects
+        """
+        result_dict: Dict[str, List[SymbolReference]] = {}
+        symbol_id = self._compact_graph.node_id(symbol)
+        if symbol_id is None:
+            return result_dict
+
+        adjacency = self._compact_graph.adjacency["reference"]
+        for position in adjacency.out_positions(symbol_id):
+            file_path = self._compact_graph.strings[adjacency.columns["target"][position]]
+            result_dict.setdefault(file_path, []).append(
+                self._compact_graph.positional_edge("reference", position, symbol_id)
+            )
+        return result_dict
+
+    def get_potential_symbol_callers(self, symbol: Symbol) -> Dict[SymbolReference, Symbol]:
+        """
+        Gets all potential callers of a symbol
+
+        Args:
+            symbol (Symbol): The symbol object to fetch callers for
+
+        Returns:
+            Dict[Symbol, SymbolReference]: A dictionary of Symbol objects to
+                Symbol calleers (SymbolReference objects).
+        """
+        symbol_id = self._compact_graph.node_id(symbol)
+        if symbol_id is None:
+            return {}
+
+        adjacency = self._compact_graph.adjacency["callee"]
+        callee = self._compact_graph.node(symbol_id)
+        return {
+            self._compact_graph.positional_edge(
+                "callee", position, adjacency.columns["target"][position]
+            ): callee  # type: ignore
+            for position in adjacency.out_positions(symbol_id)
+        }
+
+    def get_potential_symbol_callees(self, symbol: Symbol) -> Dict[Symbol, SymbolReference]:
+        """
+        Gets all potential callees of a symbol
+
+        Args:
+            symbol (Symbol): The symbol object to fetch callees for
+
+        Returns:
+            Dict[Symbol, SymbolReference]: A dictionary of Symbol objects to
+                Symbol callees (SymbolReference objects).
+        """
+        symbol_id = self._compact_graph.node_id(symbol)
+        if symbol_id is None:
+            return {}
+
+        adjacency = self._compact_graph.adjacency["caller"]
+        return {
+            self._compact_graph.node(
+                adjacency.columns["target"][position]
+            ): self._compact_graph.positional_edge(  # type: ignore
+                "caller", position, symbol_id
+            )
+            for position in adjacency.out_positions(symbol_id)
+        }
+
+    def _get_symbol_containing_file(self, symbol: Symbol) -> str:
+        """
+        Gets the file containing a symbol
+
+        Args:
+            symbol (Symbol): The symbol object to fetch the containing file for
+
+        Returns:
+            str: The file path of the containing file
+        """
+        symbol_id = self._compact_graph.node_id(symbol)
+        parent_file_list = (
+            self._compact_graph.in_neighbors("contains", symbol_id)
+            if symbol_id is not None
+            else []
+        )
+        assert (
+            len(parent_file_list) == 1
+        ), f"{symbol.uri} should have exactly one parent file, but has {len(parent_file_list)}"
+        return self._compact_graph.strings[parent_file_list.pop()]
+
+    def _get_references_to_module(self, module_name: str) -> List[SymbolReference]:
+        """
+        Gets all references to a module
+
+        Args:
+            module_name (str): The module name to fetch references for
+
+        Returns:
+            List[SymbolReference]: A list of SymbolReference objects in scope
         """
-        Processes the bounding box for a given symbol
+        file_id = self._compact_graph.node_id(module_name)
+        if file_id is None:
+            return []
+        return self._get_file_references(file_id)
+
+    def _get_file_references(self, file_id: int) -> List[SymbolReference]:
+        """
+        Gets the references held by the reference in-edges of a file
 
         Args:
-            symbol (Symbol): The symbol to process the bounding box for
+            file_id (int): The id of the file node
 
         Returns:
-            Optional[Tuple[Symbol, BoundingBox]]: A tuple of the symbol and its bounding box
+            List[SymbolReference]: A list of SymbolReference objects in the file
         """
-        try:
-            fst_object = convert_to_fst_object(symbol)
-            bounding_box = fst_object.absolute_bounding_box
-            return symbol, bounding_box
-        except Exception as e:
-            logger.error(f"Error computing bounding box for {symbol.uri}: {e}")
-            return None
+        adjacency = self._compact_graph.adjacency["reference"]
+        positions = adjacency.in_positions(file_id).tolist()
+        sources = adjacency.columns["source"][positions].tolist()
+        return [
+            self._compact_graph.positional_edge("reference", position, source)
+            for position, source in zip(positions, sources)
+        ]
 
 
 class SymbolGraph:
+    # The storage engines which can back the navigator
+    BACKENDS = ("networkx", "compact")
+
     @dataclass
     class SubGraph:
         parent: "SymbolGraph"
         graph: nx.DiGraph
-
-    def __init__(self, index_path: str, build_caller_relationships: bool = False) -> None:
+        # The settings the subgraph was built with
+        flow_rank: str = "bidirectional"
+        path_filter: Optional[str] = None
+
+    def __init__(
+        self,
+        index_path: str,
+        build_caller_relationships: bool = False,
+        snapshot_path: Optional[str] = None,
+        parallel_build: bool = False,
+        backend: str = "networkx",
+        bounding_box_cache_path: Optional[str] = None,
+    ) -> None:
         """
         Initializes SymbolGraph with the path of an index protobuf file.
 
         Args:
             index_path (str): Path to index protobuf file
+            build_caller_relationships (bool, optional): Whether to build
+                caller-callee relationships. Defaults to False.
+            snapshot_path (Optional[str]): Path to a binary snapshot of the graph.
+                When the snapshot matches the index content hash and the
+                build_caller_relationships flag, the graph is loaded from it
+                instead of being rebuilt. Otherwise the graph is built from
+                the index and the snapshot is (re)written.
+            parallel_build (bool, optional): Whether to shard the graph build
+                across MAX_WORKERS processes. Defaults to False.
+            backend (str, optional): The storage engine behind the navigator, either
+                "networkx" or "compact" (integer ids with one CSR adjacency per edge label).
+                Defaults to "networkx".
+            bounding_box_cache_path (Optional[str]): Path to a sidecar cache of the bounding
+                boxes measured for the rankable subgraph, keyed per source file by content hash.
+                Defaults to None, which measures every bounding box on each start.
 
         Returns:
             SymbolGraph instance
+
+        Raises:
+            ValueError: If the backend is not supported
         """
-        index = self._load_index_protobuf(index_path)
-        builder = GraphBuilder(index, build_caller_relationships)
-        self._graph = builder.build_graph()
+        if backend not in SymbolGraph.BACKENDS:
+            raise ValueError(f"backend must be one of {SymbolGraph.BACKENDS}, got {backend}")
+
+        self.bounding_box_cache_path = bounding_box_cache_path
+        index_digest = compute_file_digest(index_path)
+        snapshot = (
+            SymbolGraphSnapshot.load_if_fresh(
+                snapshot_path, index_digest, build_caller_relationships
+            )
+            if snapshot_path is not None
+            else None
+        )
+        snapshot_is_fresh = snapshot is not None
+        if snapshot is not None:
+            logger.info(f"Loading the symbol graph from the snapshot at {snapshot_path}")
+        else:
+            builder = GraphBuilder(
+                StreamingIndex(index_path), build_caller_relationships, parallel=parallel_build
+            )
+            graph = builder.build_graph()
+            if backend == "compact":
+                snapshot = SymbolGraphSnapshot.from_graph(
+                    graph, index_digest, build_caller_relationships, builder.document_digests
+                )
+            else:
+                self._set_graph(
+                    graph, index_digest, build_caller_relationships, builder.document_digests
+                )
+
+        if snapshot is not None:
+            self._set_snapshot(snapshot, backend)
+        if not snapshot_is_fresh:
+            # Definitions with an enclosing range in the index need no parsing to be measured
+            self.navigator.bounding_box.update(builder.enclosing_ranges)
+            if snapshot_path is not None:
+                self.save_snapshot(snapshot_path)
+
+    def _set_graph(
+        self,
+        graph: nx.MultiDiGraph,
+        index_digest: str,
+        build_caller_relationships: bool,
+        document_digests: Dict[str, str],
+    ) -> None:
+        """
+        Sets the underlying graph along with the keys that identify how it was built
+
+        Args:
+            graph (nx.MultiDiGraph): The built symbol graph
+            index_digest (str): The content hash of the index the graph was built from
+            build_caller_relationships (bool): Whether the graph holds caller-callee edges
+            document_digests (Dict[str, str]): The content hash of each indexed document
+        """
+        self.backend = "networkx"
+        self._graph = graph
+        self.index_digest = index_digest
+        self.build_caller_relationships = build_caller_relationships
+        self.document_digests = document_digests
         self.navigator = _SymbolGraphNavigator(self._graph)
 
+    def _set_compact_graph(
+        self,
+        compact_graph: CompactSymbolGraph,
+        index_digest: str,
+        build_caller_relationships: bool,
+        document_digests: Dict[str, str],
+    ) -> None:
+        """
+        Sets the underlying CSR-backed graph along with the keys that identify how it was built
+
+        Args:
+            compact_graph (CompactSymbolGraph): The built symbol graph
+            index_digest (str): The content hash of the index the graph was built from
+            build_caller_relationships (bool): Whether the graph holds caller-callee edges
+            document_digests (Dict[str, str]): The content hash of each indexed document
+        """
+        self.backend = "compact"
+        self._compact_graph = compact_graph
+        self.index_digest = index_digest
+        self.build_caller_relationships = build_caller_relationships
+        self.document_digests = document_digests
+        self.navigator = _CompactSymbolGraphNavigator(self._compact_graph)
+
+    def _set_snapshot(self, snapshot: SymbolGraphSnapshot, backend: str) -> None:
+        """
+        Sets the underlying graph from a snapshot, decoded into the given backend
+
+        Args:
+            snapshot (SymbolGraphSnapshot): The snapshot of the graph
+            backend (str): The storage engine behind the navigator
+        """
+        if backend == "compact":
+            self._set_compact_graph(
+                CompactSymbolGraph(snapshot),
+                snapshot.index_digest,
+                snapshot.build_caller_relationships,
+                snapshot.document_digests,
+            )
+        else:
+            self._set_graph(
+                snapshot.to_graph(),
+                snapshot.index_digest,
+                snapshot.build_caller_relationships,
+                snapshot.document_digests,
+            )
+
+    def _to_snapshot(self) -> SymbolGraphSnapshot:
+        """
+        Encodes the graph into a snapshot, regardless of its backend
+
+        Returns:
+            SymbolGraphSnapshot: The snapshot of the graph
+        """
+        if self.backend == "compact":
+            return self._compact_graph.to_snapshot(
+                self.index_digest, self.build_caller_relationships, self.document_digests
+            )
+        return SymbolGraphSnapshot.from_graph(
+            self._graph,
+            self.index_digest,
+            self.build_caller_relationships,
+            self.document_digests,
+        )
+
+    @classmethod
+    def from_snapshot(
+        cls,
+        snapshot_path: str,
+        backend: str = "networkx",
+        bounding_box_cache_path: Optional[str] = None,
+    ) -> "SymbolGraph":
+        """
+        Creates a SymbolGraph directly from a binary snapshot, without reading the index.
+
+        Args:
+            snapshot_path (str): Path to the snapshot, as written by `save_snapshot`
+            backend (str, optional): The storage engine behind the navigator,
+                either "networkx" or "compact". Defaults to "networkx".
+            bounding_box_cache_path (Optional[str]): Path to a sidecar cache of bounding boxes.
+
+        Returns:
+            SymbolGraph instance
+        """
+        if backend not in SymbolGraph.BACKENDS:
+            raise ValueError(f"backend must be one of {SymbolGraph.BACKENDS}, got {backend}")
+        snapshot = SymbolGraphSnapshot.load(snapshot_path)
+        symbol_graph = cls.__new__(cls)
+        symbol_graph.bounding_box_cache_path = bounding_box_cache_path
+        symbol_graph._set_snapshot(snapshot, backend)
+        return symbol_graph
+
+    def save_snapshot(self, snapshot_path: str) -> None:
+        """
+        Saves a binary snapshot of the graph, keyed on the index content hash
+        and the build_caller_relationships flag.
+
+        Args:
+            snapshot_path (str): Path to save the snapshot to
+        """
+        self._to_snapshot().save(snapshot_path)
+
+    def update_index(self, index_path: str) -> List[str]:
+        """
+        Incrementally updates the graph from a new version of the index.
+
+        Documents are diffed by relative path and content hash, and only the edges
+        of added, changed or removed documents are rebuilt.
+
+        Args:
+            index_path (str): Path to the new index protobuf file
+
+        Returns:
+            List[str]: The relative paths of the documents which were updated
+
+        Note:
+            The compact backend is read-optimized, so it is decoded into a networkx
+            graph for the update and re-encoded afterwards. Unlike an update of the
+            networkx backend, which is proportional to the updated documents, this costs
+            O(nodes + edges) of the whole graph, close to a full build, however few
+            documents changed. A document usually touches the columns of most edge
+            labels, so re-encoding only the changed label columns would not bound it.
+        """
+        index_digest = compute_file_digest(index_path)
+        if index_digest == self.index_digest:
+            return []
+
+        graph = self._to_snapshot().to_graph() if self.backend == "compact" else self._graph
+        builder = GraphBuilder(
+            StreamingIndex(index_path), self.build_caller_relationships, graph=graph
+        )
+        updated_paths = builder.update_graph(self.document_digests)
+        bounding_box = self.navigator.bounding_box
+        if self.backend == "compact":
+            self._set_compact_graph(
+                CompactSymbolGraph(
+                    SymbolGraphSnapshot.from_graph(
+                        graph,
+                        index_digest,
+                        self.build_caller_relationships,
+                        builder.document_digests,
+                    )
+                ),
+                index_digest,
+                self.build_caller_relationships,
+                builder.document_digests,
+            )
+            self.navigator.bounding_box = bounding_box
+        self.navigator._discard_bounding_boxes(builder.touched_symbols)
+        self.navigator._discard_sorted_references(updated_paths)
+        self.navigator._discard_label_partitions()
+        self.navigator._bounding_box_provider.clear()
+        self.navigator.bounding_box.update(
+            {
+                symbol: bounding_box
+                for symbol, bounding_box in builder.enclosing_ranges.items()
+                if symbol in builder.touched_symbols
+            }
+        )
+        self.index_digest = index_digest
+        self.document_digests = builder.document_digests
+        logger.info(f"Updated {len(updated_paths)} documents in the symbol graph")
+        return updated_paths
+
     def get_all_files(self) -> List[SymbolFile]:
         """
         Gets all file nodes in the graph.
@@ -671,7 +1611,7 @@ class SymbolGraph:
                 sym for sym in filtered_symbols if sym.dotpath.startswith(path_filter)  # type: ignore
             ]
 
-        self.navigator._pre_compute_rankable_bounding_boxes()
+        self.navigator._pre_compute_rankable_bounding_boxes(self.bounding_box_cache_path)
 
         logger.info("Building the rankable symbol subgraph...")
         for symbol in tqdm(filtered_symbols):
@@ -699,7 +1639,9 @@ class SymbolGraph:
 
         logger.info("Built the rankable symbol subgraph")
 
-        return SymbolGraph.SubGraph(graph=G, parent=self)
+        return SymbolGraph.SubGraph(
+            graph=G, parent=self, flow_rank=flow_rank, path_filter=path_filter
+        )
 
     @staticmethod
     def _load_index_protobuf(path: str) -> Index:
@@ -0,0 +1,152 @@
+import hashlib
+import logging
+import mmap
+import os
+from typing import Iterator, Tuple
+
+from automata.core.symbol.scip_pb2 import Document  # type: ignore
+
+logger = logging.getLogger(__name__)
+
+"""
+A StreamingIndex reads the documents of a SCIP index one at a time, straight from the
+protobuf wire format, rather than parsing the whole Index message into memory at once.
+An Index is a sequence of tagged fields, where each document is a length-delimited
+field 2 record, so the file is memory mapped and scanned for those records
+    - every other field (the metadata and the external symbols) is skipped,
+    - each document is decoded from its own slice and released once it is consumed,
+so peak memory is bounded by the largest document rather than by the size of the index.
+"""
+
+INDEX_DOCUMENTS_FIELD_NUMBER = 2
+
+_WIRE_TYPE_VARINT = 0
+_WIRE_TYPE_FIXED64 = 1
+_WIRE_TYPE_LENGTH_DELIMITED = 2
+_WIRE_TYPE_FIXED32 = 5
+
+
+def _read_varint(buffer: mmap.mmap, position: int) -> Tuple[int, int]:
+    """
+    Decodes a base 128 varint
+
+    Args:
+        buffer (mmap.mmap): The encoded message
+        position (int): The offset of the varint in the buffer
+
+    Returns:
+        Tuple[int, int]: The decoded value, and the offset just past the varint
+
+    Raises:
+        ValueError: If the varint is truncated
+    """
+    value = 0
+    shift = 0
+    while True:
+        if position >= len(buffer):
+            raise ValueError("Truncated varint in the index")
+        byte = buffer[position]
+        position += 1
+        value |= (byte & 0x7F) << shift
+        if not byte & 0x80:
+            return value, position
+        shift += 7
+
+
+def _skip_field(buffer: mmap.mmap, position: int, wire_type: int) -> int:
+    """
+    Skips over the payload of a field which is not a document
+
+    Args:
+        buffer (mmap.mmap): The encoded message
+        position (int): The offset of the field payload in the buffer
+        wire_type (int): The wire type of the field
+
+    Returns:
+        int: The offset just past the field
+
+    Raises:
+        ValueError: If the wire type is not supported
+    """
+    if wire_type == _WIRE_TYPE_VARINT:
+        return _read_varint(buffer, position)[1]
+    if wire_type == _WIRE_TYPE_FIXED64:
+        return position + 8
+    if wire_type == _WIRE_TYPE_LENGTH_DELIMITED:
+        length, position = _read_varint(buffer, position)
+        return position + length
+    if wire_type == _WIRE_TYPE_FIXED32:
+        return position + 4
+    raise ValueError(f"Unsupported wire type {wire_type} in the index")
+
+
+def compute_file_digest(path: str, chunk_size: int = 1 << 20) -> str:
+    """
+    Computes the sha256 content hash of a file
+
+    Args:
+        path (str): The path of the file to hash
+        chunk_size (int): The number of bytes to read at a time
+
+    Returns:
+        str: The hex digest of the file contents
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(chunk_size):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def iter_index_documents(path: str) -> Iterator[Document]:
+    """
+    Decodes the documents of an index protobuf file one at a time
+
+    Args:
+        path (str): The path to the index protobuf file
+
+    Returns:
+        Iterator[Document]: The documents of the index, in order
+    """
+    if os.path.getsize(path) == 0:
+        return
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+        position = 0
+        while position < len(buffer):
+            tag, position = _read_varint(buffer, position)
+            field_number, wire_type = tag >> 3, tag & 0x7
+            if (
+                field_number != INDEX_DOCUMENTS_FIELD_NUMBER
+                or wire_type != _WIRE_TYPE_LENGTH_DELIMITED
+            ):
+                position = _skip_field(buffer, position, wire_type)
+                continue
+
+            length, position = _read_varint(buffer, position)
+            document = Document()
+            document.ParseFromString(buffer[position : position + length])
+            position += length
+            yield document
+
+
+class StreamingIndex:
+    """
+    An Index whose documents are decoded from disk on demand
+    """
+
+    def __init__(self, path: str) -> None:
+        """
+        Args:
+            path (str): The path to the index protobuf file
+        """
+        self.path = path
+
+    @property
+    def documents(self) -> Iterator[Document]:
+        """
+        Gets a fresh iterator over the documents of the index
+
+        Every access re-reads the file, so each pass over the documents
+        only holds one of them in memory at a time.
+        """
+        return iter_index_documents(self.path)
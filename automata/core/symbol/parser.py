@@ -1,5 +1,7 @@
 import re
-from typing import List, Optional
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple
 
 from automata.core.symbol.symbol_types import Symbol, SymbolDescriptor, SymbolPackage
 
@@ -7,8 +9,14 @@ from automata.core.symbol.symbol_types import Symbol, SymbolDescriptor, SymbolPa
 SCIP produces symbol URI, it identifies a class, method, or a local variable, along with the entire AST path to it.
 Full spec: https://github.com/sourcegraph/scip/blob/ee677ba3756cdcdb55b39942b5701f0fde9d69fa/docs/scip.md#symbol
 The classes and functions in this file are used to convert the symbol URI into a human-readable form that can be used to query the index.
+
+Parsed symbols are interned in a bounded, process-wide table, so that parsing the same URI
+twice returns the same Symbol instance rather than a fresh copy of its descriptors.
 """
 
+# The maximum number of parsed symbols held in the intern table
+SYMBOL_INTERN_TABLE_SIZE = 1 << 18
+
 
 class _SymbolParser:
     """
@@ -216,6 +224,67 @@ class _SymbolParser:
         return c.isalpha() or c.isdigit() or c in ["-", "+", "$", "_"]
 
 
+class _SymbolInternTable:
+    """
+    A bounded, least-recently-used table of parsed symbols, shared by the whole process.
+    Symbols are frozen, so handing out the same instance to every caller is safe.
+    """
+
+    def __init__(self, max_size: int) -> None:
+        """
+        Args:
+            max_size (int): The maximum number of symbols to hold
+        """
+        self.max_size = max_size
+        self._symbols: "OrderedDict[Tuple[str, bool], Symbol]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Tuple[str, bool]) -> Optional[Symbol]:
+        """
+        Gets an interned symbol
+
+        Args:
+            key (Tuple[str, bool]): The symbol URI and whether descriptors were parsed
+
+        Returns:
+            Optional[Symbol] - The interned symbol, or None if it is not interned
+        """
+        with self._lock:
+            symbol = self._symbols.get(key)
+            if symbol is not None:
+                self._symbols.move_to_end(key)
+            return symbol
+
+    def intern(self, key: Tuple[str, bool], symbol: Symbol) -> Symbol:
+        """
+        Interns a symbol, evicting the least recently used symbol when the table is full
+
+        Args:
+            key (Tuple[str, bool]): The symbol URI and whether descriptors were parsed
+            symbol (Symbol): The parsed symbol
+
+        Returns:
+            Symbol - The interned symbol, which is the existing instance if there is one
+        """
+        with self._lock:
+            interned_symbol = self._symbols.setdefault(key, symbol)
+            self._symbols.move_to_end(key)
+            if len(self._symbols) > self.max_size:
+                self._symbols.popitem(last=False)
+            return interned_symbol
+
+    def clear(self) -> None:
+        """Clears the table"""
+        with self._lock:
+            self._symbols.clear()
+
+    def __len__(self) -> int:
+        return len(self._symbols)
+
+
+_symbol_intern_table = _SymbolInternTable(SYMBOL_INTERN_TABLE_SIZE)
+
+
 def parse_symbol(symbol_uri: str, include_descriptors: bool = True) -> Symbol:
     """
     Parses a symbol from a URI
@@ -224,14 +293,94 @@ def parse_symbol(symbol_uri: str, include_descriptors: bool = True) -> Symbol:
         symbol_uri (str): The URI of the symbol
         include_descriptors (bool): Whether to include descriptors in the symbol
 
+    Returns:
+        Symbol - The parsed symbol, which is shared by every parse of the same URI
+            while it remains in the intern table
+    """
+    key = (symbol_uri, include_descriptors)
+    symbol = _symbol_intern_table.get(key)
+    if symbol is None:
+        symbol = _symbol_intern_table.intern(key, _parse_symbol(symbol_uri, include_descriptors))
+    return symbol
+
+
+def parse_symbols(symbol_uris: Iterable[str], include_descriptors: bool = True) -> List[Symbol]:
+    """
+    Parses a batch of symbols from their URIs
+
+    Args:
+        symbol_uris (Iterable[str]): The URIs of the symbols
+        include_descriptors (bool): Whether to include descriptors in the symbols
+
+    Returns:
+        List[Symbol] - The parsed symbols, in order
+
+    Raises:
+        ValueError: If any of the URIs is malformed
+
+    Notes:
+        The symbols of an index share a handful of scheme and package prefixes,
+        so each distinct prefix is parsed once per batch and its SymbolPackage is reused.
+    """
+    packages: Dict[str, Tuple[str, SymbolPackage]] = {}
+    symbols = []
+    for symbol_uri in symbol_uris:
+        key = (symbol_uri, include_descriptors)
+        symbol = _symbol_intern_table.get(key)
+        if symbol is None:
+            symbol = _symbol_intern_table.intern(
+                key, _parse_symbol_with_shared_prefix(symbol_uri, include_descriptors, packages)
+            )
+        symbols.append(symbol)
+    return symbols
+
+
+def _parse_symbol_with_shared_prefix(
+    symbol_uri: str,
+    include_descriptors: bool,
+    packages: Dict[str, Tuple[str, SymbolPackage]],
+) -> Symbol:
+    """
+    Parses a symbol from a URI, reusing the scheme and package of previously parsed prefixes
+
+    Args:
+        symbol_uri (str): The URI of the symbol
+        include_descriptors (bool): Whether to include descriptors in the symbol
+        packages (Dict[str, Tuple[str, SymbolPackage]]): The parsed scheme and package
+            of each prefix seen so far, which is updated in place
+
     Returns:
         Symbol - The parsed symbol
     """
+    fields = symbol_uri.split(" ", 4)
+    # An empty field is an escaped space, which the shared prefix fast path does not handle
+    if len(fields) < 5 or fields[0] == "local" or not all(fields[:4]):
+        return _parse_symbol(symbol_uri, include_descriptors)
+
+    prefix = symbol_uri[: len(symbol_uri) - len(fields[4])]
     s = _SymbolParser(symbol_uri)
-    scheme = s.accept_space_escaped_identifier("scheme")
+    if prefix not in packages:
+        scheme = s.accept_space_escaped_identifier("scheme")
+        packages[prefix] = (scheme, _accept_package(s))
 
-    if scheme == "local":
-        return new_local_symbol(symbol_uri, s.symbol[s.index :])
+    scheme, package = packages[prefix]
+    descriptors: List[SymbolDescriptor] = []
+    if include_descriptors:
+        s.index = len(prefix)
+        descriptors = s.parse_descriptors()
+    return Symbol(symbol_uri, scheme, package, tuple(descriptors))
+
+
+def _accept_package(s: _SymbolParser) -> SymbolPackage:
+    """
+    Accepts the package manager, name and version of a symbol
+
+    Args:
+        s (_SymbolParser): A parser positioned after the scheme of the symbol
+
+    Returns:
+        SymbolPackage - The package of the symbol
+    """
     manager = s.accept_space_escaped_identifier("package manager")
 
     manager = "" if manager == "." else manager
@@ -241,13 +390,34 @@ def parse_symbol(symbol_uri: str, include_descriptors: bool = True) -> Symbol:
     package_version = s.accept_space_escaped_identifier("package version")
 
     package_version = "" if package_version == "." else package_version
+    return SymbolPackage(manager, package_name, package_version)
+
+
+def _parse_symbol(symbol_uri: str, include_descriptors: bool = True) -> Symbol:
+    """
+    Parses a symbol from a URI, bypassing the intern table
+
+    Args:
+        symbol_uri (str): The URI of the symbol
+        include_descriptors (bool): Whether to include descriptors in the symbol
+
+    Returns:
+        Symbol - The parsed symbol
+    """
+    s = _SymbolParser(symbol_uri)
+    scheme = s.accept_space_escaped_identifier("scheme")
+
+    if scheme == "local":
+        return new_local_symbol(symbol_uri, s.symbol[s.index :])
+    package = _accept_package(s)
+
     descriptors = []
     if include_descriptors:
         descriptors = s.parse_descriptors()
     return Symbol(
         symbol_uri,
         scheme,
-        SymbolPackage(manager, package_name, package_version),
+        package,
         tuple(descriptors),
     )
 
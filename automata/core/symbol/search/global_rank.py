@@ -0,0 +1,174 @@
+import json
+import logging
+import os
+from typing import TYPE_CHECKING, List, Optional, Tuple
+
+from automata.core.symbol.parser import parse_symbol
+from automata.core.symbol.symbol_types import Symbol
+
+if TYPE_CHECKING:
+    from automata.core.symbol.search.rank import SymbolRank, SymbolRankConfig
+
+logger = logging.getLogger(__name__)
+
+"""
+The global SymbolRank is the non-personalized rank of every symbol in the SymbolSearch
+subgraph. It does not depend on any query, so it is computed once when the index is
+processed and stored next to the index as a small json file, keyed on the index
+content hash, the version of the code embeddings which filter the subgraph and the
+SymbolRank config, which lets consumers such as the agent config formatter read it
+without building the symbol graph, the embeddings or the subgraph.
+"""
+
+GLOBAL_SYMBOL_RANK_FORMAT_VERSION = 2
+
+
+class GlobalSymbolRank:
+    """
+    The persisted, non-personalized SymbolRanks of an index
+    """
+
+    def __init__(
+        self,
+        index_digest: str,
+        ranks: List[Tuple[str, float]],
+        embedding_version: Optional[str] = None,
+        config: str = "",
+    ) -> None:
+        """
+        Args:
+            index_digest (str): The content hash of the index the ranks were computed from
+            ranks (List[Tuple[str, float]]): Each symbol uri and its rank, in descending rank
+            embedding_version (Optional[str]): The version of the code embedding database
+                which filtered the subgraph. Defaults to None.
+            config (str): The repr of the SymbolRankConfig of the ranks. Defaults to "".
+        """
+        self.index_digest = index_digest
+        self.ranks = ranks
+        self.embedding_version = embedding_version
+        self.config = config
+
+    @classmethod
+    def from_symbol_rank(
+        cls,
+        symbol_rank: "SymbolRank",
+        index_digest: str,
+        embedding_version: Optional[str],
+    ) -> "GlobalSymbolRank":
+        """
+        Computes the global ranks of a SymbolRank's graph
+
+        Args:
+            symbol_rank (SymbolRank): The SymbolRank of the SymbolSearch subgraph
+            index_digest (str): The content hash of the index the graph was built from
+            embedding_version (Optional[str]): The version of the code embedding database
+                which filtered the subgraph
+
+        Returns:
+            GlobalSymbolRank: The computed ranks
+        """
+        return cls(
+            index_digest,
+            [
+                (getattr(symbol, "uri", str(symbol)), rank)
+                for symbol, rank in symbol_rank.get_ranks()
+            ],
+            embedding_version,
+            repr(symbol_rank.config),
+        )
+
+    def get_top_symbols(self, count: int) -> List[Symbol]:
+        """
+        Gets the highest ranked symbols
+
+        Args:
+            count (int): The number of symbols to get
+
+        Returns:
+            List[Symbol]: The symbols, in descending rank
+        """
+        return [parse_symbol(uri) for uri, _ in self.ranks[:count]]
+
+    def save(self, path: str) -> None:
+        """
+        Saves the ranks to disk
+
+        Args:
+            path (str): The path to save the ranks to
+        """
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, "w") as f:
+            json.dump(
+                {
+                    "format_version": GLOBAL_SYMBOL_RANK_FORMAT_VERSION,
+                    "index_digest": self.index_digest,
+                    "embedding_version": self.embedding_version,
+                    "config": self.config,
+                    "ranks": self.ranks,
+                },
+                f,
+            )
+        os.replace(temp_path, path)
+
+    @classmethod
+    def load_if_fresh(
+        cls,
+        path: str,
+        index_digest: str,
+        embedding_version: Optional[str],
+        config: "SymbolRankConfig",
+    ) -> Optional["GlobalSymbolRank"]:
+        """
+        Loads the ranks from disk if they exist and were computed from the given index,
+        code embeddings and config
+
+        Args:
+            path (str): The path to load the ranks from
+            index_digest (str): The content hash of the current index
+            embedding_version (Optional[str]): The version of the current code embedding
+                database, where None is never fresh
+            config (SymbolRankConfig): The current SymbolRankConfig
+
+        Returns:
+            Optional[GlobalSymbolRank]: The ranks, or None if they are missing or stale
+        """
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, "r") as f:
+                payload = json.load(f)
+            if payload.get("format_version") != GLOBAL_SYMBOL_RANK_FORMAT_VERSION:
+                raise ValueError(
+                    f"Unsupported global SymbolRank format version {payload.get('format_version')}"
+                    f", expected {GLOBAL_SYMBOL_RANK_FORMAT_VERSION}"
+                )
+            if (
+                payload["index_digest"] != index_digest
+                or embedding_version is None
+                or payload["embedding_version"] != embedding_version
+                or payload["config"] != repr(config)
+            ):
+                logger.info(f"Global SymbolRank at {path} is stale")
+                return None
+            return cls(
+                payload["index_digest"],
+                [(uri, rank) for uri, rank in payload["ranks"]],
+                payload["embedding_version"],
+                payload["config"],
+            )
+        except Exception as e:
+            logger.warning(f"Failed to load global SymbolRank at {path} with error {e}")
+            return None
+
+    @staticmethod
+    def default_path(index_path: str) -> str:
+        """
+        Gets the default path of the global ranks of an index
+
+        Args:
+            index_path (str): The path to the index protobuf file
+
+        Returns:
+            str: The path where the global ranks of the index are stored by default
+        """
+        return f"{index_path}.symbol_rank.json"
@@ -0,0 +1,281 @@
+import atexit
+import copy
+import dataclasses
+import logging
+import os
+import time
+from collections import Counter, OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, Optional, Sequence, Tuple
+
+import jsonpickle
+
+logger = logging.getLogger(__name__)
+
+"""
+A QueryResultCache holds the results of recent SymbolSearch queries, keyed on the query
+type and normalized query, for a single version of the graph and embeddings the
+results were computed from. The first lookup made with a different version clears
+the cache, so a rebuilt graph or embedding database never serves stale results.
+Entries expire after a time to live, the least recently used entry is evicted once the
+cache is full, and when a file path is given the entries are saved there once every
+save_interval new results, on close and at exit, and reloaded by the next session, which
+is what lets repeats across sessions hit. Results are copied in and out of the cache,
+so a caller mutating its result can never change what later lookups are served.
+"""
+
+DEFAULT_QUERY_CACHE_SIZE = 1024
+
+# The number of new results after which the cache is saved to its file
+DEFAULT_QUERY_CACHE_SAVE_INTERVAL = 32
+
+# In seconds
+DEFAULT_QUERY_CACHE_TTL = 24 * 60 * 60.0
+
+
+class QueryResultCache:
+    """
+    An LRU cache of query results with a time to live and optional disk persistence
+    """
+
+    def __init__(
+        self,
+        max_size: int = DEFAULT_QUERY_CACHE_SIZE,
+        ttl: Optional[float] = DEFAULT_QUERY_CACHE_TTL,
+        file_path: Optional[str] = None,
+        save_interval: int = DEFAULT_QUERY_CACHE_SAVE_INTERVAL,
+    ) -> None:
+        """
+        Args:
+            max_size (int): The maximum number of cached results
+            ttl (Optional[float]): The number of seconds a result stays valid for,
+                or None if results never expire
+            file_path (Optional[str]): The path of the file the cache is persisted to,
+                or None to only keep it in memory
+            save_interval (int): The number of new results after which the cache is saved
+        """
+        if max_size <= 0:
+            raise ValueError(f"max_size must be positive, but got {max_size}")
+        if save_interval <= 0:
+            raise ValueError(f"save_interval must be positive, but got {save_interval}")
+        self.max_size = max_size
+        self.ttl = ttl
+        self.file_path = file_path
+        self.save_interval = save_interval
+        self.version: Optional[Hashable] = None
+        self.hits: Counter = Counter()
+        self.misses: Counter = Counter()
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[float, Any]]" = OrderedDict()
+        # The number of results cached since the cache was last saved
+        self._unsaved_count = 0
+        if file_path is not None:
+            self.load()
+            atexit.register(self.flush)
+
+    def get_or_compute(
+        self, query_type: str, query: str, version: Hashable, compute: Callable[[], Any]
+    ) -> Any:
+        """
+        Gets the cached result of a query, computing and caching it on a miss
+
+        Args:
+            query_type (str): The type of the query, e.g. "symbol_rank"
+            query (str): The normalized query
+            version (Hashable): The version of the data the result is computed from
+            compute (Callable[[], Any]): Computes the result of the query
+
+        Returns:
+            Any: A copy of the result of the query
+        """
+        self._set_version(version)
+        key = (query_type, query)
+        entry = self._get_entry(key)
+        if entry is not None:
+            self.hits[query_type] += 1
+            return QueryResultCache._copy_result(entry[1])
+
+        self.misses[query_type] += 1
+        result = compute()
+        self._put_entry(key, result)
+        self._save_if_due()
+        return result
+
+    def get_or_compute_batch(
+        self,
+        query_type: str,
+        queries: Sequence[str],
+        version: Hashable,
+        compute: Callable[[List[int]], List[Any]],
+    ) -> List[Any]:
+        """
+        Gets the cached results of several queries, computing the missing results together
+        in a single call and caching them
+
+        Args:
+            query_type (str): The type of the queries, e.g. "symbol_rank"
+            queries (Sequence[str]): The normalized queries
+            version (Hashable): The version of the data the results are computed from
+            compute (Callable[[List[int]], List[Any]]): Computes the results of the queries
+                at the given positions, in order
+
+        Returns:
+            List[Any]: A copy of the result of each query, in query order
+        """
+        self._set_version(version)
+        results: List[Any] = [None] * len(queries)
+        # The positions of each missing query, which is computed once even if repeated
+        missing: Dict[str, List[int]] = {}
+        for position, query in enumerate(queries):
+            entry = self._get_entry((query_type, query))
+            if entry is not None:
+                self.hits[query_type] += 1
+                results[position] = QueryResultCache._copy_result(entry[1])
+            else:
+                self.misses[query_type] += 1
+                missing.setdefault(query, []).append(position)
+
+        if missing:
+            computed_results = compute([positions[0] for positions in missing.values()])
+            for (query, positions), result in zip(missing.items(), computed_results):
+                self._put_entry((query_type, query), result)
+                results[positions[0]] = result
+                for position in positions[1:]:
+                    results[position] = QueryResultCache._copy_result(result)
+            self._save_if_due()
+        return results
+
+    def _set_version(self, version: Hashable) -> None:
+        """
+        Clears the cache if the searched data changed since the last lookup
+
+        Args:
+            version (Hashable): The version of the data of the lookup
+        """
+        if version != self.version:
+            if self._entries:
+                logger.debug("Clearing the query cache, as the searched data has changed")
+            self._entries.clear()
+            self.version = version
+
+    def _get_entry(self, key: Tuple[str, str]) -> Optional[Tuple[float, Any]]:
+        """
+        Gets the entry of a query if it is cached and has not expired
+
+        Args:
+            key (Tuple[str, str]): The query type and normalized query
+
+        Returns:
+            Optional[Tuple[float, Any]]: The time the result was cached and the result
+        """
+        entry = self._entries.get(key)
+        if entry is None or (self.ttl is not None and time.time() - entry[0] > self.ttl):
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def _put_entry(self, key: Tuple[str, str], result: Any) -> None:
+        """
+        Caches a copy of the result of a query, evicting the least recently used entries
+
+        Args:
+            key (Tuple[str, str]): The query type and normalized query
+            result (Any): The result of the query
+        """
+        self._entries[key] = (time.time(), QueryResultCache._copy_result(result))
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+        self._unsaved_count += 1
+
+    def _save_if_due(self) -> None:
+        """Saves the cache to its file once save_interval new results were cached"""
+        if self.file_path is not None and self._unsaved_count >= self.save_interval:
+            self.save()
+
+    def hit_rate(self, query_type: Optional[str] = None) -> float:
+        """
+        Gets the fraction of lookups which were served from the cache
+
+        Args:
+            query_type (Optional[str]): The query type to get the hit rate of,
+                or None for the hit rate across all query types
+
+        Returns:
+            float: The hit rate, which is 0 when there were no lookups
+        """
+        if query_type is None:
+            hits, misses = sum(self.hits.values()), sum(self.misses.values())
+        else:
+            hits, misses = self.hits[query_type], self.misses[query_type]
+        return hits / (hits + misses) if hits + misses else 0.0
+
+    def clear(self) -> None:
+        """Removes all cached results, leaving the hit and miss counters untouched"""
+        self._entries.clear()
+        self.version = None
+        self._unsaved_count += 1
+
+    def flush(self) -> None:
+        """Saves the cache to its file if it has a file and changed since it was last saved"""
+        if self.file_path is not None and self._unsaved_count > 0:
+            self.save()
+
+    def close(self) -> None:
+        """Saves any unsaved results, after which the cache no longer saves at exit"""
+        self.flush()
+        atexit.unregister(self.flush)
+
+    def save(self) -> None:
+        """Saves the cached results to the cache file"""
+        if self.file_path is None:
+            raise ValueError("The query cache has no file path to save to")
+        temp_path = f"{self.file_path}.{os.getpid()}.tmp"
+        with open(temp_path, "w") as file:
+            file.write(
+                jsonpickle.encode(
+                    {"version": self.version, "entries": list(self._entries.items())}
+                )
+            )
+        os.replace(temp_path, self.file_path)
+        self._unsaved_count = 0
+
+    def load(self) -> None:
+        """Loads the cached results from the cache file, if it exists"""
+        if self.file_path is None or not os.path.exists(self.file_path):
+            return
+        try:
+            with open(self.file_path, "r") as file:
+                payload = jsonpickle.decode(file.read())
+            self.version = payload["version"]
+            self._entries = OrderedDict(
+                (tuple(key), tuple(entry)) for key, entry in payload["entries"]
+            )
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+        except Exception as e:
+            logger.warning(f"Failed to load the query cache at {self.file_path} with error {e}")
+            self.clear()
+        self._unsaved_count = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @staticmethod
+    def _copy_result(result: Any) -> Any:
+        """
+        Copies a result down to its immutable values, which are shared with the copy
+
+        Args:
+            result (Any): The result to copy
+
+        Returns:
+            Any: The copy of the result
+        """
+        if result is None or isinstance(result, (str, bytes, int, float)):
+            return result
+        if dataclasses.is_dataclass(result) and result.__dataclass_params__.frozen:  # type: ignore
+            return result
+        if type(result) in (list, tuple, set):
+            return type(result)(QueryResultCache._copy_result(value) for value in result)
+        if type(result) is dict:
+            return {key: QueryResultCache._copy_result(value) for key, value in result.items()}
+        return copy.deepcopy(result)
@@ -1,8 +1,12 @@
-from typing import Dict, Hashable, List, Optional, Tuple
+import math
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
 
 import networkx as nx
+import numpy as np
 from networkx.exception import NetworkXError
 from pydantic import BaseModel
+from scipy import sparse
 
 from automata.core.symbol.symbol_types import Symbol
 
@@ -14,6 +18,9 @@ class SymbolRankConfig(BaseModel):
     max_iterations: int = 100
     tolerance: float = 1.0e-6
     weight_key: str = "weight"
+    backend: str = "sparse"
+    # The bound on the residual rank mass left unpushed by get_top_ranks
+    approximation_error: float = 1.0e-4
 
     @staticmethod
     def validate_config(config) -> None:
@@ -24,7 +31,9 @@ class SymbolRankConfig(BaseModel):
             config (SymbolRankConfig): Configuration parameters.
 
         Raises:
-            ValueError: If alpha is not in (0, 1), or tolerance is not in (1e-4, 1e-8).
+            ValueError: If alpha is not in (0, 1), tolerance is not in (1e-4, 1e-8),
+                backend is not one of SymbolRank.BACKENDS,
+                or approximation_error is not in (0, 1).
         """
         if not 0 < config.alpha < 1:
             raise ValueError(f"alpha must be in (0,1), but got {config.alpha}")
@@ -32,10 +41,40 @@ class SymbolRankConfig(BaseModel):
         if not 1.0e-8 < config.tolerance < 1.0e-4:
             raise ValueError(f"tolerance must be in (1e-4,1e-8), but got {config.tolerance}")
 
+        if not 0 < config.approximation_error < 1:
+            raise ValueError(
+                f"approximation_error must be in (0,1), but got {config.approximation_error}"
+            )
+
+        if config.backend not in SymbolRank.BACKENDS:
+            raise ValueError(
+                f"backend must be one of {SymbolRank.BACKENDS}, but got {config.backend}"
+            )
+
+
+@dataclass
+class SymbolRankUpdate:
+    """The result of an incremental SymbolRank update"""
+
+    ranks: List[Tuple[Symbol, float]]
+    # The number of iterations the update ran, including the evaluation of the warm start
+    iterations: int
+    # The number of iterations a cold start from uniform ranks takes on this graph
+    cold_start_iterations: int
+
+    @property
+    def iterations_saved(self) -> int:
+        """The number of iterations saved by warm-starting, compared to a cold start"""
+        return max(self.cold_start_iterations - self.iterations, 0)
+
 
 class SymbolRank:
     """Computes the PageRank algorithm on symbols in a graph"""
 
+    # "python" iterates over the graph's adjacency dicts,
+    # while "sparse" runs a vectorized power iteration over a CSR transition matrix
+    BACKENDS = ("python", "sparse")
+
     def __init__(self, graph: nx.DiGraph, config: SymbolRankConfig) -> None:
         """
         Args:
@@ -47,6 +86,25 @@ class SymbolRank:
         self.graph = graph
         self.config = config
         self.config.validate_config(self.config)
+        # The query independent structure of the graph, e.g. the transition matrix,
+        # which is reused across queries for as long as the graph version is unchanged
+        self._graph_structure: Dict[str, Any] = {}
+        self._graph_structure_version: Optional[Tuple[int, int, int]] = None
+        # The number of iterations of the last power iteration from uniform ranks
+        # on the current graph version
+        self._cold_start_iterations: Optional[int] = None
+
+    def invalidate(self) -> None:
+        """
+        Discards the cached structure of the graph, so that it is rebuilt on the next query.
+
+        Adding or removing nodes and edges is detected from the node and edge counts of
+        the graph, but edits which keep both counts, e.g. moving or reweighting an edge
+        in place, are not, so the owner of the graph must call this after making them.
+        """
+        self._graph_structure.clear()
+        self._graph_structure_version = None
+        self._cold_start_iterations = None
 
     def get_ranks(
         self,
@@ -67,7 +125,10 @@ class SymbolRank:
         Returns:
             (Dict[str, float]): A dictionary mapping each node to its SymbolRank
         """
-        stochastic_graph = self._prepare_graph()
+        if self.config.backend == "sparse":
+            return self._get_ranks_sparse(query_to_symbol_similarity, initial_weights, dangling)
+
+        stochastic_graph = self._get_graph_structure("stochastic_graph", self._prepare_graph)
         node_count = stochastic_graph.number_of_nodes()
 
         rank_vec = self._prepare_initial_ranks(stochastic_graph, initial_weights)
@@ -75,9 +136,11 @@ class SymbolRank:
             node_count, stochastic_graph, query_to_symbol_similarity
         )
         dangling_weights = self._prepare_dangling_weights(dangling, prepared_similarity)
-        dangling_nodes = self._get_dangling_nodes(stochastic_graph)
+        dangling_nodes = self._get_graph_structure(
+            "dangling_nodes", lambda: self._get_dangling_nodes(stochastic_graph)
+        )
 
-        for _ in range(self.config.max_iterations):
+        for iteration in range(self.config.max_iterations):
             last_rank_vec = rank_vec
             rank_vec = {k: 0.0 for k in last_rank_vec.keys()}
             danglesum = self.config.alpha * sum(last_rank_vec[node] for node in dangling_nodes)  # type: ignore
@@ -95,6 +158,8 @@ class SymbolRank:
 
             err = sum(abs(rank_vec[node] - last_rank_vec[node]) for node in rank_vec)
             if err < node_count * self.config.tolerance:
+                if initial_weights is None:
+                    self._cold_start_iterations = iteration + 1
                 sorted_dict = sorted(rank_vec.items(), key=lambda x: x[1], reverse=True)
                 return sorted_dict
 
@@ -103,6 +168,469 @@ class SymbolRank:
             % self.config.max_iterations
         )
 
+    def get_ranks_batch(
+        self,
+        queries_to_symbol_similarity: List[Optional[Dict[Symbol, float]]],
+        initial_weights: Optional[Dict[Symbol, float]] = None,
+        dangling: Optional[Dict[Symbol, float]] = None,
+    ) -> List[List[Tuple[Symbol, float]]]:
+        """
+        Calculate the SymbolRanks of each node in the graph for several queries at once
+
+        With the sparse backend, the personalization vectors of the queries are stacked
+        into the columns of a matrix, so that every query advances together in a single
+        sparse matrix-matrix product per iteration. A query stops iterating once it
+        has converged, so each result matches that of `get_ranks` for the same query.
+
+        Args:
+            queries_to_symbol_similarity (List[Optional[Dict[Symbol, float]]]):
+                The query_to_symbol_similarity dictionary of each query
+            initial_weights (Optional[Dict[Symbol, float]]): Initial weights dictionary,
+                shared by every query
+            dangling (Optional[Dict[Symbol, float]]): List of dangling nodes,
+                shared by every query
+
+        Returns:
+            (List[List[Tuple[Symbol, float]]]): The SymbolRanks of each query,
+                in the order of the queries
+        """
+        if self.config.backend != "sparse":
+            return [
+                self.get_ranks(query_to_symbol_similarity, initial_weights, dangling)
+                for query_to_symbol_similarity in queries_to_symbol_similarity
+            ]
+        if not queries_to_symbol_similarity:
+            return []
+
+        nodes, transition, dangling_mask = self._get_graph_structure(
+            "transition_matrix", self._prepare_transition_matrix
+        )
+        node_count = len(nodes)
+
+        similarity_columns = []
+        dangling_columns = []
+        for query_to_symbol_similarity in queries_to_symbol_similarity:
+            prepared_similarity = self._prepare_query_to_symbol_similarity(
+                node_count, self.graph, query_to_symbol_similarity
+            )
+            similarity_vec = SymbolRank._to_vector(nodes, prepared_similarity)
+            similarity_columns.append(similarity_vec)
+            dangling_columns.append(
+                similarity_vec
+                if dangling is None
+                else SymbolRank._to_vector(
+                    nodes, self._prepare_dangling_weights(dangling, prepared_similarity)
+                )
+            )
+        similarity_mat = np.column_stack(similarity_columns)
+        dangling_mat = np.column_stack(dangling_columns)
+        initial_vec = SymbolRank._to_vector(
+            nodes, self._prepare_initial_ranks(self.graph, initial_weights)
+        )
+        rank_mat = np.repeat(initial_vec[:, np.newaxis], len(similarity_columns), axis=1)
+
+        # The columns of the queries which have not converged yet
+        active = np.arange(len(similarity_columns))
+        rank_vecs: List[Optional[np.ndarray]] = [None] * len(similarity_columns)
+        alpha = self.config.alpha
+        for _ in range(self.config.max_iterations):
+            last_rank_mat = rank_mat
+            danglesums = alpha * last_rank_mat[dangling_mask].sum(axis=0)
+            rank_mat = (
+                alpha * (transition @ last_rank_mat)
+                + danglesums * dangling_mat
+                + (1.0 - alpha) * similarity_mat
+            )
+
+            errs = np.abs(rank_mat - last_rank_mat).sum(axis=0)
+            converged = errs < node_count * self.config.tolerance
+            for column in np.flatnonzero(converged):
+                rank_vecs[active[column]] = rank_mat[:, column]
+            if converged.all():
+                return [
+                    SymbolRank._sort_ranks(nodes, rank_vec) for rank_vec in rank_vecs  # type: ignore
+                ]
+            if converged.any():
+                remaining = ~converged
+                active = active[remaining]
+                rank_mat = rank_mat[:, remaining]
+                similarity_mat = similarity_mat[:, remaining]
+                dangling_mat = dangling_mat[:, remaining]
+
+        raise NetworkXError(
+            "SymbolRank: power iteration failed to converge in %d iterations."
+            % self.config.max_iterations
+        )
+
+    def get_top_ranks(
+        self,
+        query_to_symbol_similarity: Optional[Dict[Symbol, float]] = None,
+        top_k: int = 10,
+    ) -> List[Tuple[Symbol, float]]:
+        """
+        Approximate the k highest SymbolRanks with a forward push
+
+        The personalization starts out as residual rank mass. Each round, every node
+        holding more than approximation_error / node_count of residual keeps (1 - alpha)
+        of it as rank and pushes the rest along its out-edges, so only the neighborhoods
+        that receive mass are visited. Rank pushed into dangling nodes is dropped,
+        which only rescales the result, as SymbolRank returns it along the personalization.
+
+        The residual mass bounds how much rank any node can still gain, so the pushes
+        stop as soon as the order of the top k nodes can no longer change,
+        or once the residual mass is below approximation_error.
+
+        Args:
+            query_to_symbol_similarity (Optional[Dict[Symbol, float]]):
+                query_to_symbol_similarity dictionary
+            top_k (int): The number of highest ranked nodes to return
+
+        Returns:
+            (List[Tuple[Symbol, float]]): The top k nodes and their approximate SymbolRank,
+                in descending rank
+        """
+        nodes, transition, _ = self._get_graph_structure(
+            "transition_matrix", self._prepare_transition_matrix
+        )
+        out_transition = self._get_out_transition_matrix(transition)
+        node_count = len(nodes)
+        top_k = min(top_k, node_count)
+        if top_k <= 0:
+            return []
+
+        residual_vec = SymbolRank._to_vector(
+            nodes,
+            self._prepare_query_to_symbol_similarity(
+                node_count, self.graph, query_to_symbol_similarity
+            ),
+        )
+        rank_vec = np.zeros(node_count)
+        alpha = self.config.alpha
+        error = self.config.approximation_error
+        for _ in range(self.config.max_iterations):
+            residual_mass = residual_vec.sum()
+            if residual_mass <= error or SymbolRank._is_top_k_stable(
+                rank_vec, residual_mass, top_k
+            ):
+                top = np.argpartition(-rank_vec, top_k - 1)[:top_k]
+                return SymbolRank._sort_ranks(
+                    [nodes[i] for i in top.tolist()], rank_vec[top] / rank_vec.sum()
+                )
+
+            active = np.flatnonzero(residual_vec > error / node_count)
+            pushed = residual_vec[active]
+            residual_vec[active] = 0.0
+            rank_vec[active] += (1.0 - alpha) * pushed
+            residual_vec += alpha * (out_transition[active].T @ pushed)
+
+        raise NetworkXError(
+            "SymbolRank: forward push failed to converge in %d rounds."
+            % self.config.max_iterations
+        )
+
+    def update_ranks(
+        self,
+        previous_ranks: List[Tuple[Symbol, float]],
+        query_to_symbol_similarity: Optional[Dict[Symbol, float]] = None,
+        dangling: Optional[Dict[Symbol, float]] = None,
+    ) -> SymbolRankUpdate:
+        """
+        Recalculate the SymbolRanks after the graph was edited, warm-starting
+        from the ranks computed before the edit
+
+        The previous ranks are aligned with the current nodes, where added nodes start
+        at 0, and one full iteration measures how far they are from the new fixed point.
+        When only a few nodes or edges changed, that difference is concentrated around
+        them, so rather than iterating over the whole graph, each following iteration
+        only propagates the difference out of the nodes where it still exceeds the
+        tolerance, along their out-edges, until the remaining difference is within the
+        convergence threshold of `get_ranks`. Edits which keep the node and edge counts
+        of the graph must be followed by a call to `invalidate` first.
+
+        Args:
+            previous_ranks (List[Tuple[Symbol, float]]): The ranks before the edit,
+                as returned by `get_ranks`
+            query_to_symbol_similarity (Optional[Dict[Symbol, float]]):
+                query_to_symbol_similarity dictionary, which must match the one
+                the previous ranks were computed with
+            dangling (Optional[Dict[Symbol, float]]): List of dangling nodes
+
+        Returns:
+            (SymbolRankUpdate): The new ranks, in descending rank,
+                and the number of iterations the update took and saved
+        """
+        nodes, transition, dangling_mask = self._get_graph_structure(
+            "transition_matrix", self._prepare_transition_matrix
+        )
+        out_transition = self._get_out_transition_matrix(transition)
+        node_count = len(nodes)
+        if node_count == 0:
+            return SymbolRankUpdate([], 0, 0)
+
+        prepared_similarity = self._prepare_query_to_symbol_similarity(
+            node_count, self.graph, query_to_symbol_similarity
+        )
+        similarity_vec = SymbolRank._to_vector(nodes, prepared_similarity)
+        dangling_vec = (
+            similarity_vec
+            if dangling is None
+            else SymbolRank._to_vector(
+                nodes, self._prepare_dangling_weights(dangling, prepared_similarity)
+            )
+        )
+        rank_vec = SymbolRank._to_vector(nodes, dict(previous_ranks))
+        total = rank_vec.sum()
+        rank_vec = rank_vec / total if total > 0.0 else np.full(node_count, 1.0 / node_count)
+
+        alpha = self.config.alpha
+        # The difference between one iteration from the warm start and the warm start itself.
+        # The ranks converge to the warm start plus the difference propagated through the graph
+        delta_vec = (
+            alpha * (transition @ rank_vec)
+            + alpha * rank_vec[dangling_mask].sum() * dangling_vec
+            + (1.0 - alpha) * similarity_vec
+            - rank_vec
+        )
+        for iteration in range(1, self.config.max_iterations + 1):
+            if np.abs(delta_vec).sum() < node_count * self.config.tolerance:
+                return SymbolRankUpdate(
+                    SymbolRank._sort_ranks(nodes, rank_vec + delta_vec),
+                    iteration,
+                    self._get_cold_start_iterations(node_count),
+                )
+
+            active = np.flatnonzero(np.abs(delta_vec) > self.config.tolerance)
+            pushed = delta_vec[active]
+            delta_vec[active] = 0.0
+            rank_vec[active] += pushed
+            delta_vec += alpha * (out_transition[active].T @ pushed)
+            danglesum = alpha * pushed[dangling_mask[active]].sum()
+            if danglesum != 0.0:
+                delta_vec += danglesum * dangling_vec
+
+        raise NetworkXError(
+            "SymbolRank: incremental update failed to converge in %d iterations."
+            % self.config.max_iterations
+        )
+
+    def _get_cold_start_iterations(self, node_count: int) -> int:
+        """
+        Gets the number of iterations a power iteration from uniform ranks takes
+
+        This is the count of the last such power iteration when there was one,
+        and otherwise the bound given by the iteration contracting the distance to
+        the fixed point by alpha, starting from a distance of at most 2.
+
+        Args:
+            node_count (int): The number of nodes in the graph
+
+        Returns:
+            (int): The number of iterations
+        """
+        if self._cold_start_iterations is not None:
+            return self._cold_start_iterations
+        threshold = node_count * self.config.tolerance
+        if threshold >= 2.0:
+            return 1
+        return min(
+            math.ceil(math.log(threshold / 2.0) / math.log(self.config.alpha)),
+            self.config.max_iterations,
+        )
+
+    @staticmethod
+    def _is_top_k_stable(rank_vec: np.ndarray, residual_mass: float, top_k: int) -> bool:
+        """
+        Checks whether the order of the top k ranks is final, given that no rank
+        can still grow by more than the residual mass
+
+        Args:
+            rank_vec (np.ndarray): The ranks accumulated so far
+            residual_mass (float): The rank mass which has not been pushed yet
+            top_k (int): The number of highest ranks whose order is checked
+
+        Returns:
+            (bool): True if neither the top k nodes nor their order can change
+        """
+        candidate_count = min(top_k + 1, len(rank_vec))
+        if candidate_count < 2:
+            return True
+        candidates = np.argpartition(-rank_vec, candidate_count - 1)[:candidate_count]
+        sorted_ranks = np.sort(rank_vec[candidates])[::-1]
+        return bool(np.all(sorted_ranks[:-1] - sorted_ranks[1:] > residual_mass))
+
+    def _get_ranks_sparse(
+        self,
+        query_to_symbol_similarity: Optional[Dict[Symbol, float]],
+        initial_weights: Optional[Dict[Symbol, float]],
+        dangling: Optional[Dict[Symbol, float]],
+    ) -> List[Tuple[Symbol, float]]:
+        """
+        Calculate the SymbolRanks with a vectorized power iteration
+
+        The graph is converted into a CSR stochastic transition matrix once per graph
+        version, and the initial ranks, personalization and dangling weights of each query
+        into vectors aligned with its node ordering, so that each iteration
+        is a single sparse matrix-vector product.
+
+        Args:
+            query_to_symbol_similarity (Optional[Dict[Symbol, float]]):
+                query_to_symbol_similarity dictionary
+            initial_weights (Optional[Dict[Symbol, float]]): Initial weights dictionary
+            dangling (Optional[Dict[Symbol, float]]): List of dangling nodes
+
+        Returns:
+            (List[Tuple[Symbol, float]]): Each node and its SymbolRank, in descending rank
+        """
+        nodes, transition, dangling_mask = self._get_graph_structure(
+            "transition_matrix", self._prepare_transition_matrix
+        )
+        node_count = len(nodes)
+
+        prepared_similarity = self._prepare_query_to_symbol_similarity(
+            node_count, self.graph, query_to_symbol_similarity
+        )
+        rank_vec = SymbolRank._to_vector(
+            nodes, self._prepare_initial_ranks(self.graph, initial_weights)
+        )
+        similarity_vec = SymbolRank._to_vector(nodes, prepared_similarity)
+        dangling_vec = (
+            similarity_vec
+            if dangling is None
+            else SymbolRank._to_vector(
+                nodes, self._prepare_dangling_weights(dangling, prepared_similarity)
+            )
+        )
+
+        alpha = self.config.alpha
+        for iteration in range(self.config.max_iterations):
+            last_rank_vec = rank_vec
+            danglesum = alpha * last_rank_vec[dangling_mask].sum()
+            rank_vec = (
+                alpha * (transition @ last_rank_vec)
+                + danglesum * dangling_vec
+                + (1.0 - alpha) * similarity_vec
+            )
+
+            err = np.abs(rank_vec - last_rank_vec).sum()
+            if err < node_count * self.config.tolerance:
+                if initial_weights is None:
+                    self._cold_start_iterations = iteration + 1
+                return SymbolRank._sort_ranks(nodes, rank_vec)
+
+        raise NetworkXError(
+            "SymbolRank: power iteration failed to converge in %d iterations."
+            % self.config.max_iterations
+        )
+
+    def _get_graph_structure(self, name: str, build: Callable[[], Any]) -> Any:
+        """
+        Gets a piece of the query independent structure of the graph, building it
+        if the graph, or its node or edge count, has changed since it was cached
+
+        Args:
+            name (str): The name of the cached structure
+            build (Callable[[], Any]): Builds the structure from the current graph
+
+        Returns:
+            (Any): The cached structure
+        """
+        graph_version = (
+            id(self.graph),
+            self.graph.number_of_nodes(),
+            self.graph.number_of_edges(),
+        )
+        if graph_version != self._graph_structure_version:
+            self.invalidate()
+            self._graph_structure_version = graph_version
+        if name not in self._graph_structure:
+            self._graph_structure[name] = build()
+        return self._graph_structure[name]
+
+    def _get_out_transition_matrix(self, transition: sparse.csr_array) -> sparse.csr_array:
+        """
+        Gets the untransposed transition matrix, whose rows hold the out-edges of each node
+
+        The graph version must have just been checked by fetching the transposed matrix,
+        so the cache is read directly rather than checking it again.
+
+        Args:
+            transition (sparse.csr_array): The cached transposed transition matrix
+
+        Returns:
+            (sparse.csr_array): The untransposed transition matrix
+        """
+        if "out_transition_matrix" not in self._graph_structure:
+            self._graph_structure["out_transition_matrix"] = transition.T.tocsr()
+        return self._graph_structure["out_transition_matrix"]
+
+    def _prepare_transition_matrix(
+        self,
+    ) -> Tuple[List[Hashable], sparse.csr_array, np.ndarray]:
+        """
+        Build the transposed transition matrix of the stochastic graph, without building
+        the stochastic graph itself. Like nx.stochastic_graph, edges without a weight
+        count as 1, and parallel edges are summed.
+
+        Returns:
+            (Tuple[List[Hashable], sparse.csr_array, np.ndarray]): The node ordering,
+                the matrix, whose row i holds the transition probabilities into node i,
+                and the mask of dangling nodes
+        """
+        graph = self.graph if self.graph.is_directed() else self.graph.to_directed()
+        nodes = list(graph)
+        node_count = len(nodes)
+        node_index = {node: i for i, node in enumerate(nodes)}
+        edges = list(graph.edges(data=self.config.weight_key, default=1.0))
+        sources = np.fromiter(
+            (node_index[source] for source, _, __ in edges), dtype=np.int64, count=len(edges)
+        )
+        targets = np.fromiter(
+            (node_index[target] for _, target, __ in edges), dtype=np.int64, count=len(edges)
+        )
+        weights = np.fromiter((weight for _, __, weight in edges), dtype=float, count=len(edges))
+
+        out_weights = np.bincount(sources, weights=weights, minlength=node_count)
+        dangling_mask = out_weights == 0.0
+        source_weights = out_weights[sources]
+        weights = np.divide(
+            weights, source_weights, out=np.zeros_like(weights), where=source_weights != 0.0
+        )
+        transition = sparse.csr_array(
+            (weights, (targets, sources)), shape=(node_count, node_count)
+        )
+        return nodes, transition, dangling_mask
+
+    @staticmethod
+    def _sort_ranks(nodes: List[Hashable], rank_vec: np.ndarray) -> List[Tuple[Symbol, float]]:
+        """
+        Pairs each node with its rank, in descending rank
+
+        Args:
+            nodes (List[Hashable]): The node ordering
+            rank_vec (np.ndarray): The ranks, indexed by node position
+
+        Returns:
+            (List[Tuple[Symbol, float]]): Each node and its rank, ties kept in node order
+        """
+        order = np.argsort(-rank_vec, kind="stable")
+        return list(zip([nodes[i] for i in order.tolist()], rank_vec[order].tolist()))
+
+    @staticmethod
+    def _to_vector(nodes: List[Hashable], values: Dict[Symbol, float]) -> np.ndarray:
+        """
+        Aligns a dictionary of node values with a node ordering
+
+        Args:
+            nodes (List[Hashable]): The node ordering
+            values (Dict[Symbol, float]): The value of each node, missing nodes default to 0
+
+        Returns:
+            (np.ndarray): The values, indexed by node position
+        """
+        return np.fromiter(
+            (values.get(node, 0.0) for node in nodes), dtype=float, count=len(nodes)  # type: ignore
+        )
+
     def _prepare_graph(self) -> nx.DiGraph:
         """
         Prepare the graph for the SymbolRank algorithm. If the graph is not directed,
@@ -0,0 +1,284 @@
+import hashlib
+import json
+import logging
+import os
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+import numpy as np
+from scipy import sparse
+
+from automata.core.symbol.search.rank import SymbolRank
+from automata.core.symbol.symbol_types import Symbol
+
+logger = logging.getLogger(__name__)
+
+"""
+A SymbolRankBasis holds a precomputed personalized SymbolRank vector for every symbol.
+SymbolRank is linear in its personalization vector once normalized, i.e. the ranks of a
+query are proportional to the similarity weighted sum of the ranks obtained by
+personalizing on each symbol alone. Each of those vectors is the restart term
+(1 - alpha) * e_i plus the rank that propagates along the graph, so a query is ranked by
+    - taking the restart term of every symbol exactly, i.e. (1 - alpha) * similarity,
+    - adding the precomputed propagated rank of the symbols the query is most similar to,
+        weighted by similarity,
+    - propagating the similarity of every other symbol for a few steps only,
+        which leaves out at most alpha ** (steps + 1) of their mass,
+    - normalizing the sum,
+instead of running a power iteration to convergence. Each propagated vector is truncated to its largest
+entries (a sparse "sketch"), and the sketches are stored as the rows of a CSR matrix in an
+uncompressed numpy `.npz` archive, keyed on a digest of the graph they were computed from.
+"""
+
+SYMBOL_RANK_BASIS_FORMAT_VERSION = 1
+
+# The number of entries kept in the sketch of each symbol
+DEFAULT_SKETCH_SIZE = 64
+
+# The number of most similar symbols combined at query time
+DEFAULT_SEED_COUNT = 32
+
+# The number of propagation steps applied to the similarity of the remaining symbols
+DEFAULT_PROPAGATION_STEPS = 2
+
+
+class SymbolRankBasis:
+    """
+    A sparse, precomputed personalized SymbolRank basis for the graph of a SymbolRank
+    """
+
+    def __init__(
+        self,
+        graph_digest: str,
+        alpha: float,
+        nodes: List[Hashable],
+        transition: sparse.csr_array,
+        sketches: sparse.csr_array,
+    ) -> None:
+        """
+        Args:
+            graph_digest (str): The digest of the graph the basis was computed from
+            alpha (float): The SymbolRank alpha the basis was computed with
+            nodes (List[Hashable]): The node ordering of the graph
+            transition (sparse.csr_array): The transposed transition matrix of the graph
+            sketches (sparse.csr_array): Row i holds the truncated propagated rank
+                vector obtained by personalizing on node i
+        """
+        self.graph_digest = graph_digest
+        self.alpha = alpha
+        self.nodes = nodes
+        self.transition = transition
+        self.sketches = sketches
+
+    @classmethod
+    def build(
+        cls,
+        symbol_rank: SymbolRank,
+        sketch_size: int = DEFAULT_SKETCH_SIZE,
+        batch_size: int = 256,
+    ) -> "SymbolRankBasis":
+        """
+        Computes the basis with batched power iterations over the SymbolRank's graph
+
+        Args:
+            symbol_rank (SymbolRank): The SymbolRank whose graph and config to use
+            sketch_size (int): The number of entries kept in the sketch of each symbol
+            batch_size (int): The number of basis vectors computed together
+
+        Returns:
+            SymbolRankBasis: The computed basis
+
+        Raises:
+            ValueError: If the power iteration does not converge
+        """
+        nodes, transition, _ = symbol_rank._get_graph_structure(
+            "transition_matrix", symbol_rank._prepare_transition_matrix
+        )
+        node_count = len(nodes)
+        alpha = symbol_rank.config.alpha
+
+        rows: List[np.ndarray] = []
+        columns: List[np.ndarray] = []
+        values: List[np.ndarray] = []
+        for start in range(0, node_count, batch_size):
+            stop = min(start + batch_size, node_count)
+            # The basis vectors solve x = alpha * T x + (1 - alpha) e_i, up to normalization,
+            # as the rank mass leaving dangling nodes is returned to the personalized node
+            restart = np.zeros((node_count, stop - start))
+            restart[np.arange(start, stop), np.arange(stop - start)] = 1.0 - alpha
+            basis = restart
+            for _ in range(symbol_rank.config.max_iterations):
+                last_basis = basis
+                basis = alpha * (transition @ last_basis) + restart
+                if np.abs(basis - last_basis).sum(axis=0).max() < symbol_rank.config.tolerance:
+                    break
+            else:
+                raise ValueError(
+                    "SymbolRankBasis: power iteration failed to converge in "
+                    f"{symbol_rank.config.max_iterations} iterations."
+                )
+
+            # Only the propagated rank is sketched, the restart term is added back exactly
+            basis -= restart
+            for column in range(stop - start):
+                basis_vec = basis[:, column]
+                top = np.flatnonzero(basis_vec)
+                if len(top) > sketch_size:
+                    top = top[np.argpartition(-basis_vec[top], sketch_size - 1)[:sketch_size]]
+                rows.append(np.full(len(top), start + column, dtype=np.int64))
+                columns.append(top)
+                values.append(basis_vec[top])
+
+        sketches = sparse.csr_array(
+            (
+                np.concatenate(values) if values else np.zeros(0),
+                (
+                    np.concatenate(rows) if rows else np.zeros(0, dtype=np.int64),
+                    np.concatenate(columns) if columns else np.zeros(0, dtype=np.int64),
+                ),
+            ),
+            shape=(node_count, node_count),
+        )
+        return cls(
+            SymbolRankBasis.compute_graph_digest(symbol_rank), alpha, nodes, transition, sketches
+        )
+
+    def get_ranks(
+        self,
+        query_to_symbol_similarity: Dict[Symbol, float],
+        seed_count: int = DEFAULT_SEED_COUNT,
+        propagation_steps: int = DEFAULT_PROPAGATION_STEPS,
+    ) -> List[Tuple[Symbol, float]]:
+        """
+        Approximates the SymbolRanks of a query by adding the combined sketches
+        of the symbols it is most similar to onto its restart term
+
+        Args:
+            query_to_symbol_similarity (Dict[Symbol, float]): Similarity between the query
+                and each node
+            seed_count (int): The number of most similar symbols to combine
+            propagation_steps (int): The number of propagation steps applied to the
+                similarity of the symbols outside of the seeds
+
+        Returns:
+            (List[Tuple[Symbol, float]]): The nodes with a non-zero approximate SymbolRank,
+                in descending rank
+        """
+        similarity_vec = SymbolRank._to_vector(self.nodes, query_to_symbol_similarity)
+        seeds = np.flatnonzero(similarity_vec)
+        if len(seeds) > seed_count:
+            seeds = seeds[np.argpartition(-similarity_vec[seeds], seed_count - 1)[:seed_count]]
+
+        rank_vec = (1.0 - self.alpha) * similarity_vec
+        if len(seeds) > 0:
+            rank_vec += self.sketches[seeds].T @ similarity_vec[seeds]
+        propagated_vec = (1.0 - self.alpha) * similarity_vec
+        propagated_vec[seeds] = 0.0
+        for _ in range(propagation_steps):
+            propagated_vec = self.alpha * (self.transition @ propagated_vec)
+            rank_vec += propagated_vec
+        total = rank_vec.sum()
+        if total <= 0.0:
+            return []
+        rank_vec = rank_vec / total
+        covered = np.flatnonzero(rank_vec)
+        order = covered[np.argsort(-rank_vec[covered], kind="stable")]
+        return list(zip([self.nodes[i] for i in order.tolist()], rank_vec[order].tolist()))
+
+    def save(self, path: str) -> None:
+        """
+        Saves the basis to disk
+
+        Args:
+            path (str): The path to save the basis to
+        """
+        header = {
+            "format_version": SYMBOL_RANK_BASIS_FORMAT_VERSION,
+            "graph_digest": self.graph_digest,
+            "alpha": self.alpha,
+            "node_count": len(self.nodes),
+        }
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, "wb") as f:
+            np.savez(
+                f,
+                header=np.frombuffer(json.dumps(header).encode("utf-8"), dtype=np.uint8),
+                indptr=self.sketches.indptr,
+                indices=self.sketches.indices,
+                data=self.sketches.data,
+            )
+        os.replace(temp_path, path)
+
+    @classmethod
+    def load_if_fresh(cls, path: str, symbol_rank: SymbolRank) -> Optional["SymbolRankBasis"]:
+        """
+        Loads a basis from disk if it exists and was computed from the SymbolRank's graph
+
+        Args:
+            path (str): The path to load the basis from
+            symbol_rank (SymbolRank): The SymbolRank the basis is used with
+
+        Returns:
+            Optional[SymbolRankBasis]: The basis, or None if it is missing or stale
+        """
+        if not os.path.exists(path):
+            return None
+        try:
+            with np.load(path, allow_pickle=False) as archive:
+                header = cls._decode_header(archive)
+                if header["graph_digest"] != SymbolRankBasis.compute_graph_digest(symbol_rank):
+                    logger.info(f"SymbolRank basis at {path} is stale")
+                    return None
+                node_count = header["node_count"]
+                sketches = sparse.csr_array(
+                    (archive["data"], archive["indices"], archive["indptr"]),
+                    shape=(node_count, node_count),
+                )
+            nodes, transition, _ = symbol_rank._get_graph_structure(
+                "transition_matrix", symbol_rank._prepare_transition_matrix
+            )
+            return cls(header["graph_digest"], header["alpha"], nodes, transition, sketches)
+        except Exception as e:
+            logger.warning(f"Failed to load SymbolRank basis at {path} with error {e}")
+            return None
+
+    @staticmethod
+    def compute_graph_digest(symbol_rank: SymbolRank) -> str:
+        """
+        Computes the digest of the node ordering, transition matrix and
+        restart probability which a basis depends on
+
+        Args:
+            symbol_rank (SymbolRank): The SymbolRank whose graph and config to digest
+
+        Returns:
+            str: The hex digest
+        """
+        nodes, transition, _ = symbol_rank._get_graph_structure(
+            "transition_matrix", symbol_rank._prepare_transition_matrix
+        )
+        digest = hashlib.sha256(repr(symbol_rank.config.alpha).encode("utf-8"))
+        for node in nodes:
+            digest.update(str(getattr(node, "uri", node)).encode("utf-8"))
+            digest.update(b"\0")
+        for array in (transition.indptr, transition.indices, transition.data):
+            digest.update(np.ascontiguousarray(array).tobytes())
+        return digest.hexdigest()
+
+    @staticmethod
+    def _decode_header(archive: Any) -> Dict[str, Any]:
+        """
+        Decodes and validates the header of an opened basis archive
+
+        Args:
+            archive (Any): The opened numpy archive
+
+        Returns:
+            Dict[str, Any]: The decoded header
+        """
+        header = json.loads(archive["header"].tobytes().decode("utf-8"))
+        if header.get("format_version") != SYMBOL_RANK_BASIS_FORMAT_VERSION:
+            raise ValueError(
+                f"Unsupported SymbolRank basis format version {header.get('format_version')}, "
+                f"expected {SYMBOL_RANK_BASIS_FORMAT_VERSION}"
+            )
+        return header
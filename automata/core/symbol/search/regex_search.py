@@ -0,0 +1,201 @@
+import logging
+import mmap
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from automata.config import MAX_WORKERS
+from automata.core.coding.py_coding.module_tree import LazyModuleTreeMap
+
+logger = logging.getLogger(__name__)
+
+"""
+A regex search scans the raw module files rather than their parsed trees. Each file
+is memory mapped and the compiled pattern runs over the mapped bytes, so a file is
+never copied into a Python string, and each match is reported once per line:
+    - the files are split into shards, which a pool of worker processes scans in parallel,
+    - each shard's matches are yielded as soon as the shard completes,
+    - the search stops, and the remaining shards are cancelled, once the result cap is hit.
+Patterns are compiled with re.MULTILINE, so ^ and $ match at line boundaries, and
+a match which spans several lines is reported at the line where it starts.
+"""
+
+DEFAULT_MAX_REGEX_RESULTS = 500
+
+# Trees smaller than this are scanned in the calling process,
+# as starting the worker pool would take longer than the scan itself
+MIN_PARALLEL_SCAN_BYTES = 1 << 24
+
+# The number of shards scanned by each worker, so that the matches of early shards
+# are streamed back while later ones are still being scanned
+SHARDS_PER_WORKER = 4
+
+
+def _find_regex_in_file(fpath: str, pattern: re.Pattern, max_results: int) -> List[int]:
+    """
+    Finds the lines of a file which match a compiled bytes pattern
+
+    Args:
+        fpath (str): The path of the file to scan
+        pattern (re.Pattern): The compiled bytes pattern
+        max_results (int): The maximum number of lines to return
+
+    Returns:
+        List[int]: The line numbers where a match starts, in ascending order
+    """
+    if os.path.getsize(fpath) == 0:
+        return []
+    line_numbers: List[int] = []
+    with open(fpath, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+        position, line_number = 0, 1
+        while len(line_numbers) < max_results:
+            match = pattern.search(buffer, position)
+            if match is None:
+                break
+            start = match.start()
+            line_number += buffer[position:start].count(b"\n")
+            line_numbers.append(line_number)
+            # Resume at the next line, so a line is only reported once
+            line_end = buffer.find(b"\n", start)
+            if line_end == -1:
+                break
+            position = line_end + 1
+            line_number += 1
+    return line_numbers
+
+
+def _find_regex_in_shard(
+    shard: List[Tuple[str, str]], pattern: str, max_results: int
+) -> List[Tuple[str, List[int]]]:
+    """
+    Finds the lines of a shard of module files which match a pattern
+
+    Args:
+        shard (List[Tuple[str, str]]): The dotpath and path of each module in the shard
+        pattern (str): The regular expression to search for
+        max_results (int): The maximum number of lines to return
+
+    Returns:
+        List[Tuple[str, List[int]]]: The dotpath and matching line numbers
+            of each module with a match
+    """
+    compiled_pattern = re.compile(pattern.encode("utf-8"), re.MULTILINE)
+    matches = []
+    for module_dotpath, fpath in shard:
+        try:
+            line_numbers = _find_regex_in_file(fpath, compiled_pattern, max_results)
+        except OSError as e:
+            logger.error(f"Failed to search module '{fpath}' due to: {e}")
+            continue
+        if line_numbers:
+            matches.append((module_dotpath, line_numbers))
+            max_results -= len(line_numbers)
+            if max_results <= 0:
+                break
+    return matches
+
+
+def iter_regex_matches(
+    pattern: str,
+    module_map: Optional[LazyModuleTreeMap] = None,
+    max_results: int = DEFAULT_MAX_REGEX_RESULTS,
+    max_workers: int = MAX_WORKERS,
+) -> Iterator[Tuple[str, int]]:
+    """
+    Streams the lines of the module files which match a regular expression
+
+    Args:
+        pattern (str): The regular expression to search for
+        module_map (Optional[LazyModuleTreeMap]): The module tree mapping whose files
+            are searched. Defaults to LazyModuleTreeMap.cached_default().
+        max_results (int): The maximum number of matching lines to yield
+        max_workers (int): The number of worker processes. The files are searched
+            in the calling process when it is 1, or when they total less than
+            MIN_PARALLEL_SCAN_BYTES
+
+    Returns:
+        Iterator[Tuple[str, int]]: The module dotpath and line number of each match,
+            grouped by shard in the order the shards complete
+
+    Raises:
+        ValueError: If the pattern is not a valid regular expression
+    """
+    try:
+        re.compile(pattern.encode("utf-8"), re.MULTILINE)
+    except re.error as e:
+        raise ValueError(f"Invalid regex pattern {pattern}: {e}") from e
+    if max_results <= 0:
+        return
+
+    if module_map is None:
+        module_map = LazyModuleTreeMap.cached_default()
+    modules = sorted(module_map.module_fpaths())
+    shard_count = min(len(modules), max(max_workers, 1) * SHARDS_PER_WORKER) or 1
+    shard_size = -(-len(modules) // shard_count)
+    shards = [modules[i : i + shard_size] for i in range(0, len(modules), shard_size)]
+
+    result_count = 0
+    if (
+        max_workers <= 1
+        or len(shards) <= 1
+        or sum(os.path.getsize(fpath) for _, fpath in modules if os.path.exists(fpath))
+        < MIN_PARALLEL_SCAN_BYTES
+    ):
+        for shard in shards:
+            for module_dotpath, line_numbers in _find_regex_in_shard(
+                shard, pattern, max_results - result_count
+            ):
+                for line_number in line_numbers:
+                    yield module_dotpath, line_number
+                    result_count += 1
+            if result_count >= max_results:
+                return
+        return
+
+    executor = ProcessPoolExecutor(max_workers=max_workers)
+    try:
+        futures = [
+            executor.submit(_find_regex_in_shard, shard, pattern, max_results) for shard in shards
+        ]
+        for future in as_completed(futures):
+            for module_dotpath, line_numbers in future.result():
+                for line_number in line_numbers:
+                    yield module_dotpath, line_number
+                    result_count += 1
+                    if result_count >= max_results:
+                        return
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def find_regex_in_modules(
+    pattern: str,
+    module_map: Optional[LazyModuleTreeMap] = None,
+    max_results: int = DEFAULT_MAX_REGEX_RESULTS,
+    max_workers: int = MAX_WORKERS,
+) -> Dict[str, List[int]]:
+    """
+    Finds the lines of the module files which match a regular expression
+
+    Args:
+        pattern (str): The regular expression to search for
+        module_map (Optional[LazyModuleTreeMap]): The module tree mapping whose files
+            are searched. Defaults to LazyModuleTreeMap.cached_default().
+        max_results (int): The maximum number of matching lines to return. When the cap
+            is hit, which of the matches are returned depends on the order
+            in which the workers complete
+        max_workers (int): The number of worker processes
+
+    Returns:
+        Dict[str, List[int]]: A dictionary with module paths as keys
+            and a list of line numbers as values
+    """
+    matches: Dict[str, List[int]] = {}
+    for module_dotpath, line_number in iter_regex_matches(
+        pattern, module_map, max_results, max_workers
+    ):
+        matches.setdefault(module_dotpath, []).append(line_number)
+    return {
+        module_dotpath: sorted(line_numbers) for module_dotpath, line_numbers in matches.items()
+    }
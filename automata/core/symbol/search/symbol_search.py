@@ -4,11 +4,17 @@ from typing import Any, Callable, Dict, List, Optional, Set, Tuple, Union
 import networkx as nx
 import numpy as np
 
-from automata.core.coding.py_coding.module_tree import LazyModuleTreeMap
 from automata.core.embedding.symbol_similarity import SymbolSimilarity
 from automata.core.symbol.graph import SymbolGraph
 from automata.core.symbol.parser import parse_symbol
+from automata.core.symbol.search.query_cache import QueryResultCache
 from automata.core.symbol.search.rank import SymbolRank, SymbolRankConfig
+from automata.core.symbol.search.rank_basis import SymbolRankBasis
+from automata.core.symbol.search.regex_search import (
+    DEFAULT_MAX_REGEX_RESULTS,
+    find_regex_in_modules,
+)
+from automata.core.symbol.search.trigram_index import TrigramIndex
 from automata.core.symbol.symbol_types import Symbol, SymbolReference
 from automata.core.symbol.symbol_utils import convert_to_fst_object
 
@@ -27,6 +33,8 @@ class SymbolSearch:
         symbol_code_similarity: SymbolSimilarity,
         symbol_rank_config: SymbolRankConfig,
         code_subgraph: SymbolGraph.SubGraph,
+        symbol_rank_basis_path: Optional[str] = None,
+        query_cache: Optional[QueryResultCache] = None,
     ) -> None:
         """
         Args:
@@ -34,6 +42,11 @@ class SymbolSearch:
             symbol_code_similarity (SymbolSimilarity): A SymbolSimilarity object with a code embedding handler
             symbol_rank_config (Optional[SymbolRankConfig]): A SymbolRankConfig object
             code_subgraph: A subgraph of the SymbolGraph
+            symbol_rank_basis_path (Optional[str]): Path to a precomputed SymbolRankBasis.
+                If it is fresh for the filtered subgraph, SymbolRank searches combine its
+                sketches instead of running a power iteration. Defaults to None.
+            query_cache (Optional[QueryResultCache]): The cache of SymbolRank, reference and
+                exact search results. Defaults to an in-memory QueryResultCache.
 
             TODO - We should modify SymbolSearch to receive a completed instance of SymbolRank.
         """
@@ -50,23 +63,81 @@ class SymbolSearch:
         self.symbol_graph = symbol_graph
         self.symbol_code_similarity = symbol_code_similarity
         symbol_code_similarity.set_available_symbols(available_symbols)
+        self.code_subgraph = code_subgraph
         self.symbol_rank = SymbolRank(code_subgraph.graph, config=symbol_rank_config)
+        self.symbol_rank_basis = (
+            SymbolRankBasis.load_if_fresh(symbol_rank_basis_path, self.symbol_rank)
+            if symbol_rank_basis_path is not None
+            else None
+        )
+        self.query_cache = query_cache or QueryResultCache()
 
-    def symbol_rank_search(self, query: str) -> SymbolRankResult:
+    def symbol_rank_search(self, query: str, top_k: Optional[int] = None) -> SymbolRankResult:
         """
         Fetches the list of the SymbolRank similar symbols ordered by rank
 
+        When a SymbolRankBasis is loaded, the ranks are approximated from the
+        precomputed sketches of the most similar symbols. Otherwise, when top_k is given,
+        only the top ranks are approximated with SymbolRank.get_top_ranks.
+
         Args:
             query (str): The query to search for
+            top_k (Optional[int]): The number of top ranked symbols to return.
+                Defaults to None, which ranks every symbol.
 
         Returns:
             A list of tuples of the form (symbol_uri, rank)
         """
-        query_vec = self.symbol_code_similarity.get_query_similarity_dict(query)
-        transformed_query_vec = SymbolSearch.transform_dict_values(
-            query_vec, SymbolSearch.shifted_z_score_powered
+
+        def search() -> SymbolRankResult:
+            query_vec = self.symbol_code_similarity.get_query_similarity_dict(query)
+            transformed_query_vec = SymbolSearch.transform_dict_values(
+                query_vec, SymbolSearch.shifted_z_score_powered
+            )
+            if self.symbol_rank_basis is not None:
+                return self.symbol_rank_basis.get_ranks(transformed_query_vec)[:top_k]
+            if top_k is not None:
+                return self.symbol_rank.get_top_ranks(transformed_query_vec, top_k)
+            return self.symbol_rank.get_ranks(query_to_symbol_similarity=transformed_query_vec)
+
+        return self.query_cache.get_or_compute(
+            "symbol_rank", f"{top_k}:{' '.join(query.split())}", self._get_data_version(), search
+        )
+
+    def symbol_rank_search_batch(self, queries: List[str]) -> List[SymbolRankResult]:
+        """
+        Fetches the SymbolRank similar symbols of several queries at once. The queries
+        share the cache of symbol_rank_search, and the power iterations of the queries
+        which miss it run together
+
+        Args:
+            queries (List[str]): The queries to search for
+
+        Returns:
+            A list of tuples of the form (symbol_uri, rank) for each query, in query order
+        """
+
+        def search(positions: List[int]) -> List[SymbolRankResult]:
+            transformed_query_vecs: List[Optional[Dict[Symbol, float]]] = [
+                SymbolSearch.transform_dict_values(
+                    self.symbol_code_similarity.get_query_similarity_dict(queries[position]),
+                    SymbolSearch.shifted_z_score_powered,
+                )
+                for position in positions
+            ]
+            if self.symbol_rank_basis is not None:
+                return [
+                    self.symbol_rank_basis.get_ranks(transformed_query_vec)  # type: ignore
+                    for transformed_query_vec in transformed_query_vecs
+                ]
+            return self.symbol_rank.get_ranks_batch(transformed_query_vecs)
+
+        return self.query_cache.get_or_compute_batch(
+            "symbol_rank",
+            [f"{None}:{' '.join(query.split())}" for query in queries],
+            self._get_data_version(),
+            search,
         )
-        return self.symbol_rank.get_ranks(query_to_symbol_similarity=transformed_query_vec)
 
     def symbol_references(self, symbol_uri: str) -> SymbolReferencesResult:
         """
@@ -80,7 +151,12 @@ class SymbolSearch:
                 symbol and corresponding line numbers
         """
         # TODO - Add parsing upstream or here to parse references
-        return self.symbol_graph.get_references_to_symbol(parse_symbol(symbol_uri))
+        return self.query_cache.get_or_compute(
+            "symbol_references",
+            symbol_uri.strip(),
+            self._get_data_version(),
+            lambda: self.symbol_graph.get_references_to_symbol(parse_symbol(symbol_uri)),
+        )
 
     def retrieve_source_code_by_symbol(self, symbol_uri: str) -> SourceCodeResult:
         """
@@ -105,7 +181,34 @@ class SymbolSearch:
         Returns:
             A dict of paths to files that contain the pattern and corresponding line numbers
         """
-        return SymbolSearch.find_pattern_in_modules(pattern)
+        # Exact matches depend on the source files rather than on the graph,
+        # so their key also holds the fingerprint of the indexed files
+        trigram_index = TrigramIndex.cached_default()
+        trigram_index.refresh()
+        return self.query_cache.get_or_compute(
+            "exact",
+            f"{trigram_index.fingerprint}:{pattern}",
+            self._get_data_version(),
+            lambda: trigram_index.search(pattern),
+        )
+
+    def regex_search(
+        self, pattern: str, max_results: int = DEFAULT_MAX_REGEX_RESULTS
+    ) -> ExactSearchResult:
+        """
+        Performs a regular expression search across the raw files of the indexed codebase
+
+        Args:
+            pattern (str): The regular expression to search for
+            max_results (int): The maximum number of matching lines to return
+
+        Returns:
+            A dict of paths to files that contain a match and corresponding line numbers
+
+        Raises:
+            ValueError: If the pattern is not a valid regular expression
+        """
+        return find_regex_in_modules(pattern, max_results=max_results)
 
     def process_query(
         self, query: str
@@ -134,11 +237,33 @@ class SymbolSearch:
             return self.symbol_rank_search(query_remainder)
         elif search_type == "exact":
             return self.exact_search(query_remainder)
+        elif search_type == "regex":
+            return self.regex_search(query_remainder)
         elif search_type == "source":
             return self.retrieve_source_code_by_symbol(query_remainder)
         else:
             raise ValueError(f"Unknown search type: {search_type}")
 
+    def _get_data_version(self) -> Tuple[Any, Any, str, Tuple[str, Optional[str]], Optional[str]]:
+        """
+        Gets the version of the data which search results are computed from, so that
+        cached results are invalidated once the graph, the embeddings, the ranked
+        subgraph or the SymbolRank basis change
+
+        Returns:
+            Tuple[Any, Any, str, Tuple[str, Optional[str]], Optional[str]]: The content hash
+                of the index, the version of the code embedding database, the SymbolRank
+                configuration, the flow_rank and path_filter the ranked subgraph was built
+                with, and the graph digest of the loaded SymbolRank basis, if any
+        """
+        return (
+            self.symbol_graph.index_digest,
+            self.symbol_code_similarity.embedding_handler.embedding_db.version,
+            repr(self.symbol_rank.config),
+            (self.code_subgraph.flow_rank, self.code_subgraph.path_filter),
+            self.symbol_rank_basis.graph_digest if self.symbol_rank_basis is not None else None,
+        )
+
     @staticmethod
     def filter_graph(graph: nx.DiGraph, available_symbols: Set[Symbol]) -> None:
         """
@@ -198,18 +323,15 @@ class SymbolSearch:
         """
         Finds exact line matches for a given pattern string in all modules
 
+        The modules are looked up in a trigram index of their sources, which is
+        built on the first search and updated with the modules which changed since.
+
         Args:
             pattern (str): The pattern string to search for
 
         Returns:
             Dict[str, List[int]]: A dictionary with module paths as keys and a list of line numbers as values
         """
-        matches = {}
-        module_map = LazyModuleTreeMap.cached_default()
-        for module_path, module in module_map.items():
-            if module:
-                lines = module.dumps().splitlines()
-                line_numbers = [i + 1 for i, line in enumerate(lines) if pattern in line.strip()]
-                if line_numbers:
-                    matches[module_path] = line_numbers
-        return matches
+        trigram_index = TrigramIndex.cached_default()
+        trigram_index.refresh()
+        return trigram_index.search(pattern)
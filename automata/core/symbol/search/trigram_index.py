@@ -0,0 +1,198 @@
+import hashlib
+import logging
+import os
+from functools import lru_cache
+from typing import Dict, List, Optional, Set, Tuple
+
+from automata.core.coding.py_coding.module_tree import LazyModuleTreeMap
+
+logger = logging.getLogger(__name__)
+
+"""
+A TrigramIndex maps every three character substring of the module sources to the lines
+which contain it, so that an exact search only has to look at the lines containing all
+the trigrams of the pattern
+    - the posting lists of the pattern's trigrams are intersected, smallest first,
+    - each candidate line is then checked against the pattern itself,
+which returns the same matches as checking every line. The index is built from the raw
+files rather than from parsed modules, and each file's modification time and size are
+compared on every search, so only the modules which changed on disk are re-indexed.
+"""
+
+TRIGRAM_SIZE = 3
+
+
+class TrigramIndex:
+    """
+    A line level trigram inverted index over the sources of a module tree
+    """
+
+    def __init__(self, module_map: Optional[LazyModuleTreeMap] = None) -> None:
+        """
+        Args:
+            module_map (Optional[LazyModuleTreeMap]): The module tree mapping whose modules
+                are indexed. Defaults to LazyModuleTreeMap.cached_default().
+        """
+        self._module_map = module_map
+        # Each indexed line has an id, which is its position in these lists
+        self._lines: List[Optional[str]] = []
+        self._line_modules: List[Optional[str]] = []
+        self._line_numbers: List[int] = []
+        self._postings: Dict[str, Set[int]] = {}
+        # The (modification time, size) of each indexed module file and its line ids
+        self._module_stats: Dict[str, Tuple[int, int]] = {}
+        self._module_line_ids: Dict[str, range] = {}
+        self._removed_line_count = 0
+        # Identifies the indexed version of every module file, it changes whenever one does
+        self.fingerprint = hashlib.sha256().hexdigest()
+
+    @property
+    def module_map(self) -> LazyModuleTreeMap:
+        if self._module_map is None:
+            self._module_map = LazyModuleTreeMap.cached_default()
+        return self._module_map
+
+    def refresh(self) -> List[str]:
+        """
+        Re-indexes the modules whose file was added, changed or removed since the last refresh
+
+        Returns:
+            List[str]: The dotpaths of the re-indexed modules
+        """
+        updated_modules = []
+        seen_modules = set()
+        for module_dotpath, module_fpath in self.module_map.module_fpaths():
+            try:
+                stat = os.stat(module_fpath)
+            except OSError:
+                # Modules which were only put in memory are not indexed until they are written
+                continue
+            seen_modules.add(module_dotpath)
+            module_stat = (stat.st_mtime_ns, stat.st_size)
+            if self._module_stats.get(module_dotpath) == module_stat:
+                continue
+            self._remove_module(module_dotpath)
+            try:
+                with open(module_fpath) as f:
+                    source = f.read()
+            except (OSError, UnicodeDecodeError) as e:
+                logger.error(f"Failed to index module '{module_fpath}' due to: {e}")
+                continue
+            self._add_module(module_dotpath, source.splitlines())
+            self._module_stats[module_dotpath] = module_stat
+            updated_modules.append(module_dotpath)
+
+        for module_dotpath in set(self._module_line_ids) - seen_modules:
+            self._remove_module(module_dotpath)
+            updated_modules.append(module_dotpath)
+
+        if self._removed_line_count > len(self._lines) // 2:
+            self._rebuild()
+        if updated_modules:
+            self.fingerprint = hashlib.sha256(
+                repr(sorted(self._module_stats.items())).encode("utf-8")
+            ).hexdigest()
+        return updated_modules
+
+    def search(self, pattern: str) -> Dict[str, List[int]]:
+        """
+        Finds the lines which contain the pattern once stripped of surrounding whitespace
+
+        Args:
+            pattern (str): The pattern string to search for
+
+        Returns:
+            Dict[str, List[int]]: A dictionary with module paths as keys
+                and a list of line numbers as values
+        """
+        trigrams = TrigramIndex._get_trigrams(pattern)
+        candidates: Optional[Set[int]] = None
+        for trigram in sorted(trigrams, key=lambda t: len(self._postings.get(t, ()))):
+            posting = self._postings.get(trigram)
+            if not posting:
+                return {}
+            candidates = posting.copy() if candidates is None else candidates & posting
+            if not candidates:
+                return {}
+
+        matches: Dict[str, List[int]] = {}
+        line_ids = range(len(self._lines)) if candidates is None else sorted(candidates)
+        for line_id in line_ids:
+            line = self._lines[line_id]
+            if line is not None and pattern in line.strip():
+                matches.setdefault(self._line_modules[line_id], []).append(  # type: ignore
+                    self._line_numbers[line_id]
+                )
+        return matches
+
+    @classmethod
+    @lru_cache(maxsize=1)
+    def cached_default(cls) -> "TrigramIndex":
+        """Creates a new TrigramIndex instance over the default module tree map"""
+        return cls()
+
+    def _add_module(self, module_dotpath: str, lines: List[str]) -> None:
+        """
+        Indexes the lines of a module
+
+        Args:
+            module_dotpath (str): The dotpath of the module
+            lines (List[str]): The lines of the module source code
+        """
+        first_line_id = len(self._lines)
+        for line_number, line in enumerate(lines, start=1):
+            line_id = len(self._lines)
+            self._lines.append(line)
+            self._line_modules.append(module_dotpath)
+            self._line_numbers.append(line_number)
+            for trigram in TrigramIndex._get_trigrams(line):
+                self._postings.setdefault(trigram, set()).add(line_id)
+        self._module_line_ids[module_dotpath] = range(first_line_id, len(self._lines))
+
+    def _remove_module(self, module_dotpath: str) -> None:
+        """
+        Removes the lines of a module from the index
+
+        Args:
+            module_dotpath (str): The dotpath of the module
+        """
+        self._module_stats.pop(module_dotpath, None)
+        line_ids = self._module_line_ids.pop(module_dotpath, None)
+        if line_ids is None:
+            return
+        for line_id in line_ids:
+            for trigram in TrigramIndex._get_trigrams(self._lines[line_id]):  # type: ignore
+                posting = self._postings[trigram]
+                posting.discard(line_id)
+                if not posting:
+                    del self._postings[trigram]
+            self._lines[line_id] = None
+            self._line_modules[line_id] = None
+        self._removed_line_count += len(line_ids)
+
+    @staticmethod
+    def _get_trigrams(text: str) -> Set[str]:
+        """
+        Gets the distinct trigrams of a string
+
+        Args:
+            text (str): The string to split into trigrams
+
+        Returns:
+            Set[str]: The trigrams, which are empty for strings shorter than a trigram
+        """
+        return {text[i : i + TRIGRAM_SIZE] for i in range(len(text) - TRIGRAM_SIZE + 1)}
+
+    def _rebuild(self) -> None:
+        """Re-indexes the remaining modules, so that removed lines no longer take up space"""
+        modules = [
+            (module_dotpath, [self._lines[line_id] for line_id in line_ids])
+            for module_dotpath, line_ids in self._module_line_ids.items()
+        ]
+        module_stats = self._module_stats
+        self._lines, self._line_modules, self._line_numbers = [], [], []
+        self._postings, self._module_line_ids = {}, {}
+        self._removed_line_count = 0
+        for module_dotpath, lines in modules:
+            self._add_module(module_dotpath, lines)  # type: ignore
+        self._module_stats = module_stats
@@ -0,0 +1,515 @@
+import json
+import logging
+import os
+from collections import deque
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+import networkx as nx
+import numpy as np
+
+from automata.core.symbol.parser import parse_symbols
+from automata.core.symbol.scip_pb2 import SymbolRole  # type: ignore
+from automata.core.symbol.symbol_types import Symbol, SymbolFile, SymbolReference
+
+logger = logging.getLogger(__name__)
+
+"""
+A SymbolGraph snapshot is a flat, binary encoding of a built symbol graph.
+It is stored as an uncompressed numpy `.npz` archive which holds
+    - a small json header with the format version, the freshness keys
+        and the per-document digests used for incremental updates,
+    - an interned string table (one utf-8 blob plus an offsets array)
+        which holds every node of the graph exactly once,
+    - one pair of (source, target) integer arrays per edge label,
+        along with the columns needed to rebuild each label's edge data
+        and the position of each edge among the out-edges and the in-edges of the graph.
+Loading a snapshot lets a SymbolGraph skip protobuf parsing and the GraphBuilder entirely,
+and the positions let it re-add the edges so that both the out-edges and the in-edges of
+every node are iterated in the same order as in the graph the snapshot was built from.
+"""
+
+SNAPSHOT_FORMAT_VERSION = 3
+
+EDGE_LABELS = ("contains", "reference", "relationship", "caller", "callee")
+
+# Edge labels whose data carries a (line_number, column_number, roles) triple
+_POSITIONAL_EDGE_LABELS = ("reference", "caller", "callee")
+
+# The keys produced by MessageToDict for a Relationship, in bit order
+_RELATIONSHIP_FLAGS = ("isReference", "isImplementation", "isTypeDefinition", "isDefinition")
+
+_NODE_LABELS = (None, "file", "symbol")
+
+# The type of the edge columns which are not node ids or int32 edge data
+_EDGE_COLUMN_TYPES: Dict[str, Any] = {
+    "flags": np.uint8,
+    "position": np.int64,
+    "in_position": np.int64,
+}
+
+
+def encode_symbol_roles(roles: Dict[str, bool]) -> int:
+    """
+    Encodes a dictionary of role names to booleans into a SymbolRole bitmask
+
+    Args:
+        roles (Dict[str, bool]): The role dictionary, as stored on a SymbolReference
+
+    Returns:
+        int: The SymbolRole bitmask
+    """
+    mask = 0
+    for role_name, is_set in roles.items():
+        if is_set:
+            mask |= SymbolRole.Value(role_name)
+    return mask
+
+
+def decode_symbol_roles(mask: int) -> Dict[str, bool]:
+    """
+    Decodes a SymbolRole bitmask into a dictionary of role names to booleans
+
+    Args:
+        mask (int): The SymbolRole bitmask
+
+    Returns:
+        Dict[str, bool]: The role dictionary, as stored on a SymbolReference
+    """
+    return {
+        role_name: True for role_name, role_value in SymbolRole.items() if (mask & role_value) > 0
+    }
+
+
+class SymbolGraphSnapshot:
+    """
+    A label-partitioned, array-backed encoding of a symbol graph which can be saved and loaded
+    """
+
+    def __init__(
+        self,
+        index_digest: str,
+        build_caller_relationships: bool,
+        document_digests: Dict[str, str],
+        strings: List[str],
+        node_is_symbol: np.ndarray,
+        node_label: np.ndarray,
+        edges: Dict[str, Dict[str, np.ndarray]],
+    ) -> None:
+        """
+        Args:
+            index_digest (str): The content hash of the index the graph was built from
+            build_caller_relationships (bool): Whether the graph holds caller-callee edges
+            document_digests (Dict[str, str]): The content hash of each indexed document
+            strings (List[str]): The interned node table, one entry per node
+            node_is_symbol (np.ndarray): Whether each node is a Symbol (or a raw string)
+            node_label (np.ndarray): The label code of each node, see _NODE_LABELS
+            edges (Dict[str, Dict[str, np.ndarray]]): The columns of each edge label
+        """
+        self.index_digest = index_digest
+        self.build_caller_relationships = build_caller_relationships
+        self.document_digests = document_digests
+        self.strings = strings
+        self.node_is_symbol = node_is_symbol
+        self.node_label = node_label
+        self.edges = edges
+
+    @classmethod
+    def from_graph(
+        cls,
+        graph: nx.MultiDiGraph,
+        index_digest: str,
+        build_caller_relationships: bool,
+        document_digests: Dict[str, str],
+    ) -> "SymbolGraphSnapshot":
+        """
+        Encodes a built symbol graph into a snapshot
+
+        Args:
+            graph (nx.MultiDiGraph): The graph produced by the GraphBuilder
+            index_digest (str): The content hash of the index the graph was built from
+            build_caller_relationships (bool): Whether the graph holds caller-callee edges
+            document_digests (Dict[str, str]): The content hash of each indexed document
+
+        Returns:
+            SymbolGraphSnapshot: The encoded snapshot
+        """
+        node_ids: Dict[Any, int] = {}
+        strings: List[str] = []
+        is_symbol: List[bool] = []
+        labels: List[int] = []
+        for node, data in graph.nodes(data=True):
+            node_ids[node] = len(strings)
+            strings.append(node.uri if isinstance(node, Symbol) else node)
+            is_symbol.append(isinstance(node, Symbol))
+            labels.append(_NODE_LABELS.index(data.get("label")))
+
+        columns: Dict[str, Dict[str, List[int]]] = {
+            label: {"source": [], "target": [], "position": [], "in_position": []}
+            for label in EDGE_LABELS
+        }
+        for label in _POSITIONAL_EDGE_LABELS:
+            columns[label].update({"line": [], "column": [], "roles": []})
+        columns["relationship"]["flags"] = []
+
+        # The in-edges of a MultiDiGraph are not iterated in the order of its out-edges
+        in_positions = {
+            (source, target, key): position
+            for position, (source, target, key) in enumerate(graph.in_edges(keys=True))
+        }
+        for position, (source, target, key, data) in enumerate(graph.edges(keys=True, data=True)):
+            label = data.get("label")
+            if label not in columns:
+                logger.warning(f"Skipping edge with unknown label {label} in snapshot")
+                continue
+            label_columns = columns[label]
+            label_columns["source"].append(node_ids[source])
+            label_columns["target"].append(node_ids[target])
+            label_columns["position"].append(position)
+            label_columns["in_position"].append(in_positions[(source, target, key)])
+            if label == "reference":
+                reference = data["symbol_reference"]
+                label_columns["line"].append(reference.line_number)
+                label_columns["column"].append(reference.column_number)
+                label_columns["roles"].append(encode_symbol_roles(reference.roles))
+            elif label in ("caller", "callee"):
+                label_columns["line"].append(data["line_number"])
+                label_columns["column"].append(data["column_number"])
+                label_columns["roles"].append(encode_symbol_roles(data["roles"]))
+            elif label == "relationship":
+                label_columns["flags"].append(
+                    sum(
+                        1 << bit
+                        for bit, flag in enumerate(_RELATIONSHIP_FLAGS)
+                        if data.get(flag, False)
+                    )
+                )
+
+        edges = {
+            label: {
+                name: np.asarray(values, dtype=_EDGE_COLUMN_TYPES.get(name, np.int32))
+                for name, values in label_columns.items()
+            }
+            for label, label_columns in columns.items()
+        }
+        return cls(
+            index_digest,
+            build_caller_relationships,
+            document_digests,
+            strings,
+            np.asarray(is_symbol, dtype=np.bool_),
+            np.asarray(labels, dtype=np.uint8),
+            edges,
+        )
+
+    def to_graph(self) -> nx.MultiDiGraph:
+        """
+        Decodes the snapshot back into a symbol graph
+
+        Returns:
+            nx.MultiDiGraph: A graph equivalent to the one the snapshot was built from
+
+        Note:
+            Symbol URIs are parsed in one batch through the intern table, so every edge
+            and SymbolReference that points at a symbol shares a single Symbol instance.
+            The edges are decoded label by label, and then added in an order which
+            reproduces the out-edge and in-edge order of every node.
+        """
+        graph = nx.MultiDiGraph()
+        nodes: List[Union[Symbol, str]] = []
+        node_is_symbol = self.node_is_symbol.tolist()
+        symbols = iter(
+            parse_symbols(
+                [uri for uri, is_symbol in zip(self.strings, node_is_symbol) if is_symbol]
+            )
+        )
+        for uri, is_symbol, label_code in zip(
+            self.strings, node_is_symbol, self.node_label.tolist()
+        ):
+            node: Union[Symbol, str] = next(symbols) if is_symbol else uri
+            nodes.append(node)
+            label = _NODE_LABELS[label_code]
+            if label is None:
+                graph.add_node(node)
+            else:
+                graph.add_node(node, label=label)
+
+        file_references: Dict[str, List[SymbolReference]] = {}
+        edges: List[Tuple[Union[Symbol, str], Union[Symbol, str], Dict[str, Any]]] = []
+        for label in EDGE_LABELS:
+            label_columns = self.edges[label]
+            sources = label_columns["source"].tolist()
+            targets = label_columns["target"].tolist()
+            if label == "reference":
+                for source, target, line, column, roles in zip(
+                    sources,
+                    targets,
+                    label_columns["line"].tolist(),
+                    label_columns["column"].tolist(),
+                    label_columns["roles"].tolist(),
+                ):
+                    reference = SymbolReference(
+                        symbol=nodes[source],  # type: ignore
+                        line_number=line,
+                        column_number=column,
+                        roles=decode_symbol_roles(roles),
+                    )
+                    file_references.setdefault(nodes[target], []).append(reference)  # type: ignore
+                    edges.append(
+                        (
+                            nodes[source],
+                            nodes[target],
+                            {"symbol_reference": reference, "label": label},
+                        )
+                    )
+            elif label in ("caller", "callee"):
+                for source, target, line, column, roles in zip(
+                    sources,
+                    targets,
+                    label_columns["line"].tolist(),
+                    label_columns["column"].tolist(),
+                    label_columns["roles"].tolist(),
+                ):
+                    edges.append(
+                        (
+                            nodes[source],
+                            nodes[target],
+                            {
+                                "line_number": line,
+                                "column_number": column,
+                                "roles": decode_symbol_roles(roles),
+                                "label": label,
+                            },
+                        )
+                    )
+            elif label == "relationship":
+                for source, target, flags in zip(
+                    sources, targets, label_columns["flags"].tolist()
+                ):
+                    relationship_labels = {
+                        flag: True
+                        for bit, flag in enumerate(_RELATIONSHIP_FLAGS)
+                        if flags & (1 << bit)
+                    }
+                    edges.append(
+                        (nodes[source], nodes[target], {"label": label, **relationship_labels})
+                    )
+            else:
+                for source, target in zip(sources, targets):
+                    edges.append((nodes[source], nodes[target], {"label": label}))
+
+        for edge in self._get_insertion_order():
+            source, target, data = edges[edge]
+            graph.add_edge(source, target, **data)
+
+        # The raw protobuf occurrences are not kept in a snapshot,
+        # files instead hold the references which point into them.
+        for node, label_code in zip(nodes, self.node_label.tolist()):
+            if _NODE_LABELS[label_code] == "file":
+                graph.nodes[node]["file"] = SymbolFile(
+                    node, occurrences=file_references.get(node, [])  # type: ignore
+                )
+        return graph
+
+    def _get_insertion_order(self) -> List[int]:
+        """
+        Gets an order to add the edges in which reproduces the out-edge and the in-edge
+        order of every node, where edges are numbered label by label
+
+        Each node iterates its out-edges, and its in-edges, grouped by neighbour in the
+        order each neighbour was first connected, and the parallel edges of a neighbour in
+        the order they were added. Adding the edges in any order in which every out-edge of
+        a node follows the out-edges before it, and every in-edge of a node follows the
+        in-edges before it, rebuilds both orders. The order the original graph was built in
+        is one such order, so these constraints never form a cycle.
+
+        Returns:
+            List[int]: The edge numbers, in the order to add the edges in
+        """
+        sources = np.concatenate([self.edges[label]["source"] for label in EDGE_LABELS])
+        targets = np.concatenate([self.edges[label]["target"] for label in EDGE_LABELS])
+        out_order = np.argsort(
+            np.concatenate([self.edges[label]["position"] for label in EDGE_LABELS])
+        )
+        in_order = np.argsort(
+            np.concatenate([self.edges[label]["in_position"] for label in EDGE_LABELS])
+        )
+
+        # Each edge comes right before at most one out-edge and one in-edge of the same node
+        following = np.full((2, len(sources)), -1, dtype=np.int64)
+        preceding_count = np.zeros(len(sources), dtype=np.int64)
+        for following_edges, order, nodes in (
+            (following[0], out_order, sources),
+            (following[1], in_order, targets),
+        ):
+            same_node = np.flatnonzero(nodes[order[1:]] == nodes[order[:-1]])
+            following_edges[order[same_node]] = order[same_node + 1]
+            preceding_count[order[same_node + 1]] += 1
+
+        next_out_edges, next_in_edges = following.tolist()
+        remaining_count = preceding_count.tolist()
+        insertion_order: List[int] = []
+        ready = deque(edge for edge in out_order.tolist() if remaining_count[edge] == 0)
+        while ready:
+            edge = ready.popleft()
+            insertion_order.append(edge)
+            for next_edge in (next_out_edges[edge], next_in_edges[edge]):
+                if next_edge >= 0:
+                    remaining_count[next_edge] -= 1
+                    if remaining_count[next_edge] == 0:
+                        ready.append(next_edge)
+        if len(insertion_order) != len(sources):
+            raise ValueError("The edge positions of the snapshot are inconsistent")
+        return insertion_order
+
+    def is_fresh(self, index_digest: str, build_caller_relationships: bool) -> bool:
+        """
+        Checks whether the snapshot was built from the given index and build options
+
+        Args:
+            index_digest (str): The content hash of the current index
+            build_caller_relationships (bool): Whether caller-callee edges are requested
+
+        Returns:
+            bool: True if the snapshot can be used in place of a fresh build
+        """
+        return (
+            self.index_digest == index_digest
+            and self.build_caller_relationships == build_caller_relationships
+        )
+
+    def save(self, path: str) -> None:
+        """
+        Saves the snapshot to disk
+
+        Args:
+            path (str): The path to save the snapshot to
+
+        Note:
+            The snapshot is written to a temporary file and moved into place,
+            so that concurrent readers never observe a partially written snapshot.
+        """
+        header = {
+            "format_version": SNAPSHOT_FORMAT_VERSION,
+            "index_digest": self.index_digest,
+            "build_caller_relationships": self.build_caller_relationships,
+            "document_digests": self.document_digests,
+        }
+        encoded_strings = [string.encode("utf-8") for string in self.strings]
+        string_offsets = np.zeros(len(encoded_strings) + 1, dtype=np.int64)
+        np.cumsum([len(string) for string in encoded_strings], out=string_offsets[1:])
+
+        arrays: Dict[str, np.ndarray] = {
+            "header": np.frombuffer(json.dumps(header).encode("utf-8"), dtype=np.uint8),
+            "string_data": np.frombuffer(b"".join(encoded_strings), dtype=np.uint8),
+            "string_offsets": string_offsets,
+            "node_is_symbol": self.node_is_symbol,
+            "node_label": self.node_label,
+        }
+        for label, label_columns in self.edges.items():
+            for name, values in label_columns.items():
+                arrays[f"{label}_{name}"] = values
+
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, "wb") as f:
+            np.savez(f, **arrays)
+        os.replace(temp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "SymbolGraphSnapshot":
+        """
+        Loads a snapshot from disk
+
+        Args:
+            path (str): The path to load the snapshot from
+
+        Returns:
+            SymbolGraphSnapshot: The loaded snapshot
+
+        Raises:
+            ValueError: If the snapshot was written with an unsupported format version
+        """
+        with np.load(path, allow_pickle=False) as archive:
+            header = cls._decode_header(archive)
+            string_data = archive["string_data"].tobytes()
+            string_offsets = archive["string_offsets"].tolist()
+            strings = [
+                string_data[start:end].decode("utf-8")
+                for start, end in zip(string_offsets[:-1], string_offsets[1:])
+            ]
+            edges: Dict[str, Dict[str, np.ndarray]] = {}
+            for key in archive.files:
+                label, _, name = key.partition("_")
+                if label in EDGE_LABELS:
+                    edges.setdefault(label, {})[name] = archive[key]
+            return cls(
+                header["index_digest"],
+                header["build_caller_relationships"],
+                header["document_digests"],
+                strings,
+                archive["node_is_symbol"],
+                archive["node_label"],
+                edges,
+            )
+
+    @classmethod
+    def load_if_fresh(
+        cls, path: str, index_digest: str, build_caller_relationships: bool
+    ) -> Optional["SymbolGraphSnapshot"]:
+        """
+        Loads a snapshot from disk if it exists and matches the given freshness keys
+
+        Args:
+            path (str): The path to load the snapshot from
+            index_digest (str): The content hash of the current index
+            build_caller_relationships (bool): Whether caller-callee edges are requested
+
+        Returns:
+            Optional[SymbolGraphSnapshot]: The snapshot, or None if it is missing or stale
+        """
+        if not os.path.exists(path):
+            return None
+        try:
+            with np.load(path, allow_pickle=False) as archive:
+                header = cls._decode_header(archive)
+            if (
+                header["index_digest"] != index_digest
+                or header["build_caller_relationships"] != build_caller_relationships
+            ):
+                logger.info(f"Symbol graph snapshot at {path} is stale")
+                return None
+            return cls.load(path)
+        except Exception as e:
+            logger.warning(f"Failed to load symbol graph snapshot at {path} with error {e}")
+            return None
+
+    @staticmethod
+    def default_path(index_path: str) -> str:
+        """
+        Gets the default snapshot path for an index
+
+        Args:
+            index_path (str): The path to the index protobuf file
+
+        Returns:
+            str: The path where the snapshot of the index is stored by default
+        """
+        return f"{index_path}.snapshot"
+
+    @staticmethod
+    def _decode_header(archive: Any) -> Dict[str, Any]:
+        """
+        Decodes and validates the header of an opened snapshot archive
+
+        Args:
+            archive (Any): The opened numpy archive
+
+        Returns:
+            Dict[str, Any]: The decoded header
+        """
+        header = json.loads(archive["header"].tobytes().decode("utf-8"))
+        if header.get("format_version") != SNAPSHOT_FORMAT_VERSION:
+            raise ValueError(
+                f"Unsupported snapshot format version {header.get('format_version')}, "
+                f"expected {SNAPSHOT_FORMAT_VERSION}"
+            )
+        return header
@@ -2,16 +2,18 @@ import abc
 import re
 from dataclasses import dataclass
 from enum import Enum
-from typing import Any, Dict, Optional, Tuple
+from typing import Any, Dict, List, Optional, Tuple
 
 import numpy as np
 
 from automata.core.symbol.scip_pb2 import Descriptor as DescriptorProto  # type: ignore
 
 
+@dataclass(frozen=True)
 class SymbolDescriptor:
     """
-    Wraps the descriptor component of the URI into a python object
+    Wraps the descriptor component of the URI into a python object, which is
+    immutable once created as it is shared by every symbol parsed from the same URI
     """
 
     ScipSuffix = DescriptorProto
@@ -27,12 +29,9 @@ class SymbolDescriptor:
         Parameter = "parameter"
         TypeParameter = "type_parameter"
 
-    def __init__(
-        self, name: str, suffix: DescriptorProto, disambiguator: Optional[str] = None
-    ) -> None:
-        self.name = name
-        self.suffix = suffix
-        self.disambiguator = disambiguator
+    name: str
+    suffix: DescriptorProto
+    disambiguator: Optional[str] = None
 
     def __repr__(self) -> str:
         return f"Descriptor({self.name}, {self.suffix}" + (
@@ -102,7 +101,7 @@ class SymbolDescriptor:
             return SymbolDescriptor.PyKind.Meta
 
 
-@dataclass
+@dataclass(frozen=True)
 class SymbolPackage:
     """Wraps the package component of the URI"""
 
@@ -118,7 +117,7 @@ class SymbolPackage:
         return f"{self.manager} {self.name} {self.version}"
 
 
-@dataclass
+@dataclass(frozen=True)
 class Symbol:
     """
     Symbol is similar to a URI, it identifies a class, method, or a local variable. SymbolInformation contains rich metadata about symbols such as the docstring.
@@ -289,7 +288,7 @@ class SymbolFile:
     """Represents a file that contains a symbol"""
 
     path: str
-    occurrences: str
+    occurrences: List[SymbolReference]
 
     def __hash__(self) -> int:
         return hash(self.path)
@@ -9,6 +9,7 @@ from automata.config.config_types import AgentConfigName
 from automata.core.agent.agent import AutomataAgent
 from automata.core.agent.tools.tool_utils import build_llm_toolkits
 from automata.core.coding.py_coding.retriever import PyCodeRetriever
+from automata.core.database.vector import JSONVectorDatabase
 from automata.core.embedding.code_embedding import SymbolCodeEmbeddingHandler
 from automata.core.embedding.symbol_similarity import SymbolSimilarity
 from automata.core.symbol.graph import SymbolGraph
@@ -105,6 +106,7 @@ def mock_embedding():
 def symbol_graph_mock(mocker):
     """Mock a SymbolGraph object for cases where we don't need to test the graph itself"""
     mock = mocker.MagicMock(spec=SymbolGraph)
+    mock.index_digest = "index_digest"
     return mock
 
 
@@ -113,10 +115,16 @@ def symbol_searcher(mocker, symbol_graph_mock):
     """Creates a SymbolSearch object with Mock dependencies for testing"""
     symbol_similarity_mock = mocker.MagicMock(spec=SymbolSimilarity)
     symbol_similarity_mock.embedding_handler = mocker.MagicMock(spec=SymbolCodeEmbeddingHandler)
+    symbol_similarity_mock.embedding_handler.embedding_db = mocker.MagicMock(
+        spec=JSONVectorDatabase
+    )
+    symbol_similarity_mock.embedding_handler.embedding_db.version = "embedding_version"
     symbol_rank_config_mock = mocker.MagicMock(spec=SymbolRankConfig)
     code_subgraph_mock = mocker.MagicMock(spec=SymbolGraph.SubGraph)
     code_subgraph_mock.parent = symbol_graph_mock
     code_subgraph_mock.graph = mocker.MagicMock()
+    code_subgraph_mock.flow_rank = "bidirectional"
+    code_subgraph_mock.path_filter = None
 
     return SymbolSearch(
         symbol_graph_mock, symbol_similarity_mock, symbol_rank_config_mock, code_subgraph_mock
@@ -4,6 +4,7 @@ import pytest
 
 from automata.config.config_types import AgentConfigName, AutomataAgentConfig
 from automata.core.agent.tools.tool_utils import build_llm_toolkits
+from automata.core.symbol.search.global_rank import GlobalSymbolRank
 
 
 def test_automata_agent_init(automata_agent):
@@ -113,3 +114,36 @@ def test_config_loading_different_versions():
             continue
         main_config = AutomataAgentConfig.load(config_name)
         assert isinstance(main_config, AutomataAgentConfig)
+
+
+def test_default_formatter_reads_global_symbol_rank(mocker):
+    config = AutomataAgentConfig.load(AgentConfigName.AUTOMATA_RETRIEVER)
+    global_rank = GlobalSymbolRank(
+        "digest",
+        [
+            (
+                "scip-python python automata 75482692a6fe30c72db516201a6f47d9fb4af065 `automata.core.agent.agent`/AutomataAgent#",
+                0.6,
+            ),
+            (
+                "scip-python python automata 75482692a6fe30c72db516201a6f47d9fb4af065 `automata.core.base.tool`/Tool#",
+                0.4,
+            ),
+        ],
+    )
+    mocker.patch("automata.core.symbol.index_stream.compute_file_digest", return_value="digest")
+    mocker.patch(
+        "automata.core.database.vector.read_vector_database_version",
+        return_value="embedding_version",
+    )
+    mocker.patch.object(GlobalSymbolRank, "load_if_fresh", return_value=global_rank)
+    dependency_factory_get = mocker.patch(
+        "automata.core.agent.tools.tool_utils.DependencyFactory.get"
+    )
+
+    formatter = AutomataAgentConfig.TemplateFormatter.create_default_formatter(config)
+
+    assert (
+        formatter["symbol_rank_overview"] == "core.agent.agent.AutomataAgent\ncore.base.tool.Tool"
+    )
+    dependency_factory_get.assert_not_called()
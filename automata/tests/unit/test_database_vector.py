@@ -1,7 +1,23 @@
+import os
+
+import numpy as np
 import pytest
 
-from automata.core.database.vector import JSONVectorDatabase
-from automata.core.symbol.symbol_types import SymbolEmbedding
+from automata.core.database import vector as vector_module
+from automata.core.database.ivf_index import IVFFlatIndex, IVFFlatIndexConfig
+from automata.core.database.vector import (
+    JSONVectorDatabase,
+    NumpyVectorDatabase,
+    load_vector_database,
+    read_vector_database_version,
+)
+from automata.core.embedding.normalization import NormType, normalize_embeddings
+from automata.core.symbol.parser import parse_symbol
+from automata.core.symbol.symbol_types import (
+    SymbolCodeEmbedding,
+    SymbolDocEmbedding,
+    SymbolEmbedding,
+)
 
 
 def test_init_vector(temp_output_filename):
@@ -75,3 +91,264 @@ def test_load(temp_output_filename, symbols):
 
     embedded_symbol_0 = vector_db_2.get(symbols[0])
     embedded_symbol_1 = vector_db_2.get(symbols[1])
+
+
+def test_numpy_vector_database_round_trip(tmp_path, symbols):
+    file_path = str(tmp_path / "symbol_code_embedding.npy")
+    vector_db = NumpyVectorDatabase(file_path)
+    vector_db.add(SymbolCodeEmbedding(symbols[0], "def x(): pass", [1.0, 2.0, 3.0]))
+    vector_db.add(SymbolDocEmbedding(symbols[1], "y docs", [4.0, 5.0, 6.0], summary="y"))
+    vector_db.add(SymbolEmbedding(symbols[2], "z", [7.0, 8.0, 9.0]))
+    vector_db.discard(symbols[2])
+    vector_db.update(SymbolCodeEmbedding(symbols[0], "def x(): return 1", [0.5, 0.5, 0.5]))
+    with pytest.raises(ValueError):
+        vector_db.add(SymbolEmbedding(symbols[2], "z", [1.0, 2.0]))
+    vector_db.save()
+
+    vector_db_2 = NumpyVectorDatabase(file_path)
+    assert isinstance(vector_db_2.matrix, np.memmap)
+    assert vector_db_2.version == vector_db.version
+    assert not vector_db_2.contains(symbols[2])
+    assert vector_db_2.get_all_symbols() == sorted(
+        [symbols[0], symbols[1]], key=lambda symbol: symbol.dotpath
+    )
+
+    code_embedding = vector_db_2.get(symbols[0])
+    assert isinstance(code_embedding, SymbolCodeEmbedding)
+    assert code_embedding.symbol == symbols[0]
+    assert code_embedding.embedding_source == "def x(): return 1"
+    assert np.array_equal(code_embedding.vector, np.array([0.5, 0.5, 0.5], dtype=np.float32))
+
+    doc_embedding = vector_db_2.get(symbols[1])
+    assert isinstance(doc_embedding, SymbolDocEmbedding)
+    assert (doc_embedding.embedding_source, doc_embedding.summary) == ("y docs", "y")
+    assert np.array_equal(doc_embedding.vector, np.array([4.0, 5.0, 6.0], dtype=np.float32))
+
+
+@pytest.mark.parametrize("database_type", [JSONVectorDatabase, NumpyVectorDatabase])
+def test_calculate_similarity_without_live_rows(tmp_path, symbols, database_type):
+    extension = ".npy" if database_type is NumpyVectorDatabase else ".json"
+    vector_db = database_type(str(tmp_path / f"symbol_code_embedding{extension}"))
+    assert vector_db.calculate_similarity(np.array([1.0, 2.0, 3.0])) == {}
+    assert vector_db.calculate_similarity(np.array([1.0, 2.0, 3.0]), top_k=2) == {}
+
+    vector_db.add(SymbolCodeEmbedding(symbols[0], "x", [1.0, 2.0, 3.0]))
+    vector_db.discard(symbols[0])
+    assert vector_db.calculate_similarity(np.array([1.0, 2.0, 3.0]), top_k=2) == {}
+
+
+def test_numpy_vector_database_save_is_atomic(tmp_path, symbols, mocker):
+    file_path = str(tmp_path / "symbol_code_embedding.npy")
+    vector_db = NumpyVectorDatabase(file_path)
+    vector_db.add(SymbolEmbedding(symbols[0], "x", [1.0, 2.0, 3.0]))
+    vector_db.save()
+    first_revision = vector_db.version
+    assert sorted(os.listdir(tmp_path)) == [
+        f"symbol_code_embedding.{first_revision}.npy",
+        "symbol_code_embedding.symbols.json",
+    ]
+
+    # Simulate a crash after the new matrix was written, but before the sidecar was replaced
+    vector_db.add(SymbolEmbedding(symbols[1], "y", [4.0, 5.0, 6.0]))
+    mocker.patch("os.replace", side_effect=OSError("crash"))
+    with pytest.raises(OSError):
+        vector_db.save()
+    mocker.stopall()
+
+    vector_db_2 = NumpyVectorDatabase(file_path)
+    assert vector_db_2.version == first_revision
+    assert vector_db_2.get_all_symbols() == [symbols[0]]
+
+    vector_db_2.add(SymbolEmbedding(symbols[1], "y", [4.0, 5.0, 6.0]))
+    vector_db_2.save()
+    assert not os.path.exists(NumpyVectorDatabase.get_matrix_path(file_path, first_revision))
+    os.remove(NumpyVectorDatabase.get_matrix_path(file_path, vector_db_2.version))
+    with pytest.raises(ValueError):
+        NumpyVectorDatabase(file_path)
+
+
+def test_numpy_vector_database_rows_are_memory_mapped(tmp_path, symbols, mocker):
+    file_path = str(tmp_path / "symbol_code_embedding.npy")
+    vector_db = NumpyVectorDatabase(file_path)
+    for i, symbol in enumerate(symbols[:3]):
+        vector_db.add(SymbolEmbedding(symbol, "source", [float(i), 1.0, 2.0]))
+    vector_db.save()
+
+    vector_db = NumpyVectorDatabase(file_path)
+    parse = mocker.spy(vector_module, "parse_symbol")
+    matrix, row_symbols = vector_db.get_rows()
+    assert matrix is vector_db.matrix
+    assert len(row_symbols) == 3 and parse.call_count == 0
+    assert row_symbols[1] == symbols[1] and parse.call_count == 1
+    assert vector_db.get_live_rows().all()
+
+    # Similarity queries keep one scale per row rather than a normalized copy of the vectors
+    vector_db.calculate_similarity(np.ones(3), NormType.L2)
+    assert vector_db._row_cache["rows"][0] is vector_db.matrix
+    assert vector_db.get_row_scales(NormType.L2).shape == (3,)
+    assert np.allclose(
+        vector_db.get_normalized_rows(NormType.L2, np.array([2, 0])),
+        normalize_embeddings(np.asarray(matrix)[[2, 0]], NormType.L2),
+    )
+
+    # Unsaved changes are gathered into a copy, leaving the memory mapped file untouched
+    vector_db.discard(symbols[0])
+    vector_db.add(SymbolEmbedding(symbols[3], "source", [3.0, 1.0, 2.0]))
+    matrix, row_symbols = vector_db.get_rows()
+    assert matrix is not vector_db.matrix
+    assert np.array_equal(matrix[:, 0], [0.0, 1.0, 2.0, 3.0])
+    assert list(row_symbols) == [None, symbols[1], symbols[2], symbols[3]]
+    assert list(vector_db.get_live_rows()) == [False, True, True, True]
+
+
+def test_numpy_vector_database_from_json(tmp_path, symbols):
+    json_path = str(tmp_path / "symbol_code_embedding.json")
+    json_db = JSONVectorDatabase(json_path)
+    for i, symbol in enumerate(symbols[:3]):
+        json_db.add(SymbolCodeEmbedding(symbol, f"source {i}", [float(i), 1.0, 2.0]))
+    json_db.save()
+
+    vector_db = NumpyVectorDatabase.from_json(json_path)
+    assert vector_db.file_path == str(tmp_path / "symbol_code_embedding.npy")
+
+    vector_db_2 = NumpyVectorDatabase(vector_db.file_path)
+    assert vector_db_2.get_all_symbols() == json_db.get_all_symbols()
+    for embedding in json_db.data:
+        migrated_embedding = vector_db_2.get(embedding.symbol)
+        assert migrated_embedding.embedding_source == embedding.embedding_source
+        assert np.allclose(migrated_embedding.vector, embedding.vector)
+    assert isinstance(load_vector_database(vector_db.file_path), NumpyVectorDatabase)
+    assert isinstance(load_vector_database(json_path), JSONVectorDatabase)
+    assert read_vector_database_version(vector_db.file_path) == vector_db_2.version
+    assert read_vector_database_version(json_path) == JSONVectorDatabase(json_path).version
+    assert read_vector_database_version(str(tmp_path / "missing.npy")) is None
+
+
+def test_write_ahead_log_replay_and_compaction(tmp_path, symbols):
+    file_path = str(tmp_path / "symbol_code_embedding.json")
+    vector_db = JSONVectorDatabase(file_path, write_ahead_log=True, compaction_threshold=4)
+    vector_db.add(SymbolCodeEmbedding(symbols[0], "x", [1, 2, 3]))
+    vector_db.add(SymbolCodeEmbedding(symbols[1], "y", [4, 5, 6]))
+    vector_db.save()
+    # The changes are only in the log until the compaction threshold is reached
+    assert not os.path.exists(file_path)
+
+    vector_db.update(SymbolCodeEmbedding(symbols[1], "y2", [7, 8, 9]))
+    vector_db.discard(symbols[0])
+    vector_db.add(SymbolCodeEmbedding(symbols[2], "z", [1, 1, 1]))
+    # Simulate a crash in the middle of appending the next change
+    with open(f"{file_path}.wal", "a") as f:
+        f.write('{"operation": "add", "val')
+
+    vector_db_2 = JSONVectorDatabase(file_path, write_ahead_log=True, compaction_threshold=4)
+    assert vector_db_2.get_all_symbols() == sorted(
+        [symbols[1], symbols[2]], key=lambda symbol: symbol.dotpath
+    )
+    assert vector_db_2.get(symbols[1]).embedding_source == "y2"
+    assert vector_db_2.write_ahead_log.record_count == 5
+
+    vector_db_2.add(SymbolCodeEmbedding(symbols[0], "x", [1, 2, 3]))
+    vector_db_2.save()
+    assert os.path.exists(file_path)
+    assert not os.path.exists(f"{file_path}.wal")
+
+    vector_db_3 = JSONVectorDatabase(file_path)
+    assert vector_db_3.get_all_symbols() == vector_db_2.get_all_symbols()
+    assert vector_db_3.version == vector_db_2.version
+
+
+def test_tombstones_keep_rows_until_save(tmp_path, symbols):
+    for vector_db in (
+        JSONVectorDatabase(str(tmp_path / "symbol_code_embedding.json")),
+        NumpyVectorDatabase(str(tmp_path / "symbol_code_embedding.npy")),
+    ):
+        for i, symbol in enumerate(symbols[:3]):
+            vector_db.add(SymbolCodeEmbedding(symbol, f"source {i}", [float(i), 0.0, 1.0]))
+        vector_db.discard(symbols[0])
+        vector_db.add(SymbolCodeEmbedding(symbols[1], "source 1b", [5.0, 5.0, 5.0]))
+        assert vector_db.index == {symbols[1].dotpath: 1, symbols[2].dotpath: 2}
+        assert vector_db.tombstone_count == 1
+        assert vector_db.get(symbols[1]).embedding_source == "source 1b"
+        with pytest.raises(KeyError):
+            vector_db.discard(symbols[0])
+
+        vector_db.save()
+        assert vector_db.index == {symbols[1].dotpath: 0, symbols[2].dotpath: 1}
+        assert vector_db.tombstone_count == 0
+        reloaded_db = type(vector_db)(vector_db.file_path)
+        assert reloaded_db.get_all_symbols() == vector_db.get_all_symbols()
+        assert np.allclose(reloaded_db.get(symbols[1]).vector, [5.0, 5.0, 5.0])
+        assert np.allclose(reloaded_db.get(symbols[2]).vector, [2.0, 0.0, 1.0])
+
+
+@pytest.mark.parametrize("norm_type", [None, NormType.L1, NormType.L2, NormType.SOFTMAX])
+def test_calculate_similarity(tmp_path, symbols, norm_type):
+    rng = np.random.default_rng(0)
+    vectors = rng.normal(size=(6, 8)).astype(np.float32)
+    query = rng.normal(size=8)
+    for vector_db in (
+        JSONVectorDatabase(str(tmp_path / "symbol_code_embedding.json")),
+        NumpyVectorDatabase(str(tmp_path / "symbol_code_embedding.npy")),
+    ):
+        for symbol, vector in zip(symbols[:6], vectors):
+            vector_db.add(SymbolCodeEmbedding(symbol, "source", vector))
+        vector_db.save()
+        vector_db.discard(symbols[5])
+
+        expected_matrix, expected_query = vectors[:5], query[np.newaxis, :]
+        if norm_type is not None:
+            expected_matrix = normalize_embeddings(expected_matrix, norm_type)
+            expected_query = normalize_embeddings(expected_query, norm_type)
+        expected_scores = expected_matrix @ expected_query[0]
+
+        similarity = vector_db.calculate_similarity(query, norm_type)
+        assert list(similarity) == symbols[:5]
+        assert np.allclose(list(similarity.values()), expected_scores, atol=1e-5)
+
+        top_symbols = list(vector_db.calculate_similarity(query, norm_type, top_k=3))
+        assert top_symbols == [symbols[i] for i in np.argsort(-expected_scores)[:3]]
+
+        candidate_mask = vector_db.get_candidate_mask([symbols[1], symbols[3], symbols[5]])
+        masked_similarity = vector_db.calculate_similarity(
+            query, norm_type, top_k=3, candidate_mask=candidate_mask
+        )
+        assert set(masked_similarity) == {symbols[1], symbols[3]}
+
+
+def test_ivf_flat_index(tmp_path):
+    rng = np.random.default_rng(0)
+    symbols = [
+        parse_symbol(f"scip-python python automata 1 `module`/function_{i}().") for i in range(40)
+    ]
+    vector_db = NumpyVectorDatabase(str(tmp_path / "symbol_code_embedding.npy"))
+    for symbol in symbols[:40]:
+        vector_db.add(SymbolCodeEmbedding(symbol, "source", rng.normal(size=8)))
+    vector_db.discard(symbols[0])
+    query = rng.normal(size=8)
+
+    ann_index = IVFFlatIndex.build(vector_db, NormType.L2, IVFFlatIndexConfig(n_lists=4))
+    assert ann_index.centroids.shape == (4, 8)
+    assert sorted(ann_index.list_rows) == list(range(1, 40))
+
+    # Probing every list is an exact search
+    ann_index.n_probe = 4
+    assert list(vector_db.calculate_similarity(query, top_k=5, ann_index=ann_index)) == list(
+        vector_db.calculate_similarity(query, top_k=5)
+    )
+    ann_index.n_probe = 1
+    probed_symbols = {vector_db.get_rows()[1][row] for row in ann_index.probe(query)}
+    assert set(vector_db.calculate_similarity(query, top_k=5, ann_index=ann_index)) <= (
+        probed_symbols
+    )
+
+    index_path = IVFFlatIndex.default_path(vector_db.file_path)
+    ann_index.save(index_path)
+    loaded_index = IVFFlatIndex.load_if_fresh(index_path, vector_db.version, NormType.L2)
+    assert loaded_index is not None
+    assert np.array_equal(loaded_index.list_rows, ann_index.list_rows)
+    assert IVFFlatIndex.load_if_fresh(index_path, vector_db.version, NormType.L1) is None
+
+    vector_db.add(SymbolCodeEmbedding(symbols[0], "source", rng.normal(size=8)))
+    assert IVFFlatIndex.load_if_fresh(index_path, vector_db.version, NormType.L2) is None
+    with pytest.raises(ValueError):
+        vector_db.calculate_similarity(query, top_k=5, ann_index=ann_index)
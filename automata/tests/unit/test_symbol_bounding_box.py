@@ -0,0 +1,88 @@
+import os
+
+import pytest
+
+from automata.core.coding.py_coding.module_tree import LazyModuleTreeMap
+from automata.core.symbol.bounding_box import (
+    BoundingBox,
+    BoundingBoxCache,
+    BoundingBoxProvider,
+    Position,
+)
+from automata.core.symbol.parser import parse_symbol
+from automata.core.symbol.symbol_utils import convert_to_fst_object
+
+SYMBOL_PREFIX = "scip-python python automata 75482692a6fe30c72db516201a6f47d9fb4af065 "
+
+
+@pytest.fixture
+def module_map():
+    sample_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "sample_modules")
+    return LazyModuleTreeMap(sample_dir)
+
+
+@pytest.mark.parametrize(
+    "descriptors",
+    [
+        "`sample`/sample_function().",
+        "`sample`/Person#",
+        "`sample`/Person#say_hello().",
+        "`sample`/OuterClass#InnerClass#inner_method().",
+        "`sample2`/PythonAgentToolBuilder#build().python_agent_python_task().",
+    ],
+)
+def test_ast_bounding_box_matches_redbaron(module_map, descriptors):
+    symbol = parse_symbol(SYMBOL_PREFIX + descriptors)
+    bounding_box = BoundingBoxProvider(module_map).get_bounding_box(symbol)
+    redbaron_bounding_box = convert_to_fst_object(symbol, module_map).absolute_bounding_box
+
+    assert isinstance(bounding_box, BoundingBox)
+    assert bounding_box.top_left.line == redbaron_bounding_box.top_left.line
+    assert bounding_box.top_left.column == redbaron_bounding_box.top_left.column
+    assert bounding_box.bottom_right.line == redbaron_bounding_box.bottom_right.line
+
+
+def test_missing_symbol_raises(module_map):
+    symbol = parse_symbol(SYMBOL_PREFIX + "`sample`/MissingClass#")
+    with pytest.raises(ValueError):
+        BoundingBoxProvider(module_map).get_bounding_box(symbol)
+
+
+def test_bounding_box_from_scip_range():
+    assert BoundingBox.from_scip_range([4, 0, 9, 12]) == BoundingBox(
+        Position(5, 1), Position(11, 12)
+    )
+    assert BoundingBox.from_scip_range([4, 4, 20]) == BoundingBox(Position(5, 5), Position(6, 20))
+
+
+def test_bounding_box_cache_only_measures_changed_files(tmp_path, mocker):
+    sample_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "sample_modules")
+    module_dir = tmp_path / "modules"
+    module_dir.mkdir()
+    with open(os.path.join(sample_dir, "sample.py")) as f:
+        (module_dir / "sample.py").write_text(f.read())
+    provider = BoundingBoxProvider(LazyModuleTreeMap(str(module_dir)))
+    symbols = [
+        parse_symbol(SYMBOL_PREFIX + "`sample`/Person#"),
+        parse_symbol(SYMBOL_PREFIX + "`sample`/Person#say_hello()."),
+    ]
+    cache_path = str(tmp_path / "index.scip.bounding_boxes.json")
+    measure = mocker.spy(provider, "get_bounding_boxes")
+
+    cache = BoundingBoxCache.load(cache_path)
+    bounding_boxes = cache.get_bounding_boxes(symbols, provider)
+    cache.save(cache_path)
+    assert measure.call_count == 1
+
+    warm_cache = BoundingBoxCache.load(cache_path)
+    assert warm_cache.get_bounding_boxes(symbols, provider) == bounding_boxes
+    assert measure.call_count == 1
+    assert not warm_cache.is_dirty
+
+    (module_dir / "sample.py").write_text("\n" + (module_dir / "sample.py").read_text())
+    provider.clear()
+    shifted_boxes = warm_cache.get_bounding_boxes(symbols, provider)
+    assert measure.call_count == 2
+    assert warm_cache.is_dirty
+    for symbol in symbols:
+        assert shifted_boxes[symbol].top_left.line == bounding_boxes[symbol].top_left.line + 1
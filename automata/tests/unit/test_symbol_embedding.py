@@ -112,7 +112,7 @@ def test_update_embedding(monkeypatch, mock_simple_method_symbols):
     mock_db.data = []
     mock_db.contains = lambda x: False
     mock_db.add = lambda x: mock_db.data.append(x)
-    mock_db.discard = lambda x: mock_db.data.pop(0)
+    mock_db.update = lambda x: mock_db.data.__setitem__(0, x)
     mock_db.get = lambda x: mock_db.data[0]
 
     cem = SymbolCodeEmbeddingHandler(embedding_provider=mock_provider, embedding_db=mock_db)
@@ -1,5 +1,13 @@
-from automata.core.symbol.graph import SymbolGraph
-from automata.core.symbol.symbol_types import Symbol, SymbolFile
+import os
+from types import SimpleNamespace
+
+from automata.core.symbol import index_stream
+from automata.core.symbol.bounding_box import BoundingBox
+from automata.core.symbol.graph import GraphBuilder, SymbolGraph
+from automata.core.symbol.index_stream import iter_index_documents
+from automata.core.symbol.parser import parse_symbol
+from automata.core.symbol.scip_pb2 import SymbolRole  # type: ignore
+from automata.core.symbol.symbol_types import Symbol, SymbolFile, SymbolReference
 from automata.tests.utils.factories import symbol_graph_static_test  # noqa: F401
 
 
@@ -28,3 +36,238 @@ def test_build_real_graph_and_subgraph(symbol_graph_static_test):  # noqa: F811
     assert len(all_files) == 91
     assert len(subgraph.graph) == 89
     assert subgraph.graph.number_of_edges() == 272
+
+
+def test_snapshot_round_trip(symbol_graph_static_test, tmp_path):  # noqa: F811
+    snapshot_path = str(tmp_path / "index.scip.snapshot")
+    symbol_graph_static_test.save_snapshot(snapshot_path)
+    loaded_graph = SymbolGraph.from_snapshot(snapshot_path)
+
+    assert loaded_graph.index_digest == symbol_graph_static_test.index_digest
+    assert set(loaded_graph.get_all_available_symbols()) == set(
+        symbol_graph_static_test.get_all_available_symbols()
+    )
+    assert len(loaded_graph.get_all_files()) == 91
+    assert (
+        loaded_graph._graph.number_of_edges() == symbol_graph_static_test._graph.number_of_edges()
+    )
+    # The out-edges and in-edges of every node are restored in their original order
+    assert list(loaded_graph._graph.edges(keys=True, data="label")) == list(
+        symbol_graph_static_test._graph.edges(keys=True, data="label")
+    )
+    assert list(loaded_graph._graph.in_edges(keys=True, data="label")) == list(
+        symbol_graph_static_test._graph.in_edges(keys=True, data="label")
+    )
+
+    symbol = next(
+        symbol
+        for symbol in symbol_graph_static_test.get_all_available_symbols()
+        if symbol_graph_static_test.get_references_to_symbol(symbol)
+    )
+    assert loaded_graph.get_references_to_symbol(
+        symbol
+    ) == symbol_graph_static_test.get_references_to_symbol(symbol)
+
+
+def test_snapshot_is_keyed_on_build_options(
+    symbol_graph_static_test, tmp_path, mocker  # noqa: F811
+):
+    snapshot_path = str(tmp_path / "index.scip.snapshot")
+    index_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "index.scip")
+    symbol_graph_static_test.save_snapshot(snapshot_path)
+
+    build_graph = mocker.spy(GraphBuilder, "build_graph")
+    SymbolGraph(index_path, snapshot_path=snapshot_path)
+    assert build_graph.call_count == 0
+
+    mocker.patch.object(SymbolGraph, "save_snapshot")
+    mocker.patch.object(GraphBuilder, "_process_caller_callee_relationships")
+    SymbolGraph(index_path, build_caller_relationships=True, snapshot_path=snapshot_path)
+    assert build_graph.call_count == 1
+
+
+def test_update_index_matches_full_build(symbol_graph_static_test, tmp_path):  # noqa: F811
+    index_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "index.scip")
+    index = SymbolGraph._load_index_protobuf(index_path)
+    changed_path = index.documents[5].relative_path
+    removed_path = index.documents[7].relative_path
+    del index.documents[5].occurrences[-10:]
+    del index.documents[5].symbols[-2:]
+    del index.documents[7]
+    new_index_path = str(tmp_path / "index.scip")
+    with open(new_index_path, "wb") as f:
+        f.write(index.SerializeToString())
+
+    updated_paths = symbol_graph_static_test.update_index(new_index_path)
+    rebuilt_graph = SymbolGraph(new_index_path)
+
+    assert sorted(updated_paths) == sorted([changed_path, removed_path])
+    assert symbol_graph_static_test.update_index(new_index_path) == []
+    assert set(symbol_graph_static_test.get_all_available_symbols()) == set(
+        rebuilt_graph.get_all_available_symbols()
+    )
+    assert len(symbol_graph_static_test.get_all_files()) == 90
+    assert (
+        symbol_graph_static_test._graph.number_of_nodes() == rebuilt_graph._graph.number_of_nodes()
+    )
+    assert (
+        symbol_graph_static_test._graph.number_of_edges() == rebuilt_graph._graph.number_of_edges()
+    )
+
+
+def test_update_index_with_compact_backend(tmp_path):
+    index_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "index.scip")
+    graph = SymbolGraph(index_path, backend="compact")
+    index = SymbolGraph._load_index_protobuf(index_path)
+    changed_path = index.documents[5].relative_path
+    removed_path = index.documents[7].relative_path
+    del index.documents[5].occurrences[-10:]
+    del index.documents[5].symbols[-2:]
+    del index.documents[7]
+    new_index_path = str(tmp_path / "index.scip")
+    with open(new_index_path, "wb") as f:
+        f.write(index.SerializeToString())
+
+    updated_paths = graph.update_index(new_index_path)
+    rebuilt_graph = SymbolGraph(new_index_path, backend="compact")
+
+    assert sorted(updated_paths) == sorted([changed_path, removed_path])
+    assert graph.update_index(new_index_path) == []
+    assert set(graph.get_all_available_symbols()) == set(rebuilt_graph.get_all_available_symbols())
+    assert sorted(file.path for file in graph.get_all_files()) == sorted(
+        file.path for file in rebuilt_graph.get_all_files()
+    )
+    for symbol in rebuilt_graph.get_all_available_symbols()[:20]:
+        assert set(graph.get_symbol_relationships(symbol)) == set(
+            rebuilt_graph.get_symbol_relationships(symbol)
+        )
+
+
+def test_parallel_build_matches_serial_build(symbol_graph_static_test):  # noqa: F811
+    index_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "index.scip")
+    index = SymbolGraph._load_index_protobuf(index_path)
+    builder = GraphBuilder(index, parallel=True)
+    parallel_graph = builder.build_graph()
+    serial_graph = symbol_graph_static_test._graph
+
+    assert builder.document_digests == symbol_graph_static_test.document_digests
+    assert set(parallel_graph.nodes(data="label")) == set(serial_graph.nodes(data="label"))
+    assert sorted(
+        (str(source), str(target), label)
+        for source, target, label in parallel_graph.edges(data="label")
+    ) == sorted(
+        (str(source), str(target), label)
+        for source, target, label in serial_graph.edges(data="label")
+    )
+
+
+def test_compact_backend_matches_networkx(symbol_graph_static_test, tmp_path):  # noqa: F811
+    snapshot_path = str(tmp_path / "index.scip.snapshot")
+    symbol_graph_static_test.save_snapshot(snapshot_path)
+    compact_graph = SymbolGraph.from_snapshot(snapshot_path, backend="compact")
+    all_symbols = symbol_graph_static_test.get_all_available_symbols()
+
+    assert compact_graph.backend == "compact"
+    assert set(compact_graph.get_all_available_symbols()) == set(all_symbols)
+    assert set(compact_graph.get_all_files()) == set(symbol_graph_static_test.get_all_files())
+    for symbol in all_symbols:
+        assert compact_graph.get_symbol_relationships(
+            symbol
+        ) == symbol_graph_static_test.get_symbol_relationships(symbol)
+        assert {
+            file_path: set(references)
+            for file_path, references in compact_graph.get_references_to_symbol(symbol).items()
+        } == {
+            file_path: set(references)
+            for file_path, references in symbol_graph_static_test.get_references_to_symbol(
+                symbol
+            ).items()
+        }
+        if symbol.uri.startswith("local"):
+            # Local symbols are document scoped, so they may collide across files
+            continue
+        assert compact_graph.navigator._get_symbol_containing_file(
+            symbol
+        ) == symbol_graph_static_test.navigator._get_symbol_containing_file(symbol)
+
+
+def test_references_in_scope_match_linear_scan(symbol_graph_static_test):  # noqa: F811
+    navigator = symbol_graph_static_test.navigator
+    symbol = next(
+        symbol
+        for symbol in symbol_graph_static_test.get_all_available_symbols()
+        if not symbol.uri.startswith("local")
+    )
+    file_name = navigator._get_symbol_containing_file(symbol)
+    navigator.bounding_box[symbol] = SimpleNamespace(
+        top_left=SimpleNamespace(line=3, column=5), bottom_right=SimpleNamespace(line=40)
+    )
+    try:
+        references_in_scope = navigator._get_symbol_references_in_scope(symbol)
+    finally:
+        navigator._discard_bounding_boxes({symbol})
+
+    assert references_in_scope == sorted(
+        [
+            ref
+            for ref in navigator._get_references_to_module(file_name)
+            if 2 <= ref.line_number < 39 and ref.column_number >= 4
+        ],
+        key=lambda ref: (ref.line_number, ref.column_number),
+    )
+
+
+def test_label_partitions_match_edge_scan(symbol_graph_static_test):  # noqa: F811
+    navigator = symbol_graph_static_test.navigator
+    graph = symbol_graph_static_test._graph
+    for symbol in symbol_graph_static_test.get_all_available_symbols()[:200]:
+        for label in ("relationship", "reference"):
+            assert [target for target, _ in navigator._get_out_edges(symbol, label)] == [
+                target
+                for _, target, data in graph.out_edges(symbol, data=True)
+                if data.get("label") == label
+            ]
+        assert [source for source, _ in navigator._get_in_edges(symbol, "contains")] == [
+            source
+            for source, _, data in graph.in_edges(symbol, data=True)
+            if data.get("label") == "contains"
+        ]
+
+    navigator._discard_label_partitions()
+    assert not navigator._out_edges_by_label and not navigator._in_edges_by_label
+
+
+def test_streamed_documents_match_parsed_index(symbol_graph_static_test):  # noqa: F811
+    index_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "index.scip")
+    index = SymbolGraph._load_index_protobuf(index_path)
+
+    assert [document.SerializeToString() for document in iter_index_documents(index_path)] == [
+        document.SerializeToString() for document in index.documents
+    ]
+    for symbol_file in symbol_graph_static_test.get_all_files():
+        assert all(isinstance(ref, SymbolReference) for ref in symbol_file.occurrences)
+        assert len(symbol_file.occurrences) == len(
+            symbol_graph_static_test.navigator._get_references_to_module(symbol_file.path)
+        )
+
+
+def test_enclosing_ranges_are_collected_in_the_build_pass(tmp_path, mocker):
+    index_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "index.scip")
+    index = SymbolGraph._load_index_protobuf(index_path)
+    occurrence = next(
+        occurrence
+        for occurrence in index.documents[5].occurrences
+        if occurrence.symbol_roles & SymbolRole.Definition
+        and not occurrence.symbol.startswith("local")
+    )
+    occurrence.enclosing_range.extend([1, 0, 3, 4])
+    new_index_path = str(tmp_path / "index.scip")
+    with open(new_index_path, "wb") as f:
+        f.write(index.SerializeToString())
+
+    iter_documents = mocker.spy(index_stream, "iter_index_documents")
+    symbol_graph = SymbolGraph(new_index_path)
+    assert iter_documents.call_count == 1
+    assert symbol_graph.navigator.bounding_box[
+        parse_symbol(occurrence.symbol)
+    ] == BoundingBox.from_scip_range([1, 0, 3, 4])
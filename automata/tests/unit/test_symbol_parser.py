@@ -1,4 +1,14 @@
-from automata.core.symbol.parser import Symbol, is_global_symbol, is_local_symbol
+from dataclasses import FrozenInstanceError
+
+import pytest
+
+from automata.core.symbol.parser import (
+    Symbol,
+    is_global_symbol,
+    is_local_symbol,
+    parse_symbol,
+    parse_symbols,
+)
 
 
 def test_parse_symbol(symbols):
@@ -28,3 +38,39 @@ def _unparse(symbol: Symbol):
 def test_unparse_symbol(symbols):
     for symbol in symbols:
         assert _unparse(symbol) == symbol.uri
+
+
+def test_parse_symbol_is_interned(symbols):
+    for symbol in symbols:
+        assert parse_symbol(symbol.uri) is symbol
+
+
+def test_interned_symbols_are_immutable(symbols):
+    symbol = parse_symbol(symbols[0].uri)
+    with pytest.raises(FrozenInstanceError):
+        symbol.uri = "local 0"  # type: ignore
+    with pytest.raises(FrozenInstanceError):
+        symbol.package.version = "0"  # type: ignore
+    with pytest.raises(FrozenInstanceError):
+        symbol.descriptors[0].name = "module"  # type: ignore
+    assert parse_symbol(symbols[0].uri).uri == symbols[0].uri
+
+
+def test_parse_symbols_matches_parse_symbol(symbols):
+    uris = [symbol.uri for symbol in symbols] + ["local 42"]
+    batch = parse_symbols(uris)
+
+    assert [symbol.uri for symbol in batch] == uris
+    assert batch[-1] is parse_symbol("local 42")
+    for symbol, parsed_symbol in zip(symbols, batch):
+        assert parsed_symbol is symbol
+        assert parsed_symbol.package == symbol.package
+
+
+def test_parse_symbols_reuses_shared_prefix(symbols):
+    uri = symbols[0].uri.replace("#description.", "#batch_description.")
+    parsed_symbol = parse_symbols([uri])[0]
+
+    assert parsed_symbol is parse_symbol(uri)
+    assert parsed_symbol.package == symbols[0].package
+    assert _unparse(parsed_symbol) == uri
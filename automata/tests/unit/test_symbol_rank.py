@@ -5,6 +5,7 @@ import pytest
 from networkx import DiGraph
 
 from automata.core.symbol.search.rank import SymbolRank, SymbolRankConfig
+from automata.core.symbol.search.rank_basis import SymbolRankBasis
 
 
 def generate_random_graph(nodes, edges):
@@ -73,3 +74,175 @@ def test_get_ranks_small_graph():
     ranks = pagerank.get_ranks()
     assert len(ranks) == 3
     assert sum(ele[1] for ele in ranks) == pytest.approx(1.0)
+
+
+def test_sparse_backend_matches_python_backend():
+    random.seed(0)
+    G = generate_random_graph(200, 600)
+    for source, target in G.edges():
+        G[source][target]["weight"] = random.random()
+    similarity = {node: random.random() for node in G}
+
+    python_ranks = SymbolRank(G, SymbolRankConfig(backend="python")).get_ranks(
+        query_to_symbol_similarity=similarity
+    )
+    sparse_ranks = SymbolRank(G, SymbolRankConfig(backend="sparse")).get_ranks(
+        query_to_symbol_similarity=similarity
+    )
+
+    assert len(sparse_ranks) == len(python_ranks)
+    python_rank_dict = dict(python_ranks)
+    for node, rank in sparse_ranks:
+        assert rank == pytest.approx(python_rank_dict[node], abs=1.0e-6)
+
+
+def test_invalid_backend():
+    with pytest.raises(ValueError):
+        SymbolRank(generate_random_graph(10, 20), SymbolRankConfig(backend="gpu"))
+
+
+@pytest.mark.parametrize("backend", SymbolRank.BACKENDS)
+def test_graph_structure_is_cached_per_graph_version(backend, mocker):
+    G = generate_random_graph(50, 150)
+    rank = SymbolRank(G, SymbolRankConfig(backend=backend))
+    build = mocker.spy(
+        SymbolRank, "_prepare_transition_matrix" if backend == "sparse" else "_prepare_graph"
+    )
+
+    first_ranks = rank.get_ranks()
+    assert rank.get_ranks() == first_ranks
+    assert build.call_count == 1
+
+    G.add_edge(0, 50)
+    ranks = rank.get_ranks()
+    assert build.call_count == 2
+    assert len(ranks) == 51
+
+    rank.invalidate()
+    rank.get_ranks()
+    assert build.call_count == 3
+
+
+@pytest.mark.parametrize("backend", SymbolRank.BACKENDS)
+def test_graph_structure_is_rebuilt_after_invalidating_an_edge_move(backend):
+    G = nx.DiGraph([(0, 1), (1, 2), (2, 0), (2, 3)])
+    config = SymbolRankConfig(backend=backend)
+    rank = SymbolRank(G, config)
+    first_ranks = rank.get_ranks()
+
+    # Moving an edge keeps the node and edge counts, so the owner invalidates the cache
+    G.remove_edge(2, 3)
+    G.add_edge(3, 1)
+    assert rank.get_ranks() == first_ranks
+    rank.invalidate()
+    ranks = rank.get_ranks()
+    assert ranks != first_ranks
+    assert dict(ranks) == pytest.approx(dict(SymbolRank(G, config).get_ranks()))
+
+    G[3][1]["weight"] = 2.0
+    G.add_edge(3, 0, weight=1.0)
+    G.remove_edge(2, 0)
+    rank.invalidate()
+    assert dict(rank.get_ranks()) == pytest.approx(dict(SymbolRank(G, config).get_ranks()))
+
+
+@pytest.mark.parametrize("backend", SymbolRank.BACKENDS)
+def test_get_ranks_batch_matches_get_ranks(backend):
+    random.seed(1)
+    G = generate_random_graph(100, 300)
+    rank = SymbolRank(G, SymbolRankConfig(backend=backend))
+    queries = [None] + [{node: random.random() ** 4 for node in G} for _ in range(4)]
+
+    batch_ranks = rank.get_ranks_batch(queries)
+
+    assert len(batch_ranks) == len(queries)
+    for query, ranks in zip(queries, batch_ranks):
+        expected_ranks = dict(rank.get_ranks(query_to_symbol_similarity=query))
+        assert len(ranks) == len(expected_ranks)
+        for node, value in ranks:
+            assert value == pytest.approx(expected_ranks[node], abs=1.0e-12)
+
+
+def test_full_rank_basis_matches_get_ranks():
+    random.seed(2)
+    G = generate_random_graph(100, 300)
+    rank = SymbolRank(G, SymbolRankConfig())
+    similarity = {node: random.random() ** 3 for node in G}
+
+    basis = SymbolRankBasis.build(rank, sketch_size=len(G), batch_size=32)
+    approximate_ranks = basis.get_ranks(similarity, seed_count=len(G))
+    expected_ranks = dict(rank.get_ranks(query_to_symbol_similarity=similarity))
+
+    assert len(approximate_ranks) == len(expected_ranks)
+    for node, value in approximate_ranks:
+        assert value == pytest.approx(expected_ranks[node], abs=1.0e-6)
+
+
+def test_rank_basis_round_trip(tmp_path):
+    G = generate_random_graph(100, 300)
+    rank = SymbolRank(G, SymbolRankConfig())
+    basis = SymbolRankBasis.build(rank, sketch_size=8)
+    basis_path = str(tmp_path / "symbol_rank_basis.npz")
+    basis.save(basis_path)
+    similarity = {node: 1.0 if node < 5 else 0.0 for node in G}
+
+    loaded_basis = SymbolRankBasis.load_if_fresh(basis_path, rank)
+    assert loaded_basis is not None
+    assert loaded_basis.get_ranks(similarity) == basis.get_ranks(similarity)
+    assert sum(value for _, value in basis.get_ranks(similarity)) == pytest.approx(1.0)
+    assert all(basis.sketches[[i]].nnz <= 8 for i in range(len(G)))
+
+    G.add_edge(0, 1, weight=5.0)
+    rank.invalidate()
+    assert SymbolRankBasis.load_if_fresh(basis_path, rank) is None
+
+
+def test_get_top_ranks_matches_get_ranks():
+    random.seed(3)
+    G = generate_random_graph(300, 900)
+    rank = SymbolRank(G, SymbolRankConfig(approximation_error=1.0e-6))
+    similarity = {node: random.random() ** 3 for node in G}
+
+    top_ranks = rank.get_top_ranks(query_to_symbol_similarity=similarity, top_k=10)
+    expected_ranks = rank.get_ranks(query_to_symbol_similarity=similarity)
+
+    assert [node for node, _ in top_ranks] == [node for node, _ in expected_ranks[:10]]
+    for (_, value), (_, expected_value) in zip(top_ranks, expected_ranks):
+        assert value == pytest.approx(expected_value, abs=1.0e-4)
+    assert rank.get_top_ranks(top_k=0) == []
+    with pytest.raises(ValueError):
+        SymbolRank(G, SymbolRankConfig(approximation_error=0.0))
+
+
+def test_update_ranks_after_graph_edit():
+    random.seed(0)
+    G = generate_random_graph(500, 2500)
+    config = SymbolRankConfig(alpha=0.85, tolerance=1.0e-7)
+    rank = SymbolRank(G, config)
+    previous_ranks = rank.get_ranks()
+
+    G.remove_edges_from(random.sample(list(G.edges()), 3))
+    G.add_edge(5, 500)
+    G.add_edge(500, 7)
+    update = rank.update_ranks(previous_ranks)
+    fresh_rank = SymbolRank(G, config)
+    assert update.cold_start_iterations == fresh_rank._get_cold_start_iterations(len(G))
+    expected_ranks = dict(fresh_rank.get_ranks())
+
+    assert len(update.ranks) == len(expected_ranks)
+    for node, node_rank in update.ranks:
+        assert node_rank == pytest.approx(expected_ranks[node], abs=1.0e-6)
+    assert update.iterations < update.cold_start_iterations
+    assert update.iterations_saved == update.cold_start_iterations - update.iterations
+
+    # Moving an edge keeps the node and edge counts of the graph
+    u, v = next((u, v) for u, v in G.edges() if not G.has_edge(v, u))
+    edge_count = G.number_of_edges()
+    G.remove_edge(u, v)
+    G.add_edge(v, u)
+    assert G.number_of_edges() == edge_count
+    rank.invalidate()
+    update = rank.update_ranks(update.ranks)
+    expected_ranks = dict(SymbolRank(G, config).get_ranks())
+    for node, node_rank in update.ranks:
+        assert node_rank == pytest.approx(expected_ranks[node], abs=1.0e-6)
@@ -2,7 +2,13 @@ from unittest.mock import patch
 
 import pytest
 
+from automata.core.coding.py_coding.module_tree import LazyModuleTreeMap
 from automata.core.symbol.parser import parse_symbol
+from automata.core.symbol.search import regex_search
+from automata.core.symbol.search.global_rank import GlobalSymbolRank
+from automata.core.symbol.search.query_cache import QueryResultCache
+from automata.core.symbol.search.rank import SymbolRankConfig
+from automata.core.symbol.search.trigram_index import TrigramIndex
 
 
 def test_retrieve_source_code_by_symbol(symbols, symbol_searcher):
@@ -26,11 +32,14 @@ def test_symbol_references(symbols, symbol_searcher, symbol_graph_mock):
 
 def test_exact_search(symbol_searcher):
     with patch(
-        "automata.core.symbol.search.symbol_search.SymbolSearch.find_pattern_in_modules",
-        return_value=["file1", "file2"],
-    ):
+        "automata.core.symbol.search.symbol_search.TrigramIndex.cached_default"
+    ) as mock_cached_default:
+        trigram_index = mock_cached_default.return_value
+        trigram_index.search.return_value = ["file1", "file2"]
         result = symbol_searcher.exact_search("pattern1")
         assert result == ["file1", "file2"]
+        trigram_index.search.assert_called_once_with("pattern1")
+        assert trigram_index.refresh.call_count == 1
 
 
 def test_process_queries(symbols, symbol_searcher, symbol_graph_mock):
@@ -65,3 +74,261 @@ def test_process_queries(symbols, symbol_searcher, symbol_graph_mock):
 
     with pytest.raises(ValueError):
         symbol_searcher.process_query("type:unknown query")
+
+
+def test_symbol_rank_search_batch(symbols, symbol_searcher):
+    similarity_dicts = {"query1": {symbols[0]: 0.1}, "query2": {symbols[1]: 0.2}}
+    with patch.object(
+        symbol_searcher.symbol_code_similarity,
+        "get_query_similarity_dict",
+        side_effect=similarity_dicts.get,
+    ), patch.object(
+        symbol_searcher.symbol_rank,
+        "get_ranks_batch",
+        return_value=[[(symbols[0], 1.0)], [(symbols[1], 1.0)]],
+    ) as mock_method:
+        result = symbol_searcher.symbol_rank_search_batch(["query1", "query2"])
+        assert result == [[(symbols[0], 1.0)], [(symbols[1], 1.0)]]
+    assert [list(query_vec) for query_vec in mock_method.call_args[0][0]] == [
+        [symbols[0]],
+        [symbols[1]],
+    ]
+
+
+def test_symbol_rank_search_batch_uses_query_cache(symbols, symbol_searcher):
+    similarity_dicts = {
+        "query1": {symbols[0]: 0.1},
+        "query2": {symbols[1]: 0.2},
+        "query3": {symbols[2]: 0.3},
+    }
+    with patch.object(
+        symbol_searcher.symbol_code_similarity,
+        "get_query_similarity_dict",
+        side_effect=similarity_dicts.get,
+    ), patch.object(
+        symbol_searcher.symbol_rank, "get_ranks", return_value=[(symbols[0], 1.0)]
+    ), patch.object(
+        symbol_searcher.symbol_rank,
+        "get_ranks_batch",
+        return_value=[[(symbols[1], 1.0)], [(symbols[2], 1.0)]],
+    ) as mock_method:
+        symbol_searcher.symbol_rank_search("query1")
+        result = symbol_searcher.symbol_rank_search_batch(
+            ["query1", "query2", "query3", " query2"]
+        )
+        assert result == [
+            [(symbols[0], 1.0)],
+            [(symbols[1], 1.0)],
+            [(symbols[2], 1.0)],
+            [(symbols[1], 1.0)],
+        ]
+        assert result[1] is not result[3]
+        # Only the misses are batched, and repeated queries are computed once
+        assert [list(query_vec) for query_vec in mock_method.call_args[0][0]] == [
+            [symbols[1]],
+            [symbols[2]],
+        ]
+        assert symbol_searcher.query_cache.hits["symbol_rank"] == 1
+        assert symbol_searcher.query_cache.misses["symbol_rank"] == 4
+
+        assert symbol_searcher.symbol_rank_search("query3") == [(symbols[2], 1.0)]
+        assert symbol_searcher.symbol_rank_search_batch(["query2"]) == [[(symbols[1], 1.0)]]
+    assert mock_method.call_count == 1
+
+
+def test_symbol_rank_search_uses_rank_basis(symbols, symbol_searcher, mocker):
+    symbol_searcher.symbol_rank_basis = mocker.MagicMock()
+    symbol_searcher.symbol_rank_basis.get_ranks.return_value = [(symbols[0], 1.0)]
+    with patch.object(
+        symbol_searcher.symbol_code_similarity,
+        "get_query_similarity_dict",
+        return_value={symbols[0]: 0.1, symbols[1]: 0.2},
+    ), patch.object(symbol_searcher.symbol_rank, "get_ranks") as mock_method:
+        assert symbol_searcher.symbol_rank_search("query") == [(symbols[0], 1.0)]
+    mock_method.assert_not_called()
+
+
+def test_symbol_rank_search_top_k(symbols, symbol_searcher):
+    with patch.object(
+        symbol_searcher.symbol_code_similarity,
+        "get_query_similarity_dict",
+        return_value={symbols[0]: 0.1, symbols[1]: 0.2},
+    ), patch.object(
+        symbol_searcher.symbol_rank, "get_top_ranks", return_value=[(symbols[1], 0.6)]
+    ) as mock_method:
+        assert symbol_searcher.symbol_rank_search("query", top_k=1) == [(symbols[1], 0.6)]
+    assert mock_method.call_args[0][1] == 1
+
+
+def test_global_symbol_rank_round_trip(symbols, symbol_searcher, tmp_path):
+    global_rank_path = str(tmp_path / "index.scip.symbol_rank.json")
+    with patch.object(
+        symbol_searcher.symbol_rank,
+        "get_ranks",
+        return_value=[(symbols[1], 0.6), (symbols[0], 0.4)],
+    ):
+        GlobalSymbolRank.from_symbol_rank(
+            symbol_searcher.symbol_rank, "digest", "embedding_version"
+        ).save(global_rank_path)
+    config = symbol_searcher.symbol_rank.config
+
+    global_rank = GlobalSymbolRank.load_if_fresh(
+        global_rank_path, "digest", "embedding_version", config
+    )
+    assert global_rank is not None
+    assert global_rank.get_top_symbols(1) == [symbols[1]]
+    assert global_rank.get_top_symbols(5) == [symbols[1], symbols[0]]
+    assert (
+        GlobalSymbolRank.load_if_fresh(
+            global_rank_path, "other_digest", "embedding_version", config
+        )
+        is None
+    )
+    assert (
+        GlobalSymbolRank.load_if_fresh(global_rank_path, "digest", "other_version", config) is None
+    )
+    assert GlobalSymbolRank.load_if_fresh(global_rank_path, "digest", None, config) is None
+    assert (
+        GlobalSymbolRank.load_if_fresh(
+            global_rank_path, "digest", "embedding_version", SymbolRankConfig(alpha=0.5)
+        )
+        is None
+    )
+
+
+def test_trigram_index_matches_line_scan(tmp_path):
+    module_dir = tmp_path / "automata"
+    module_dir.mkdir()
+    module_fpath = module_dir / "module.py"
+    module_fpath.write_text("import os\n\n\ndef foo():\n    return os.path.join('a', 'b')\n\n")
+    (module_dir / "other.py").write_text("x = 1\nfoo = 'bar'\n")
+    trigram_index = TrigramIndex(LazyModuleTreeMap(str(tmp_path)))
+    trigram_index.refresh()
+
+    def scan(pattern):
+        matches = {}
+        for module_path in ("automata.module", "automata.other"):
+            module_lines = (tmp_path / f"{module_path.replace('.', '/')}.py").read_text()
+            line_numbers = [
+                i + 1
+                for i, line in enumerate(module_lines.splitlines())
+                if pattern in line.strip()
+            ]
+            if line_numbers:
+                matches[module_path] = line_numbers
+        return matches
+
+    for pattern in ("foo", "return os", "os", "", "'b')", "missing"):
+        assert trigram_index.search(pattern) == scan(pattern)
+
+    module_fpath.write_text("def foo_bar():\n    pass\n")
+    assert trigram_index.refresh() == ["automata.module"]
+    assert trigram_index.search("foo") == {"automata.module": [1], "automata.other": [2]}
+    assert trigram_index.search("return") == {}
+
+
+@pytest.mark.parametrize("max_workers", [1, 2])
+def test_regex_search(tmp_path, mocker, max_workers):
+    module_dir = tmp_path / "automata"
+    module_dir.mkdir()
+    (module_dir / "module.py").write_text("import os\n\n\ndef foo():\n    return foo_bar()\n")
+    (module_dir / "other.py").write_text("x = 1\ndef foo_bar():\n    pass\n")
+    (module_dir / "empty.py").write_text("")
+    module_map = LazyModuleTreeMap(str(tmp_path))
+    mocker.patch.object(regex_search, "MIN_PARALLEL_SCAN_BYTES", 0)
+
+    assert regex_search.find_regex_in_modules(
+        r"^def foo\w*\(", module_map, max_workers=max_workers
+    ) == {"automata.module": [4], "automata.other": [2]}
+    assert regex_search.find_regex_in_modules(r"foo", module_map, max_workers=max_workers) == {
+        "automata.module": [4, 5],
+        "automata.other": [2],
+    }
+    capped_matches = regex_search.find_regex_in_modules(
+        r"foo", module_map, max_results=2, max_workers=max_workers
+    )
+    assert sum(len(line_numbers) for line_numbers in capped_matches.values()) == 2
+    with pytest.raises(ValueError):
+        regex_search.find_regex_in_modules(r"foo(", module_map, max_workers=max_workers)
+
+
+def test_process_regex_query(symbol_searcher):
+    with patch.object(
+        symbol_searcher, "regex_search", return_value={"automata.module": [4]}
+    ) as mock_method:
+        assert symbol_searcher.process_query(r"type:regex def \w+") == {"automata.module": [4]}
+    mock_method.assert_called_once_with(r"def \w+")
+
+
+def test_query_cache_hits_and_invalidation(symbols, symbol_searcher, symbol_graph_mock):
+    symbol_graph_mock.get_references_to_symbol.return_value = {"file1": []}
+    for _ in range(3):
+        assert symbol_searcher.symbol_references(symbols[0].uri) == {"file1": []}
+    assert symbol_graph_mock.get_references_to_symbol.call_count == 1
+    assert symbol_searcher.query_cache.hit_rate("symbol_references") == pytest.approx(2 / 3)
+
+    with patch.object(
+        symbol_searcher.symbol_code_similarity,
+        "get_query_similarity_dict",
+        return_value={symbols[0]: 0.1, symbols[1]: 0.2},
+    ) as mock_method, patch.object(
+        symbol_searcher.symbol_rank, "get_ranks", return_value=[(symbols[1], 0.6)]
+    ):
+        symbol_searcher.symbol_rank_search("a  query")
+        symbol_searcher.symbol_rank_search(" a query ")
+        assert mock_method.call_count == 1
+
+        # Rebuilding the embeddings invalidates every cached result
+        symbol_searcher.symbol_code_similarity.embedding_handler.embedding_db.version = "rebuilt"
+        symbol_searcher.symbol_rank_search("a query")
+        assert mock_method.call_count == 2
+    symbol_searcher.symbol_references(symbols[0].uri)
+    assert symbol_graph_mock.get_references_to_symbol.call_count == 2
+
+    # Rebuilding the ranked subgraph with other settings also invalidates them
+    symbol_searcher.code_subgraph.path_filter = "automata.core"
+    symbol_searcher.symbol_references(symbols[0].uri)
+    assert symbol_graph_mock.get_references_to_symbol.call_count == 3
+
+
+def test_query_cache_bounds_and_persistence(symbols, tmp_path, mocker):
+    cache_path = str(tmp_path / "symbol_search_cache.json")
+    cache = QueryResultCache(max_size=2, ttl=60.0, file_path=cache_path, save_interval=2)
+    for query in ("query1", "query2", "query3"):
+        cache.get_or_compute("symbol_rank", query, "version", lambda: [(symbols[0], 1.0)])
+    assert len(cache) == 2
+    # Only the first two results have been saved yet
+    assert len(QueryResultCache(file_path=cache_path)) == 2
+    cache.close()
+
+    loaded_cache = QueryResultCache(max_size=2, ttl=60.0, file_path=cache_path)
+    compute = mocker.MagicMock(return_value=[])
+    assert loaded_cache.get_or_compute("symbol_rank", "query3", "version", compute) == [
+        (symbols[0], 1.0)
+    ]
+    loaded_cache.get_or_compute("symbol_rank", "query1", "version", compute)
+    assert compute.call_count == 1
+
+    mocker.patch("automata.core.symbol.search.query_cache.time.time", return_value=1.0e12)
+    loaded_cache.get_or_compute("symbol_rank", "query3", "version", compute)
+    assert compute.call_count == 2
+    assert loaded_cache.hit_rate() == pytest.approx(1 / 3)
+
+
+def test_query_cache_returns_copies(symbols):
+    cache = QueryResultCache()
+    result = cache.get_or_compute(
+        "symbol_references", "query", "version", lambda: {"file1": [1, 2]}
+    )
+    result["file1"].append(3)
+    result["file2"] = []
+
+    cached_result = cache.get_or_compute("symbol_references", "query", "version", dict)
+    assert cached_result == {"file1": [1, 2]}
+    cached_result["file1"].clear()
+    assert cache.get_or_compute("symbol_references", "query", "version", dict) == {"file1": [1, 2]}
+
+    ranks = cache.get_or_compute("symbol_rank", "query", "version", lambda: [(symbols[0], 1.0)])
+    cached_ranks = cache.get_or_compute("symbol_rank", "query", "version", list)
+    assert cached_ranks == ranks and cached_ranks is not ranks
+    assert cached_ranks[0][0] is symbols[0]
@@ -1,7 +1,9 @@
+import os
 from unittest.mock import MagicMock
 
 import numpy as np
 
+from automata.core.database.ivf_index import IVFFlatIndex, IVFFlatIndexConfig
 from automata.core.database.vector import JSONVectorDatabase
 from automata.core.embedding.code_embedding import (
     EmbeddingProvider,
@@ -55,3 +57,48 @@ def test_get_nearest_symbols_for_query(
     cem.embedding_provider.build_embedding.return_value = np.array([0, 0, 1, 0])
     result = symbol_similarity.get_nearest_entries_for_query("symbol3", k=1)
     assert list(result.keys()) == [symbol3]
+
+    # Test that only the available symbols are returned
+    symbol_similarity.set_available_symbols({symbol2, symbol3})
+    result = symbol_similarity.get_nearest_entries_for_query("symbol3", k=3)
+    assert list(result.keys()) == [symbol3, symbol2]
+    assert set(symbol_similarity.get_query_similarity_dict("symbol3")) == {symbol2, symbol3}
+
+
+def test_get_nearest_symbols_with_ann_index(mock_simple_method_symbols, tmp_path, mocker):
+    rng = np.random.default_rng(0)
+    embedding_db = JSONVectorDatabase(str(tmp_path / "symbol_code_embedding.json"))
+    for symbol in mock_simple_method_symbols:
+        embedding_db.add(SymbolCodeEmbedding(symbol, "source", rng.normal(size=4)))
+
+    mock_provider = MagicMock(EmbeddingProvider)
+    mock_provider.build_embedding.return_value = rng.normal(size=4)
+    cem = SymbolCodeEmbeddingHandler(embedding_db=embedding_db, embedding_provider=mock_provider)
+    exact_result = SymbolSimilarity(cem).get_nearest_entries_for_query("query", k=2)
+
+    ann_index_path = str(tmp_path / "symbol_code_embedding.ivf.npz")
+    ann_index_config = IVFFlatIndexConfig(n_lists=2, n_probe=2, min_rows=0)
+    symbol_similarity = SymbolSimilarity(
+        cem, ann_index_config=ann_index_config, ann_index_path=ann_index_path
+    )
+    # Queries never build the index, so they are exact until it is built
+    assert symbol_similarity.get_nearest_entries_for_query("query", k=2) == exact_result
+    assert not os.path.exists(ann_index_path)
+    ann_index = symbol_similarity.build_ann_index()
+    assert ann_index is not None and os.path.exists(ann_index_path)
+    assert symbol_similarity._get_ann_index() is ann_index
+    assert symbol_similarity.get_nearest_entries_for_query("query", k=2) == exact_result
+
+    # The persisted index is loaded for the same version of the database
+    symbol_similarity = SymbolSimilarity(
+        cem, ann_index_config=ann_index_config, ann_index_path=ann_index_path
+    )
+    assert symbol_similarity._get_ann_index().version == embedding_db.version
+
+    build = mocker.spy(IVFFlatIndex, "build")
+    embedding_db.discard(mock_simple_method_symbols[0])
+    assert symbol_similarity._get_ann_index() is None
+    assert symbol_similarity.get_nearest_entries_for_query("query", k=2) == SymbolSimilarity(
+        cem
+    ).get_nearest_entries_for_query("query", k=2)
+    assert build.call_count == 0